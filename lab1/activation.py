@@ -0,0 +1,168 @@
+import numpy as np
+
+from csr_snapshot import GraphSnapshot
+
+# Вес связи при распространении активации; остальные отношения получают DEFAULT_WEIGHT
+RELATION_WEIGHTS = {'является': 1.0}
+DEFAULT_WEIGHT = 0.7
+
+
+class SpreadingActivation:
+    """Ассоциативный поиск распространением активации по сети
+
+    Из графа один раз строится разреженная матрица переходов с весами по типу
+    связи (в формате CSR на массивах NumPy); она живёт до смены версии графа.
+    Активация за шаг - одно умножение матрицы на матрицу начальных активаций,
+    поэтому много запросов обрабатываются одним проходом.
+    """
+
+    def __init__(self, G, relation_weights=None, default_weight=DEFAULT_WEIGHT,
+                 reverse_weight=0.5, steps=3, decay=0.5, version=None):
+        self.G = G
+        self.relation_weights = dict(RELATION_WEIGHTS if relation_weights is None else relation_weights)
+        self.default_weight = default_weight
+        # Активация течёт и против направления связи, но слабее
+        self.reverse_weight = reverse_weight
+        self.steps = steps
+        self.decay = decay
+        # Функция без аргументов -> версия графа (в приложении - app.graph_version);
+        # матрица строится под версию. Без неё матрица живёт до вызова invalidate()
+        self.version = version
+        self.snapshot = None
+        self._built_version = None
+
+    # --- кэш матрицы ---------------------------------------------------------------
+
+    def invalidate(self):
+        self.snapshot = None
+
+    def _ensure(self):
+        version = None if self.version is None else self.version()
+        if self.snapshot is None or self._built_version != version:
+            self.rebuild()
+
+    def rebuild(self):
+        version = None if self.version is None else self.version()
+        snapshot = GraphSnapshot.from_graph(self.G)
+        self.snapshot = snapshot
+        n = snapshot.number_of_nodes()
+
+        weight_of = np.array([self.relation_weights.get(snapshot.relations[i], self.default_weight)
+                              for i in range(len(snapshot.relations))])
+        src = np.repeat(np.arange(n), np.diff(snapshot.fwd_indptr))
+        dst = np.asarray(snapshot.fwd_indices, dtype=np.int64)
+        weight = weight_of[snapshot.fwd_relation]
+
+        # Переходы в обе стороны: прямые с весом связи, обратные - с поправкой reverse_weight
+        source = np.concatenate([src, dst])
+        target = np.concatenate([dst, src])
+        weight = np.concatenate([weight, weight * self.reverse_weight])
+
+        # Узел раздаёт активацию соседям пропорционально весам - хабы не заливают всю сеть
+        fan_out = np.bincount(source, weights=weight, minlength=n)
+        weight = weight / np.where(fan_out > 0, fan_out, 1)[source]
+
+        # Строки матрицы - узлы-получатели: так шаг сводится к суммам по отрезкам
+        order = np.argsort(target, kind='stable')
+        self.source = source[order]
+        self.weight = weight[order]
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(target, minlength=n))))
+        self.row_starts = indptr[:-1][np.diff(indptr) > 0]
+        self.rows = np.flatnonzero(np.diff(indptr))
+
+        # Та же матрица по столбцам - для шагов, где активны лишь немногие узлы
+        order = np.argsort(source, kind='stable')
+        self.out_indptr = np.concatenate(([0], np.cumsum(np.bincount(source, minlength=n))))
+        self.out_target = target[order]
+        self.out_weight = weight[order]
+        self._built_version = version
+
+    # --- запросы -------------------------------------------------------------------------
+
+    def activate(self, seeds, top=10, steps=None, decay=None):
+        """Самые связанные с seeds узлы: [(узел, активация), ...]
+
+        seeds - узел, список узлов или словарь {узел: начальная активация}.
+        """
+        return self.activate_many([seeds], top=top, steps=steps, decay=decay)[0]
+
+    def activate_many(self, queries, top=10, steps=None, decay=None):
+        """Пакет запросов: все начальные активации собираются в одну матрицу"""
+        self._ensure()
+        if not self.snapshot.number_of_nodes():
+            return [[] for _ in queries]
+        seeds = np.zeros((self.snapshot.number_of_nodes(), len(queries)))
+        for column, query in enumerate(queries):
+            for node, value in _seed_items(query):
+                if node in self.snapshot:
+                    seeds[self.snapshot.node_id(node), column] += value
+
+        scores = self.spread(seeds, steps, decay)
+        results = []
+        for column in range(len(queries)):
+            score = scores[:, column]
+            # Сами затравочные узлы в ответ не входят
+            score[seeds[:, column] > 0] = 0
+            results.append(self._top(score, top))
+        return results
+
+    def spread(self, seeds, steps=None, decay=None, block=None):
+        """Суммарная активация за steps шагов для матрицы seeds (узлы x запросы)"""
+        self._ensure()
+        steps = self.steps if steps is None else steps
+        decay = self.decay if decay is None else decay
+        seeds = np.asarray(seeds, dtype=float).reshape(self.snapshot.number_of_nodes(), -1)
+
+        # Запросы обрабатываются блоками столбцов, чтобы промежуточный массив nnz x q не рос без меры
+        if block is None:
+            block = max(1, 10_000_000 // max(len(self.source), 1))
+        total = seeds.copy()
+        for start in range(0, seeds.shape[1], block):
+            current = seeds[:, start:start + block]
+            for _ in range(steps):
+                current = decay * self._multiply(current)
+                total[:, start:start + block] += current
+        return total
+
+    def _multiply(self, X):
+        """Произведение разреженной матрицы переходов на плотную матрицу X"""
+        result = np.zeros_like(X)
+        if not len(self.source):
+            return result
+
+        active = np.flatnonzero(X.any(axis=1))
+        starts = self.out_indptr[active]
+        counts = self.out_indptr[active + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return result
+        if total * 8 < len(self.source):
+            # Активных узлов мало - берём только исходящие из них переходы
+            edge_ids = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+            targets = self.out_target[edge_ids]
+            contributions = self.out_weight[edge_ids, None] * X[np.repeat(active, counts)]
+            order = np.argsort(targets, kind='stable')
+            targets = targets[order]
+            first = np.flatnonzero(np.diff(targets, prepend=-1))
+            result[targets[first]] = np.add.reduceat(contributions[order], first, axis=0)
+            return result
+
+        contributions = self.weight[:, None] * X[self.source]
+        result[self.rows] = np.add.reduceat(contributions, self.row_starts, axis=0)
+        return result
+
+    def _top(self, score, top):
+        candidates = np.flatnonzero(score > 0)
+        if top is not None and len(candidates) > top:
+            candidates = candidates[np.argpartition(-score[candidates], top - 1)[:top]]
+        candidates = candidates[np.argsort(-score[candidates], kind='stable')]
+        return [(self.snapshot.names[i], float(score[i])) for i in candidates.tolist()]
+
+
+def _seed_items(query):
+    if isinstance(query, dict):
+        return query.items()
+    if isinstance(query, (list, tuple, set, frozenset)):
+        return ((node, 1.0) for node in query)
+    return [(query, 1.0)]
+
@@ -0,0 +1,204 @@
+import networkx as nx
+import numpy as np
+
+from csr_snapshot import GraphSnapshot
+from inheritance import ISA_RELATIONS
+
+
+class NetworkAnalytics:
+    """Аналитика сети: пути, компоненты, циклы "является", рейтинги узлов
+
+    Результаты считаются по запросу и запоминаются до смены версии графа.
+    Компоненты связности ведутся системой непересекающихся множеств: добавление
+    узлов и связей обновляет их сразу, и только удаление требует пересборки.
+    """
+
+    def __init__(self, G, isa_relations=ISA_RELATIONS, version=None):
+        self.G = G
+        self.isa_relations = set(isa_relations)
+        # Функция без аргументов -> версия графа (в приложении - app.graph_version);
+        # кэш результатов привязан к ней. Без неё кэш сбрасывают apply и invalidate
+        self.version = version
+        self._memo = {}
+        self._memo_version = None
+        self._parent = None
+        self._size = None
+        self._count = 0
+
+    # --- изменения графа ------------------------------------------------------------
+
+    def apply(self, change):
+        """Принимает изменения в том же виде, что и журнал правок"""
+        if self.version is None:
+            self._memo = {}
+        kind = change[0]
+        if self._parent is None:
+            return
+        if kind == 'add_node':
+            self._make_set(change[1])
+        elif kind == 'add_edge':
+            self._union(change[1], change[2])
+        elif kind == 'clear':
+            self._parent, self._size, self._count = {}, {}, 0
+        else:
+            # Удаление может разбить компоненту - союз-поиск этого не умеет, пересобираем при запросе
+            self._parent = None
+
+    def invalidate(self):
+        self._memo = {}
+        self._parent = None
+
+    def _cached(self, key, compute):
+        version = None if self.version is None else self.version()
+        if self._memo_version != version:
+            self._memo = {}
+            self._memo_version = version
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    # --- компоненты связности ----------------------------------------------------------
+
+    def component_count(self):
+        self._ensure_components()
+        return self._count
+
+    def component_of(self, node):
+        """Представитель компоненты узла: у узлов одной компоненты он совпадает"""
+        self._ensure_components()
+        return self._find(node)
+
+    def components(self):
+        """Компоненты (без учёта направления связей), от крупных к мелким"""
+        def compute():
+            self._ensure_components()
+            groups = {}
+            for node in self._parent:
+                groups.setdefault(self._find(node), set()).add(node)
+            return sorted(groups.values(), key=len, reverse=True)
+        return self._cached('components', compute)
+
+    def _ensure_components(self):
+        if self._parent is not None:
+            return
+        self._parent, self._size, self._count = {}, {}, 0
+        for node in self.G:
+            self._make_set(node)
+        for u, v in self.G.edges():
+            self._union(u, v)
+
+    def _make_set(self, node):
+        if node not in self._parent:
+            self._parent[node] = node
+            self._size[node] = 1
+            self._count += 1
+
+    def _find(self, node):
+        root = node
+        while self._parent[root] != root:
+            root = self._parent[root]
+        # Сжатие путей
+        while self._parent[node] != root:
+            self._parent[node], node = root, self._parent[node]
+        return root
+
+    def _union(self, u, v):
+        self._make_set(u)
+        self._make_set(v)
+        a, b = self._find(u), self._find(v)
+        if a == b:
+            return
+        if self._size[a] < self._size[b]:
+            a, b = b, a
+        self._parent[b] = a
+        self._size[a] += self._size.pop(b)
+        self._count -= 1
+
+    # --- пути и циклы ---------------------------------------------------------------------
+
+    def shortest_path(self, source, target, directed=False):
+        """Кратчайшая цепочка связей [(u, связь, v), ...] или None
+
+        Без учёта направления цепочка может идти и против стрелок - такие шаги
+        в ответе остаются в исходном направлении связи.
+        """
+        def compute():
+            if source not in self.G or target not in self.G:
+                return None
+            if not directed and self.component_of(source) != self.component_of(target):
+                return None
+            graph = self.G if directed else self.G.to_undirected(as_view=True)
+            try:
+                nodes = nx.shortest_path(graph, source, target)
+            except nx.NetworkXNoPath:
+                return None
+            steps = []
+            for u, v in zip(nodes, nodes[1:]):
+                if not self.G.has_edge(u, v):
+                    u, v = v, u
+                steps.append((u, self.G.edges[u, v].get('relation', ''), v))
+            return steps
+        return self._cached(('path', source, target, directed), compute)
+
+    def isa_cycles(self, limit=100):
+        """Циклы в иерархии "является" (в корректной иерархии их нет)"""
+        def compute():
+            isa = nx.DiGraph((u, v) for u, v, relation in self.G.edges(data='relation', default='')
+                             if relation in self.isa_relations)
+            cycles = []
+            # Циклы ищем только внутри сильно связных компонент - остальная иерархия их не содержит
+            for component in nx.strongly_connected_components(isa):
+                first = next(iter(component))
+                if len(component) > 1 or isa.has_edge(first, first):
+                    for cycle in nx.simple_cycles(isa.subgraph(component)):
+                        cycles.append(cycle)
+                        if len(cycles) >= limit:
+                            return cycles
+            return cycles
+        return self._cached(('isa_cycles', limit), compute)
+
+    # --- рейтинги ---------------------------------------------------------------------------
+
+    def degree_ranking(self, top=10, mode='all'):
+        """Узлы с наибольшим числом связей: mode - 'in', 'out' или 'all'"""
+        def compute():
+            degree = {'in': self.G.in_degree, 'out': self.G.out_degree}.get(mode, self.G.degree)
+            return sorted(degree(), key=lambda item: (-item[1], str(item[0])))[:top]
+        return self._cached(('degree', top, mode), compute)
+
+    def centrality_ranking(self, top=10, damping=0.85, iterations=100, tol=1e-10):
+        """PageRank степенным методом на CSR-снимке графа: [(узел, вес), ...]"""
+        def compute():
+            if self.G.number_of_nodes() == 0:
+                return []
+            snapshot = GraphSnapshot.from_graph(self.G)
+            n = snapshot.number_of_nodes()
+            out_degree = np.diff(snapshot.fwd_indptr)
+            src = np.repeat(np.arange(n), out_degree)
+            dst = np.asarray(snapshot.fwd_indices, dtype=np.int64)
+            rank = np.full(n, 1.0 / n)
+            dangling = out_degree == 0
+            for _ in range(iterations):
+                share = np.where(dangling, 0, rank / np.maximum(out_degree, 1))
+                new = np.bincount(dst, weights=share[src], minlength=n) * damping
+                # Ранг узлов без исходящих связей и телепортация распределяются поровну
+                new += (1 - damping + damping * rank[dangling].sum()) / n
+                done = np.abs(new - rank).sum() < tol
+                rank = new
+                if done:
+                    break
+            best = np.argsort(-rank, kind='stable')[:top]
+            return [(snapshot.names[i], float(rank[i])) for i in best.tolist()]
+        return self._cached(('pagerank', top, damping), compute)
+
+    def summary(self, top=5):
+        """Короткий текстовый отчёт для панели"""
+        lines = [f'Компонент: {self.component_count()}',
+                 f'Циклов "является": {len(self.isa_cycles())}']
+        if self.G.number_of_nodes():
+            lines.append('Больше всего связей: ' +
+                         ', '.join(f'{n} ({d})' for n, d in self.degree_ranking(top)))
+            lines.append('PageRank: ' +
+                         ', '.join(f'{n} ({r:.2f})' for n, r in self.centrality_ranking(top)))
+        return '\n'.join(lines)
+
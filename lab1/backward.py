@@ -0,0 +1,264 @@
+import threading
+from collections import namedtuple
+
+from rete import canonical, is_var, substitute
+
+# Ответ на цель: выведенный факт, сделанные допущения и дерево доказательства.
+# Доказательство - ('fact', факт), ('assume', факт) или ('rule', имя, факт, [поддоказательства])
+Answer = namedtuple('Answer', 'fact assumptions proof')
+
+
+class BackwardChainer:
+    """Обратный вывод от цели по той же базе правил, что и у ReteEngine
+
+    Факты с именем из askable (ответы пользователя: ('budget', значение) и т.п.)
+    не выводятся, а допускаются: ответ сообщает, при каких допущениях цель
+    верна. askable - словарь {вопрос: допустимые ответы или None}. У допущения одно значение - ответы с разными значениями одного
+    вопроса несовместимы; None означает "любое значение".
+
+    Подцели табулируются: ответы на цель с точностью до имён переменных
+    запоминаются, поэтому повторные запросы не выводятся заново, а рекурсивные
+    правила доводятся до неподвижной точки вместо бесконечного спуска.
+
+    Таблица и состояние рекурсии общие, поэтому запросы из разных потоков
+    выполняются по очереди под блокировкой. Готовые ответы из таблицы отдаются
+    быстро; если вывод прервался исключением, недоделанные записи таблицы
+    выбрасываются, и следующий запрос начинает с чистого состояния.
+    """
+
+    def __init__(self, rules, facts, askable=()):
+        self.rules = list(rules)
+        self.askable = askable if isinstance(askable, dict) else dict.fromkeys(askable)
+        self._facts = {}
+        for fact in facts:
+            fact = tuple(fact)
+            self._facts.setdefault((fact[0], len(fact)), []).append(fact)
+        self._heads = {}
+        for rule in self.rules:
+            for head in rule["then"]:
+                self._heads.setdefault((head[0], len(head)), []).append((rule, head))
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """Забывает таблицу - после смены базы знаний"""
+        with self._lock:
+            self.table = {}
+            self._clock = 0
+            self._added = 0
+            self._reset_search()
+            self.stats = {'goals': 0, 'table_hits': 0, 'evaluations': 0}
+
+    def _reset_search(self):
+        self._stack = {}
+        self._lows = []
+        self._rounds = []
+        self._pending = []
+
+    # --- запросы ---------------------------------------------------------------------
+
+    def prove(self, goal):
+        """Все ответы на цель, например ('recommended_build', 'Cyclone') или ('class_option', '?c')"""
+        goal = tuple(goal)
+        with self._lock:
+            try:
+                answers = self._solve(goal)
+            except BaseException:
+                # Незавершённые цели могли остаться с неполными ответами - в таблице им не место
+                self.table = {key: entry for key, entry in self.table.items() if entry.complete}
+                self._reset_search()
+                raise
+            return [answer for answer in answers if _matches(goal, answer.fact)]
+
+    def prove_many(self, goals):
+        """Пакет целей с общей таблицей: {цель: ответы}"""
+        with self._lock:
+            return {tuple(goal): self.prove(goal) for goal in goals}
+
+    # --- табулированный вывод ------------------------------------------------------------
+
+    def _solve(self, goal):
+        self.stats['goals'] += 1
+        key = tuple(canonical([goal])[0][0])
+        entry = self.table.get(key)
+        if entry is not None and entry.complete:
+            self.stats['table_hits'] += 1
+            return entry.answers
+        if key in self._stack:
+            # Рекурсия: отдаём найденное на сейчас, ведущая цель досчитает до неподвижной точки
+            self._lows[-1] = min(self._lows[-1], self._stack[key])
+            return entry.answers
+        if entry is not None and self._rounds and entry.round > self._rounds[-1]:
+            # Незавершённая цель уже пересчитана в этом проходе - до следующего прохода ответ тот же
+            return entry.answers
+
+        if entry is None:
+            entry = self.table[key] = _TableEntry()
+        depth = len(self._stack)
+        self._stack[key] = depth
+        pending_start = len(self._pending)
+        lowest = depth
+        while True:
+            self._clock += 1
+            self._rounds.append(self._clock)
+            self._lows.append(depth)
+            added = self._added
+            self.stats['evaluations'] += 1
+            self._evaluate(goal, entry)
+            entry.round = self._rounds.pop()
+            low = self._lows.pop()
+            lowest = min(lowest, low)
+            # Цель внутри чужого цикла считается один раз - повторять будет ведущая
+            if low < depth or self._added == added:
+                break
+        del self._stack[key]
+
+        if lowest < depth:
+            self._lows[-1] = min(self._lows[-1], lowest)
+            self._pending.append(entry)
+        else:
+            entry.complete = True
+            for other in self._pending[pending_start:]:
+                other.complete = True
+            del self._pending[pending_start:]
+        return entry.answers
+
+    def _evaluate(self, goal, entry):
+        name = goal[0]
+        if name in self.askable:
+            fact = tuple(None if is_var(term) else term for term in goal)
+            if self._allowed(fact):
+                self._add(entry, fact, (fact,), ('assume', fact))
+            return
+
+        for fact in self._facts.get((name, len(goal)), []):
+            if _matches(goal, fact):
+                self._add(entry, fact, (), ('fact', fact))
+
+        for rule, head in self._heads.get((name, len(goal)), []):
+            bindings = _bind_head(head, goal)
+            if bindings is None:
+                continue
+            for bindings, assumptions, proofs in self._conjoin(rule["if"], bindings, (), ()):
+                fact = tuple(bindings.get(term) if is_var(term) else term for term in head)
+                if _matches(goal, fact):
+                    self._add(entry, fact, assumptions, ('rule', rule["name"], fact, proofs))
+
+    def _conjoin(self, conditions, bindings, assumptions, proofs):
+        """Решения конъюнкции условий: (привязки, допущения, доказательства)"""
+        if not conditions:
+            yield bindings, assumptions, proofs
+            return
+
+        # Вопросы пользователю откладываются, пока другие условия не свяжут их переменные
+        index = next((i for i, c in enumerate(conditions) if c[0] not in self.askable), 0)
+        condition = substitute(conditions[index], bindings)
+        rest = conditions[:index] + conditions[index + 1:]
+
+        if condition[0] in self.askable:
+            fact = tuple(None if is_var(term) else term for term in condition)
+            merged = _merge(assumptions, (fact,))
+            if merged is None or not self._allowed(fact):
+                return
+            fact = next(a for a in merged if a[0] == fact[0])
+            extended = _extend(condition, fact, bindings)
+            if extended is not None:
+                yield from self._conjoin(rest, extended, merged, proofs + (('assume', fact),))
+            return
+
+        for answer in list(self._solve(condition)):
+            extended = _extend(condition, answer.fact, bindings)
+            if extended is None:
+                continue
+            merged = _merge(assumptions, answer.assumptions)
+            if merged is None:
+                continue
+            yield from self._conjoin(rest, extended, merged, proofs + (answer.proof,))
+
+    def _allowed(self, fact):
+        values = self.askable[fact[0]]
+        return values is None or fact[1] is None or fact[1] in values
+
+    def _add(self, entry, fact, assumptions, proof):
+        key = (fact, assumptions)
+        if key not in entry.keys:
+            entry.keys.add(key)
+            entry.answers.append(Answer(fact, assumptions, proof))
+            self._added += 1
+
+
+class _TableEntry:
+    __slots__ = ('answers', 'keys', 'complete', 'round')
+
+    def __init__(self):
+        self.answers = []
+        self.keys = set()
+        self.complete = False
+        self.round = 0
+
+
+def _matches(pattern, fact):
+    if len(pattern) != len(fact):
+        return False
+    seen = {}
+    for term, value in zip(pattern, fact):
+        if is_var(term):
+            if seen.setdefault(term, value) != value:
+                return False
+        elif value is not None and term != value:
+            return False
+    return True
+
+
+def _bind_head(head, goal):
+    """Привязки переменных правила из констант цели или None, если заголовок не подходит"""
+    bindings = {}
+    for head_term, goal_term in zip(head, goal):
+        if is_var(goal_term):
+            continue
+        if is_var(head_term):
+            if bindings.setdefault(head_term, goal_term) != goal_term:
+                return None
+        elif head_term != goal_term:
+            return None
+    return bindings
+
+
+def _extend(pattern, fact, bindings):
+    extended = dict(bindings)
+    for term, value in zip(pattern, fact):
+        if is_var(term):
+            if extended.setdefault(term, value) != value:
+                return None
+        elif value is not None and term != value:
+            return None
+    return extended
+
+
+def _merge(first, second):
+    """Объединение допущений; None, если один вопрос получил два разных ответа"""
+    merged = {a[0]: a for a in first}
+    for fact in second:
+        known = merged.get(fact[0])
+        if known is None or known[1] is None:
+            merged[fact[0]] = fact
+        elif fact[1] is not None and fact[1] != known[1]:
+            return None
+    return tuple(sorted(merged.values(), key=lambda a: a[0]))
+
+
+def explain(proof, indent=0):
+    """Строки объяснения "почему" по дереву доказательства"""
+    pad = '  ' * indent
+    kind = proof[0]
+    fact = proof[2] if kind == 'rule' else proof[1]
+    text = ' '.join('any' if term is None else str(term) for term in fact)
+    if kind == 'fact':
+        return [f'{pad}{text}  [fact]']
+    if kind == 'assume':
+        return [f'{pad}{text}  [your answer]']
+    lines = [f'{pad}{text}  [rule {proof[1]}]']
+    for sub in proof[3]:
+        lines.extend(explain(sub, indent + 1))
+    return lines
+
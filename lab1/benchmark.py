@@ -0,0 +1,273 @@
+# Замеры производительности семантической сети на синтетических данных
+#
+# Пример:
+#   python benchmark.py --sizes 100,1000,10000 --output bench.json
+#   python benchmark.py --sizes 1000000 --stages save,load,labels
+#
+# Для каждого размера сети и этапа пишутся лучшее и среднее время и пик памяти
+# по tracemalloc (память меряется отдельным прогоном, чтобы трассировка не
+# искажала время). Результаты разных коммитов сравниваются по JSON-файлам.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import matplotlib
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+
+from label_placement import place_edge_labels
+from layout_cache import LayoutCache
+from layout_worker import LayoutWorker
+from network_io import load_network_file, save_network_file
+
+# Словарь отношений: доли примерно как в настоящих сетях - несколько частых и длинный хвост
+PROPERTY_RELATIONS = ['умеет', 'имеет', 'имеет цвет', 'живёт в', 'ест', 'часть', 'связан с',
+                      'похож на', 'не умеет', 'размер', 'издаёт звук', 'используется для']
+
+# Самые дорогие этапы на больших сетях не запускаются: (этап, наибольший размер)
+STAGE_LIMITS = {'layout': 5000, 'layout_nx': 1000, 'redraw': 100000, 'hit_test': 1000000}
+STAGES = ('save', 'load', 'layout', 'layout_nx', 'hit_test', 'redraw', 'labels')
+
+
+def generate_network(n, seed=0, edges_per_node=2.5):
+    """Синтетическая сеть: дерево "является" плюс свойства с распределением Ципфа
+
+    Каждый узел, кроме корня, - разновидность одного из ранее созданных (предки
+    выбираются с предпочтением к "старым" узлам, как у общих понятий). Остальные
+    связи - свойства: отношение и объект берутся по закону Ципфа, поэтому
+    немногие понятия ("летать", "черный") встречаются очень часто.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([f'понятие_{i}' for i in range(n)], dtype=object)
+
+    children = np.arange(1, n)
+    # Квадрат равномерной величины сдвигает выбор предков к началу списка
+    parents = (rng.random(n - 1) ** 2 * children).astype(np.int64)
+    isa_edges = np.column_stack([children, parents])
+
+    extra = max(0, int(n * edges_per_node) - len(isa_edges))
+    subjects = rng.integers(0, n, extra)
+    objects = np.minimum(rng.zipf(1.5, extra) - 1, n - 1)
+    relations = np.minimum(rng.zipf(1.8, extra) - 1, len(PROPERTY_RELATIONS) - 1)
+    # Свойство не должно затирать связь "является" с предком - иначе дерево рвётся
+    parent_of = np.concatenate([[-1], parents])
+    keep = (subjects != objects) & (objects != parent_of[subjects])
+
+    G = nx.DiGraph()
+    G.add_nodes_from(names.tolist())
+    G.add_edges_from((names[u], names[v], {'relation': 'является'}) for u, v in isa_edges.tolist())
+    G.add_edges_from((names[u], names[v], {'relation': PROPERTY_RELATIONS[r]})
+                     for u, v, r in zip(subjects[keep].tolist(), objects[keep].tolist(),
+                                        relations[keep].tolist()))
+    return G
+
+
+# ---------------------------------------------------------------------------
+# Этапы: каждый возвращает функцию без аргументов, которую и меряем
+
+def stage_save(G, workdir):
+    def run():
+        save_network_file(G, os.path.join(workdir, 'net.json'))
+        save_network_file(G, os.path.join(workdir, 'net.snb'))
+    return run
+
+
+def stage_load(G, workdir):
+    # Файлы пишутся заново: в каталоге могут лежать сети прошлого размера
+    for name in ('net.json', 'net.snb'):
+        save_network_file(G, os.path.join(workdir, name))
+
+    def run():
+        load_network_file(os.path.join(workdir, 'net.json'))
+        load_network_file(os.path.join(workdir, 'net.snb'))
+    return run
+
+
+def stage_layout(G, workdir):
+    """Фоновая раскладка приложения - до последней итерации"""
+    def run():
+        worker = LayoutWorker(k=3, iterations=100, seed=0)
+        worker.start(G)
+        while worker.busy():
+            worker.poll()
+            time.sleep(0.001)
+    return run
+
+
+def stage_layout_nx(G, workdir):
+    """Синхронная раскладка через nx.spring_layout (путь для маленьких сетей)"""
+    def run():
+        LayoutCache(k=3, iterations=100, seed=0).recompute(G)
+    return run
+
+
+def _app_with(G, pos):
+    from lab1 import SemanticNetworkApp
+    app = SemanticNetworkApp()
+    app.G.add_nodes_from(G.nodes(data=True))
+    app.G.add_edges_from(G.edges(data=True))
+    app.layout.set_positions(pos)
+    # Граф наполнен в обход журнала - сбрасываем то, что зависит от версии графа
+    app.graph_version += 1
+    app.analytics.invalidate()
+    return app
+
+
+def _random_positions(G, seed=0):
+    rng = np.random.default_rng(seed)
+    return dict(zip(G.nodes(), rng.uniform(-1, 1, (G.number_of_nodes(), 2))))
+
+
+def stage_hit_test(G, workdir, clicks=200):
+    """Попадание мышью в узел (on_click) по случайным точкам экрана"""
+    pos = _random_positions(G)
+    app = _app_with(G, pos)
+    app.renderer.update_limits(pos)
+    rng = np.random.default_rng(1)
+    bbox = app.ax.bbox
+    events = []
+    for x, y in zip(rng.uniform(bbox.x0, bbox.x1, clicks), rng.uniform(bbox.y0, bbox.y1, clicks)):
+        xdata, ydata = app.ax.transData.inverted().transform((x, y))
+        events.append(SimpleNamespace(inaxes=app.ax, x=x, y=y, xdata=xdata, ydata=ydata))
+    # В окне draw_idle лишь планирует перерисовку, а в Agg рисует сразу - здесь она не нужна
+    app.fig.canvas.draw_idle = lambda *args, **kwargs: None
+    # Индекс строится при первом клике - в замер он не входит
+    app.on_click(events[0])
+
+    def run():
+        for event in events:
+            app.on_click(event)
+    run.cleanup = lambda: plt.close(app.fig)
+    return run
+
+
+def stage_redraw(G, workdir):
+    """Полная перерисовка draw_network с отрисовкой холста Agg"""
+    app = _app_with(G, _random_positions(G))
+
+    def run():
+        app.renderer.clear()
+        app.draw_network()
+        app.fig.canvas.draw()
+    run.cleanup = lambda: plt.close(app.fig)
+    return run
+
+
+def stage_labels(G, workdir):
+    """Размещение подписей всех связей с разведением пересечений"""
+    pos = _random_positions(G)
+    labels = {(u, v): relation for u, v, relation in G.edges(data='relation')}
+    char = 2.0 / np.sqrt(max(G.number_of_nodes(), 1)) / 20
+
+    def run():
+        place_edge_labels(pos, labels, offset=char, char_size=(char, char * 3))
+    return run
+
+
+STAGE_FUNCTIONS = {
+    'save': stage_save,
+    'load': stage_load,
+    'layout': stage_layout,
+    'layout_nx': stage_layout_nx,
+    'hit_test': stage_hit_test,
+    'redraw': stage_redraw,
+    'labels': stage_labels,
+}
+
+
+# ---------------------------------------------------------------------------
+# Замеры
+
+def measure(run, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    # Отдельный прогон под tracemalloc: пик памяти без влияния трассировки на время
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'best_s': min(times), 'mean_s': sum(times) / len(times), 'runs': len(times),
+            'peak_mb': peak / 2 ** 20}
+
+
+def run_benchmarks(sizes, stages=STAGES, repeat=3, seed=0, log=print):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in sizes:
+            start = time.perf_counter()
+            G = generate_network(n, seed=seed)
+            log(f'n={n}: сеть из {G.number_of_edges()} связей за {time.perf_counter() - start:.2f} с')
+            for stage in stages:
+                if n > STAGE_LIMITS.get(stage, float('inf')):
+                    continue
+                run = STAGE_FUNCTIONS[stage](G, workdir)
+                try:
+                    # Тяжёлые этапы на больших сетях гоняем один раз
+                    result = measure(run, repeat if n <= 10000 else 1)
+                finally:
+                    getattr(run, 'cleanup', lambda: None)()
+                result.update(stage=stage, nodes=n, edges=G.number_of_edges())
+                results.append(result)
+                log(f'  {stage:10s} {result["best_s"] * 1000:10.1f} мс   пик {result["peak_mb"]:8.1f} МБ')
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'commit': commit or None,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'networkx': nx.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Замеры производительности семантической сети')
+    parser.add_argument('--sizes', default='100,1000,10000,100000',
+                        help='размеры сетей через запятую (допускается 1e6)')
+    parser.add_argument('--stages', default=','.join(STAGES), help='этапы через запятую')
+    parser.add_argument('--repeat', type=int, default=3, help='повторов на малых сетях')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json', help='файл с результатами JSON')
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(size)) for size in args.sizes.split(',')]
+    stages = [stage.strip() for stage in args.stages.split(',')]
+    unknown = [stage for stage in stages if stage not in STAGE_FUNCTIONS]
+    if unknown:
+        parser.error(f'неизвестные этапы: {", ".join(unknown)}')
+
+    report = {'environment': environment(),
+              'results': run_benchmarks(sizes, stages, args.repeat, args.seed)}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'Результаты записаны в {args.output}')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
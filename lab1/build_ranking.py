@@ -0,0 +1,137 @@
+import numpy as np
+
+# Оценки билда от 0 до 1. Столбец оценки есть в матрице, только если её задаёт хоть один
+# билд базы знаний; у остальных билдов - середина шкалы
+RATINGS = ('defense', 'clear_speed', 'bossing')
+DEFAULT_RATING = 0.5
+
+# Вес критерия в оценке, если профиль не задаёт свой
+DEFAULT_WEIGHTS = {'playstyle': 2.0, 'budget': 1.5, 'defense': 0.5, 'clear_speed': 0.5, 'bossing': 0.5}
+
+# Насколько подходит билд дешевле бюджета пользователя (дороже - не подходит совсем)
+CHEAPER_BUDGET_MATCH = 0.5
+
+
+def build_feature_matrix(kb):
+    """Матрица признаков каталога: строка - билд, столбцы - стили игры, уровни бюджета, оценки
+
+    kb - словарь собранной базы знаний; оценки берутся из необязательного
+    раздела build_ratings: {"билд": {"defense": 0.8, ...}}. Кроме матрицы
+    запоминается, для каких стилей игры стиль - основной у класса билда
+    (а не подходит через гибкий класс): при равных оценках такие билды выше.
+    """
+    playstyles, levels = kb['playstyles'], kb['budget_levels']
+    ratings = kb.get('build_ratings', {})
+    rated = [name for name in RATINGS if any(name in values for values in ratings.values())]
+    columns = ([('playstyle', p) for p in playstyles] + [('budget', b) for b in levels] +
+               [(name, None) for name in rated])
+
+    rows = []
+    for class_key, class_data in kb['classes'].items():
+        for subclass in class_data['subclasses']:
+            for build, level in zip(class_data['builds'][subclass], levels):
+                rows.append((class_key, subclass, build, level))
+
+    matrix = np.zeros((len(rows), len(columns)), dtype=np.float32)
+    primary = np.zeros((len(rows), len(playstyles)), dtype=bool)
+    offered = {p: set(kb['playstyle_classes'].get(p, ())) for p in playstyles}
+    for i, (class_key, subclass, build, level) in enumerate(rows):
+        class_data = kb['classes'][class_key]
+        own = [class_data['playstyle']] + class_data.get('also_playstyles', [])
+        for j, playstyle in enumerate(playstyles):
+            matrix[i, j] = class_key in offered[playstyle]
+            primary[i, j] = playstyle in own
+        matrix[i, len(playstyles) + levels.index(level)] = 1
+        values = ratings.get(build, {})
+        for j, name in enumerate(rated):
+            matrix[i, len(playstyles) + len(levels) + j] = values.get(name, DEFAULT_RATING)
+    return {'matrix': matrix, 'primary': primary, 'rows': rows, 'columns': columns}
+
+
+class BuildRanker:
+    """Ранжирование всего каталога билдов по взвешенным предпочтениям
+
+    Профиль пользователя превращается в вектор весов по столбцам матрицы
+    признаков, и оценки всех билдов - одно произведение матрицы на вектор.
+    Много профилей - одно произведение матриц. Лучшие k выбираются
+    argpartition без полной сортировки каталога. Равные оценки упорядочены:
+    сначала билды классов, для которых стиль игры профиля основной, затем по
+    порядку каталога.
+    """
+
+    def __init__(self, features):
+        self.matrix = features['matrix']
+        self.primary = features['primary']
+        self.rows = features['rows']
+        self.columns = features['columns']
+        self._column = {column: j for j, column in enumerate(self.columns)}
+        self.playstyles = [value for name, value in self.columns if name == 'playstyle']
+        self.budget_levels = [value for name, value in self.columns if name == 'budget']
+
+    def profile_vector(self, profile):
+        """Вектор весов по профилю
+
+        profile - словарь: 'playstyle' и 'budget' - ответы пользователя,
+        'defense', 'clear_speed', 'bossing' - желаемая важность от 0 до 1
+        (без оценок в базе знаний не влияет), 'weights' - необязательные
+        веса критериев вместо DEFAULT_WEIGHTS.
+        """
+        weights = dict(DEFAULT_WEIGHTS, **profile.get('weights', {}))
+        vector = np.zeros(len(self.columns), dtype=np.float32)
+
+        playstyle = profile.get('playstyle')
+        if ('playstyle', playstyle) in self._column:
+            vector[self._column['playstyle', playstyle]] = weights['playstyle']
+
+        budget = profile.get('budget')
+        if budget in self.budget_levels:
+            limit = self.budget_levels.index(budget)
+            for i, level in enumerate(self.budget_levels):
+                match = 1.0 if i == limit else CHEAPER_BUDGET_MATCH if i < limit else 0.0
+                vector[self._column['budget', level]] = weights['budget'] * match
+
+        for name in RATINGS:
+            if (name, None) in self._column:
+                vector[self._column[name, None]] = weights[name] * profile.get(name, 0.0)
+        return vector
+
+    def scores(self, profile):
+        return self.matrix @ self.profile_vector(profile)
+
+    def top(self, profile, k=5, exclude=()):
+        """Лучшие билды: [(класс, подкласс, билд, оценка), ...]"""
+        return self.top_many([profile], k, exclude)[0]
+
+    def top_many(self, profiles, k=5, exclude=(), block=256):
+        """Пакет профилей: столбцы весов собираются в матрицу и умножаются за раз
+
+        Профили обрабатываются блоками, чтобы матрица оценок (профили x билды)
+        не разрасталась на больших каталогах. k больше каталога - весь каталог.
+        """
+        if k < 1:
+            raise ValueError(f'k: ожидается целое не меньше 1, получено {k}')
+        if not profiles or not self.rows:
+            return [[] for _ in profiles]
+        skip = [i for i, row in enumerate(self.rows) if row[2] in exclude] if exclude else []
+        k = min(k, len(self.rows))
+        no_primary = np.zeros(len(self.rows), dtype=bool)
+        results = []
+        for start in range(0, len(profiles), block):
+            chunk = profiles[start:start + block]
+            vectors = np.stack([self.profile_vector(p) for p in chunk])
+            # Строка - профиль: argpartition по непрерывной строке быстрее, чем по столбцу
+            scores = vectors @ self.matrix.T
+            scores[:, skip] = -np.inf
+            # k-я по величине оценка каждого профиля: всё, что не ниже, - кандидаты
+            kth = np.partition(scores, len(self.rows) - k, axis=1)[:, len(self.rows) - k]
+            for profile, row, threshold in zip(chunk, scores, kth.tolist()):
+                ids = np.flatnonzero(row >= threshold)
+                playstyle = profile.get('playstyle')
+                primary = (self.primary[:, self.playstyles.index(playstyle)]
+                           if playstyle in self.playstyles else no_primary)
+                # Оценка по убыванию, затем основной стиль игры, затем порядок каталога
+                ids = ids[np.lexsort((ids, ~primary[ids], -row[ids]))][:k]
+                results.append([self.rows[i][:3] + (float(row[i]),)
+                                for i in ids.tolist() if row[i] != -np.inf])
+        return results
+
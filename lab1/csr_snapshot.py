@@ -0,0 +1,225 @@
+import bisect
+import os
+from array import array
+
+import numpy as np
+
+from network_io import DEFAULT_RELATION, is_binary_network, iter_json_network, read_binary_arrays
+
+# Файлы снимка внутри каталога; каждый массив лежит отдельным .npy для np.load(mmap_mode='r')
+_ARRAYS = ('names_blob', 'names_offsets', 'relations_blob', 'relations_offsets',
+           'fwd_indptr', 'fwd_indices', 'fwd_relation',
+           'rev_indptr', 'rev_indices', 'rev_relation')
+
+
+class GraphSnapshot:
+    """Неизменяемый снимок сети в формате CSR
+
+    Узлы пронумерованы в порядке сортировки имён, поэтому имя переводится в номер
+    двоичным поиском прямо по массиву строк - без словаря на все узлы. Прямые и
+    обратные связи хранятся массивами indptr/indices, тип связи - отдельным массивом.
+    """
+
+    def __init__(self, arrays):
+        for key in _ARRAYS:
+            setattr(self, key, arrays[key])
+        self.names = _StringView(self.names_blob, self.names_offsets)
+        self.relations = _StringView(self.relations_blob, self.relations_offsets)
+
+    # --- построение -------------------------------------------------------------
+
+    @classmethod
+    def from_graph(cls, G):
+        relation_of = (d.get('relation', '') for _, _, d in G.edges(data=True))
+        return cls._build(list(G.nodes()),
+                          ((u, v, r) for (u, v), r in zip(G.edges(), relation_of)))
+
+    @classmethod
+    def from_file(cls, filename):
+        """Строит снимок прямо из файла сети, минуя networkx"""
+        if is_binary_network(filename):
+            strings, node_names, _, src, dst, rel, _ = read_binary_arrays(filename)
+            names = [strings[i] for i in node_names.tolist()]
+            return cls._build(names, ((names[u], names[v], strings[r] if r >= 0 else '')
+                                      for u, v, r in zip(src.tolist(), dst.tolist(), rel.tolist())))
+
+        def items(section):
+            for kind, item in iter_json_network(filename):
+                if kind == section:
+                    yield item
+
+        nodes = (item[0] if isinstance(item, list) and len(item) == 2 and isinstance(item[1], dict)
+                 else item for item in items('nodes'))
+        edges = ((item[0], item[1], item[2].get('relation', '') if len(item) == 3 else DEFAULT_RELATION)
+                 for item in items('edges'))
+        return cls._build(nodes, edges)
+
+    @classmethod
+    def _build(cls, nodes, edges):
+        ids = {}
+        for node in nodes:
+            ids.setdefault(str(node), len(ids))
+
+        # Номера копим в компактных array, а не в списках Python
+        src, dst, rel = array('q'), array('q'), array('q')
+        relation_ids = {}
+        for u, v, relation in edges:
+            src.append(ids.setdefault(str(u), len(ids)))
+            dst.append(ids.setdefault(str(v), len(ids)))
+            rel.append(relation_ids.setdefault(relation, len(relation_ids)))
+
+        # Перенумерация узлов и связей в порядке сортировки имён
+        names = sorted(ids)
+        remap = np.empty(len(ids), dtype=np.int64)
+        remap[[ids[name] for name in names]] = np.arange(len(names))
+        relations = sorted(relation_ids)
+        rel_remap = np.empty(len(relation_ids), dtype=np.int64)
+        rel_remap[[relation_ids[r] for r in relations]] = np.arange(len(relations))
+        del ids
+
+        src = remap[np.frombuffer(src, dtype=np.int64)] if len(src) else np.empty(0, dtype=np.int64)
+        dst = remap[np.frombuffer(dst, dtype=np.int64)] if len(dst) else np.empty(0, dtype=np.int64)
+        rel = rel_remap[np.frombuffer(rel, dtype=np.int64)] if len(rel) else np.empty(0, dtype=np.int64)
+
+        arrays = {}
+        arrays['names_blob'], arrays['names_offsets'] = _pack_strings(names)
+        arrays['relations_blob'], arrays['relations_offsets'] = _pack_strings(relations)
+        index_dtype = np.int32 if len(names) < 2 ** 31 else np.int64
+        for prefix, a, b in (('fwd', src, dst), ('rev', dst, src)):
+            order = np.lexsort((b, a))
+            arrays[prefix + '_indptr'] = np.concatenate(
+                ([0], np.cumsum(np.bincount(a, minlength=len(names))))).astype(np.int64)
+            arrays[prefix + '_indices'] = b[order].astype(index_dtype)
+            arrays[prefix + '_relation'] = rel[order].astype(np.int32)
+        return cls(arrays)
+
+    # --- сохранение -------------------------------------------------------------------
+
+    def save(self, dirname):
+        os.makedirs(dirname, exist_ok=True)
+        for key in _ARRAYS:
+            np.save(os.path.join(dirname, key + '.npy'), np.asarray(getattr(self, key)))
+
+    @classmethod
+    def load(cls, dirname, mmap=True):
+        """Открывает снимок; с mmap=True данные не копируются и читаются с диска по мере надобности"""
+        mode = 'r' if mmap else None
+        return cls({key: np.load(os.path.join(dirname, key + '.npy'), mmap_mode=mode)
+                    for key in _ARRAYS})
+
+    # --- запросы ---------------------------------------------------------------------
+
+    def number_of_nodes(self):
+        return len(self.fwd_indptr) - 1
+
+    def number_of_edges(self):
+        return len(self.fwd_indices)
+
+    def node_id(self, name):
+        i = bisect.bisect_left(self.names, name)
+        if i < len(self.names) and self.names[i] == name:
+            return i
+        raise KeyError(name)
+
+    def relation_id(self, relation):
+        i = bisect.bisect_left(self.relations, relation)
+        if i < len(self.relations) and self.relations[i] == relation:
+            return i
+        return -1
+
+    def __contains__(self, name):
+        try:
+            self.node_id(name)
+            return True
+        except KeyError:
+            return False
+
+    def successors(self, name, relation=None):
+        return self._neighbours(name, relation, reverse=False)
+
+    def predecessors(self, name, relation=None):
+        return self._neighbours(name, relation, reverse=True)
+
+    def out_degree(self, name=None):
+        """Степень узла или массив степеней всех узлов"""
+        degrees = np.diff(self.fwd_indptr)
+        return degrees if name is None else int(degrees[self.node_id(name)])
+
+    def in_degree(self, name=None):
+        degrees = np.diff(self.rev_indptr)
+        return degrees if name is None else int(degrees[self.node_id(name)])
+
+    def neighbour_ids(self, node_id, relation=None, reverse=False):
+        indptr, indices, relations = self._csr(reverse)
+        start, stop = indptr[node_id], indptr[node_id + 1]
+        result = indices[start:stop]
+        if relation is not None:
+            result = result[relations[start:stop] == self.relation_id(relation)]
+        return result
+
+    def bfs(self, source, max_depth=None, relation=None, reverse=False):
+        """Обход в ширину: {имя: глубина}"""
+        ids, depths = self.bfs_ids(self.node_id(source), max_depth, relation, reverse)
+        return {self.names[i]: int(d) for i, d in zip(ids.tolist(), depths.tolist())}
+
+    def bfs_ids(self, source_id, max_depth=None, relation=None, reverse=False):
+        """Обход в ширину по номерам: весь фронт раскрывается одной векторной операцией"""
+        indptr, indices, relations = self._csr(reverse)
+        rel_id = self.relation_id(relation) if relation is not None else None
+        visited = np.zeros(self.number_of_nodes(), dtype=bool)
+        visited[source_id] = True
+        frontier = np.array([source_id], dtype=np.int64)
+        found, depths = [frontier], [np.zeros(1, dtype=np.int64)]
+
+        depth = 0
+        while len(frontier) and (max_depth is None or depth < max_depth):
+            depth += 1
+            starts = indptr[frontier]
+            counts = indptr[frontier + 1] - starts
+            total = int(counts.sum())
+            if total == 0:
+                break
+            # Номера всех рёбер фронта: start_i, start_i + 1, ..., start_i + count_i - 1
+            edge_ids = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+            targets = np.asarray(indices[edge_ids], dtype=np.int64)
+            if rel_id is not None:
+                targets = targets[relations[edge_ids] == rel_id]
+            targets = np.unique(targets[~visited[targets]])
+            visited[targets] = True
+            frontier = targets
+            found.append(targets)
+            depths.append(np.full(len(targets), depth, dtype=np.int64))
+
+        return np.concatenate(found), np.concatenate(depths)
+
+    def _csr(self, reverse):
+        if reverse:
+            return self.rev_indptr, self.rev_indices, self.rev_relation
+        return self.fwd_indptr, self.fwd_indices, self.fwd_relation
+
+    def _neighbours(self, name, relation, reverse):
+        ids = self.neighbour_ids(self.node_id(name), relation, reverse)
+        return [self.names[i] for i in ids.tolist()]
+
+
+class _StringView:
+    """Последовательность строк поверх байтового массива и смещений (без копирования)"""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.blob[start:stop]).decode('utf-8')
+
+
+def _pack_strings(strings):
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8).copy(), offsets
+
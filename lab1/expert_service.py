@@ -0,0 +1,325 @@
+# Экспертная система без диалога: пакетный режим JSONL и локальный сервер
+#
+# Примеры:
+#   python expert_service.py batch answers.jsonl -o recommendations.jsonl
+#   echo '{"playstyle": "melee combat", "budget": "medium (a few divine orbs)"}' | python expert_service.py batch
+#   python expert_service.py serve --port 8765
+#   python expert_service.py serve --unix /tmp/poe_expert.sock
+#   python expert_service.py --trace trace.folded batch answers.jsonl
+#
+# Запрос - одна строка JSON, ответ - одна строка JSON в том же порядке.
+# Операции ("op"):
+#   recommend (по умолчанию) - playstyle, budget и, если известны, class и subclass;
+#   explain - build: при каких ответах билд рекомендуется и почему;
+#   search - query: похожие названия билдов;
+#   filter - фасеты class, subclass, playstyle, budget, tag (значение или список),
+#            budget_max и exclude: билды каталога под фильтр и счётчики по фасетам;
+#   stats - гистограмма задержек сервера, счётчики кэша выводов и, при
+#           трассировке, время по участкам.
+# Поле "id" запроса возвращается в ответе без изменений. База знаний
+# загружается один раз и общая для всех запросов и соединений. С --trace
+# участки и объяснения рекомендаций пишутся в файл при завершении (формат
+# как у lab2.py --trace).
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from backward import explain
+from knowledge_base import DEFAULT_KNOWLEDGE_FILE, KnowledgeBase
+from lab2 import ExpertSession
+from recommendation_cache import RecommendationCache
+from tracing import DISABLED, Tracer
+
+
+class LatencyHistogram:
+    """Задержки по корзинам-степеням двойки в микросекундах"""
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        micros = max(1, int(seconds * 1e6))
+        bucket = 1 << (micros - 1).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q):
+        """Верхняя граница корзины, в которую попадает q-я доля запросов (мкс)"""
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= q * self.count:
+                return bucket
+        return None
+
+    def snapshot(self):
+        return {'count': self.count,
+                'mean_us': self.total / self.count * 1e6 if self.count else None,
+                'p50_us': self.percentile(0.5), 'p90_us': self.percentile(0.9),
+                'p99_us': self.percentile(0.99),
+                # Ключ - верхняя граница корзины в микросекундах
+                'buckets_us': {str(b): self.buckets[b] for b in sorted(self.buckets)}}
+
+
+class ExpertService:
+    """Обработка запросов над одной загруженной базой знаний
+
+    tracer (tracing.Tracer) общий для всех запросов: сеансы рекомендаций
+    пишут в него те же участки, что и в диалоге lab2.py, а поиск, объяснение
+    и фильтр - свои.
+    """
+
+    def __init__(self, kb, tracer=None):
+        self.kb = kb
+        self.tracer = tracer if tracer is not None else DISABLED
+        self.latency = LatencyHistogram()
+        self.cache = RecommendationCache()
+        self.operations = {'recommend': self.recommend, 'explain': self.explain,
+                           'search': self.search, 'filter': self.filter, 'stats': self.stats}
+
+    def handle(self, request):
+        """Ответ на разобранный запрос; ошибки запроса возвращаются в поле error"""
+        start = time.perf_counter()
+        if not isinstance(request, dict):
+            response = {'error': 'запрос должен быть объектом JSON'}
+        else:
+            try:
+                name = _string(request, 'op') or 'recommend'
+                operation = self.operations.get(name)
+                response = operation(request) if operation else {'error': f'неизвестная операция: {name}'}
+            except ValueError as e:
+                response = {'error': str(e)}
+            except Exception as e:
+                # Сбой обработки не должен ронять сервер или пакет - отвечаем ошибкой на этот запрос
+                response = {'error': f'внутренняя ошибка: {type(e).__name__}: {e}'}
+            if 'id' in request:
+                response['id'] = request['id']
+        self.latency.record(time.perf_counter() - start)
+        return response
+
+    def handle_line(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {'error': f'не JSON: {e}'}
+        else:
+            response = self.handle(request)
+        return json.dumps(response, ensure_ascii=False)
+
+    # --- операции --------------------------------------------------------------------
+
+    def recommend(self, request):
+        top = _positive_int(request, 'top', 3)
+        session = ExpertSession(self.kb, self.cache, self.tracer)
+        for key, options in (('playstyle', self.kb.playstyles), ('budget', self.kb.budget_levels)):
+            value = _string(request, key)
+            if value is None:
+                continue
+            if value not in options:
+                raise ValueError(f'{key}: допустимо одно из {options}')
+            session.answer(key, value)
+
+        response = {'class_options': session.class_options()}
+        class_key = _string(request, 'class')
+        if class_key is not None:
+            if class_key not in session.available_classes:
+                raise ValueError(f'class: допустимо одно из {session.available_classes}')
+            session.choose_class(class_key)
+            subclass = _string(request, 'subclass')
+            if subclass is not None:
+                if subclass not in self.kb.classes[class_key]['subclasses']:
+                    raise ValueError(f'subclass: допустимо одно из {self.kb.classes[class_key]["subclasses"]}')
+                session.choose_subclass(subclass)
+                session.selected_build = session.recommended_build()
+                response['build'] = session.selected_build
+                response['advice'] = session.advice()
+                if self.tracer.enabled:
+                    self.tracer.explain(session.selected_build, session.why(),
+                                        preferences=dict(session.user_preferences),
+                                        selected_class=class_key, subclass=subclass)
+        response['alternatives'] = [{'class': c, 'subclass': s, 'build': b, 'score': round(score, 4)}
+                                    for c, s, b, score in session.top_builds(top)]
+        return response
+
+    def explain(self, request):
+        build = _string(request, 'build', required=True)
+        with self.tracer.span('build_lookup'):
+            info = self.kb.build_info.get(build.strip().lower())
+        if info is None:
+            with self.tracer.span('fuzzy_search'):
+                similar = self.kb.build_search.search(build, 3)
+            return {'found': False, 'similar': [self.kb.build_info[name]['full_build_name'] for name, _ in similar]}
+        with self.tracer.span('backward_proof'):
+            answers = self.kb.prover.prove(('recommended_build', info['full_build_name']))
+        return {'found': True, 'build': info['full_build_name'],
+                'answers': [{'assumptions': dict(answer.assumptions), 'why': explain(answer.proof)}
+                            for answer in answers]}
+
+    def search(self, request):
+        query = _string(request, 'query', required=True)
+        top = _positive_int(request, 'top', 5)
+        with self.tracer.span('fuzzy_search'):
+            matches = self.kb.build_search.search(query, top)
+        return {'matches': [{'build': self.kb.build_info[name]['full_build_name'], 'score': round(score, 4)}
+                            for name, score in matches]}
+
+    def filter(self, request):
+        facets = self.kb.facets
+        filters = {facet: _values(request, facet) for facet in facets.facets if facet in request}
+        budget_max = _string(request, 'budget_max')
+        if budget_max is not None and budget_max not in self.kb.budget_levels:
+            raise ValueError(f'budget_max: допустимо одно из {self.kb.budget_levels}')
+        exclude = request.get('exclude')
+        if exclude is not None:
+            if not isinstance(exclude, dict):
+                raise ValueError('exclude: ожидается объект {фасет: значения}')
+            exclude = {facet: _values(exclude, facet, 'exclude.') for facet in exclude}
+        limit = _positive_int(request, 'limit', 50)
+        counts = _values(request, 'counts') or ()
+        unknown = [facet for facet in counts if facet not in facets.facets]
+        if unknown:
+            raise ValueError(f'counts: неизвестные фасеты {unknown}, допустимы {list(facets.facets)}')
+        with self.tracer.span('facet_filter'):
+            bits = facets.query(budget_max=budget_max, exclude=exclude, **filters)
+        return {'count': facets.count(bits),
+                'builds': [{'class': c, 'subclass': s, 'build': b, 'budget': level}
+                           for c, s, b, level in facets.builds(bits)[:limit]],
+                'facet_counts': {facet: facets.facet_counts(bits, facet) for facet in counts}}
+
+    def stats(self, request):
+        response = {'latency': self.latency.snapshot(), 'cache': self.cache.stats(), 'league': self.kb.league,
+                    'kb_version': self.kb.version}
+        if self.tracer.enabled:
+            response['spans'] = self.tracer.summary()
+        return response
+
+
+# Проверка полей запроса: неверный тип - ValueError с именем поля
+
+def _string(request, name, required=False):
+    value = request.get(name)
+    if value is None:
+        if required:
+            raise ValueError(f'{name}: обязательное поле')
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f'{name}: ожидается строка')
+    return value
+
+
+def _values(request, name, prefix=''):
+    """Строка или список строк - всегда как список"""
+    value = request.get(name)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f'{prefix}{name}: ожидается строка или список строк')
+    return value
+
+
+def _positive_int(request, name, default):
+    value = request.get(name, default)
+    # bool в Python - тоже int, но true вместо числа - ошибка запроса
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f'{name}: ожидается целое не меньше 1')
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Пакетный режим
+
+def run_batch(service, lines, out):
+    for line in lines:
+        if line.strip():
+            out.write(service.handle_line(line) + '\n')
+
+
+# ---------------------------------------------------------------------------
+# Сервер
+
+async def handle_connection(service, reader, writer):
+    """Строки запросов читаются подряд: клиент может слать следующие, не дожидаясь ответов"""
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                writer.write(service.handle_line(line.decode('utf-8', errors='replace')).encode('utf-8') + b'\n')
+                # drain ждёт, только если клиент не успевает забирать ответы
+                await writer.drain()
+    except (ConnectionResetError, BrokenPipeError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host='127.0.0.1', port=8765, unix=None, ready=None):
+    handler = lambda reader, writer: handle_connection(service, reader, writer)
+    if unix:
+        server = await asyncio.start_unix_server(handler, path=unix)
+    else:
+        server = await asyncio.start_server(handler, host, port)
+    if ready is not None:
+        ready(server)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Экспертная система без диалога')
+    parser.add_argument('--kb', default=DEFAULT_KNOWLEDGE_FILE, help='файл базы знаний')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='трассировка правил и запросов; .folded/.txt - для flamegraph, иначе JSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    batch = commands.add_parser('batch', help='JSONL-запросы -> JSONL-ответы')
+    batch.add_argument('input', nargs='?', default='-', help='файл запросов (по умолчанию stdin)')
+    batch.add_argument('-o', '--output', default='-', help='файл ответов (по умолчанию stdout)')
+
+    server = commands.add_parser('serve', help='локальный сервер')
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=8765)
+    server.add_argument('--unix', help='путь к Unix-сокету вместо TCP')
+
+    args = parser.parse_args(argv)
+    service = ExpertService(KnowledgeBase.from_file(args.kb), Tracer(enabled=bool(args.trace)))
+    try:
+        return run_command(service, args)
+    finally:
+        if args.trace:
+            service.tracer.save(args.trace)
+
+
+def run_command(service, args):
+    if args.command == 'batch':
+        source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+        out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+        try:
+            run_batch(service, source, out)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if out is not sys.stdout:
+                out.close()
+        print(json.dumps(service.latency.snapshot(), ensure_ascii=False), file=sys.stderr)
+        return 0
+
+    where = args.unix or f'{args.host}:{args.port}'
+    print(f'Сервер на {where}', file=sys.stderr)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
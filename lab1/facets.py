@@ -0,0 +1,121 @@
+import numpy as np
+
+FACETS = ('class', 'subclass', 'playstyle', 'budget', 'tag')
+
+
+def build_facet_index(kb, rows):
+    """Битовые множества билдов по значениям фасетов
+
+    rows - строки каталога (класс, подкласс, билд, уровень бюджета) в том же
+    порядке, что и в матрице признаков; бит i множества - билд rows[i].
+    Теги берутся из необязательного раздела build_tags: {"билд": ["trap", ...]}.
+    """
+    offered = {}
+    for playstyle, classes in kb['playstyle_classes'].items():
+        for class_key in classes:
+            offered.setdefault(class_key, []).append(playstyle)
+    tags = kb.get('build_tags', {})
+
+    positions = {facet: {} for facet in FACETS}
+
+    def add(facet, value, i):
+        positions[facet].setdefault(value, []).append(i)
+
+    for i, (class_key, subclass, build, level) in enumerate(rows):
+        add('class', class_key, i)
+        add('subclass', subclass, i)
+        add('budget', level, i)
+        for playstyle in offered.get(class_key, ()):
+            add('playstyle', playstyle, i)
+        for tag in tags.get(build, ()):
+            add('tag', tag, i)
+    facets = {facet: {value: _bitset(ids, len(rows)) for value, ids in values.items()}
+              for facet, values in positions.items()}
+    return {'rows': rows, 'facets': facets, 'budget_levels': list(kb['budget_levels'])}
+
+
+def _bitset(ids, size):
+    """Целое с единицами в битах ids; собирается за один проход, без OR по растущему числу"""
+    flags = np.zeros(size, dtype=np.uint8)
+    flags[ids] = 1
+    return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
+
+
+class FacetIndex:
+    """Запросы-фильтры по фасетам каталога через пересечение и объединение битовых множеств
+
+    Множество - целое Python: объединение значений одного фасета - OR,
+    условия разных фасетов - AND. Стоимость операции зависит от числа
+    фасетов в запросе и длины множества в машинных словах, а не от перебора
+    билдов.
+    """
+
+    def __init__(self, index):
+        self.rows = index['rows']
+        self.facets = index['facets']
+        self.budget_levels = index['budget_levels']
+        self.all = (1 << len(self.rows)) - 1
+
+    def bits(self, facet, values):
+        """Билды, у которых фасет принимает любое из значений"""
+        if isinstance(values, str):
+            values = [values]
+        table = self.facets[facet]
+        result = 0
+        for value in values:
+            result |= table.get(value, 0)
+        return result
+
+    def query(self, budget_max=None, exclude=None, **filters):
+        """Множество билдов под фильтры: query(class_=['templar', 'scion'], playstyle='spellcasting')
+
+        Имена фасетов, совпадающие со словами Python, пишутся с подчёркиванием
+        (class_). budget_max - все уровни бюджета не дороже указанного;
+        exclude - {фасет: значения}, которые нужно исключить. Неизвестный
+        фасет или уровень бюджета - ValueError.
+        """
+        if exclude is None:
+            exclude = {}
+        elif not isinstance(exclude, dict):
+            raise ValueError('exclude: ожидается объект {фасет: значения}')
+        result = self.all
+        for facet, values in filters.items():
+            result &= self.bits(self._facet(facet), values)
+        if budget_max is not None:
+            if budget_max not in self.budget_levels:
+                raise ValueError(f'budget_max: допустимо одно из {self.budget_levels}')
+            limit = self.budget_levels.index(budget_max)
+            result &= self.bits('budget', self.budget_levels[:limit + 1])
+        for facet, values in exclude.items():
+            result &= ~self.bits(self._facet(facet, 'exclude.'), values)
+        return result
+
+    def _facet(self, name, prefix=''):
+        facet = name.rstrip('_')
+        if facet not in self.facets:
+            raise ValueError(f'{prefix}{name}: неизвестный фасет, допустимы {list(self.facets)}')
+        return facet
+
+    def members(self, bits):
+        """Номера строк каталога в множестве"""
+        if not bits:
+            return []
+        data = np.frombuffer(bits.to_bytes((len(self.rows) + 7) // 8, 'little'), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(data, bitorder='little')).tolist()
+
+    def builds(self, bits):
+        """Строки каталога (класс, подкласс, билд, уровень бюджета) из множества"""
+        return [self.rows[i] for i in self.members(bits)]
+
+    def count(self, bits):
+        return bin(bits).count('1')
+
+    def facet_counts(self, bits, facet):
+        """Сколько билдов множества приходится на каждое значение фасета - для уточнения фильтра"""
+        counts = {}
+        for value, value_bits in self.facets[facet].items():
+            count = self.count(bits & value_bits)
+            if count:
+                counts[value] = count
+        return counts
+
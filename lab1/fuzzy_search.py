@@ -0,0 +1,163 @@
+import heapq
+from collections import Counter
+
+
+class FuzzyIndex:
+    """Поиск по названиям с опечатками
+
+    Два индекса строятся один раз при добавлении названий:
+    - удаления в духе SymSpell: для начала каждого слова и названия целиком
+      запоминаются все варианты с одним-двумя удалёнными символами; запрос
+      порождает свои удаления, и пересечение сразу даёт кандидатов на
+      расстоянии правки не больше max_distance - без перебора всего каталога;
+    - списки триграмм символов: находят названия по части ("arrow", "trap")
+      и ранжируют их по доле общих триграмм.
+    Кандидаты проверяются точным расстоянием Дамерау-Левенштейна.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        # Удаления берутся только из начала слова - индекс не раздувается на длинных названиях
+        self.prefix_length = prefix_length
+        self.names = []
+        self._ids = {}
+        self._deletes = {}
+        self._words = {}
+        self._grams = {}
+        self._gram_counts = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        name = normalize(name)
+        if not name or name in self._ids:
+            return
+        term_id = len(self.names)
+        self.names.append(name)
+        self._ids[name] = term_id
+
+        for word in set(name.split()) | {name}:
+            words = self._words.setdefault(word, set())
+            if not words:
+                for variant in _deletes(word[:self.prefix_length], self.max_distance):
+                    self._deletes.setdefault(variant, set()).add(word)
+            words.add(term_id)
+        grams = set(_trigrams(name))
+        self._gram_counts.append(len(grams))
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(term_id)
+
+    def search(self, query, top=5):
+        """Лучшие совпадения: [(название, оценка от 0 до 1), ...]"""
+        query = normalize(query)
+        if not query:
+            return []
+        scores = {}
+
+        def offer(term_id, score):
+            if score > scores.get(term_id, 0):
+                scores[term_id] = score
+
+        if query in self._ids:
+            offer(self._ids[query], 1.0)
+
+        # Опечатки: название целиком и отдельные слова запроса
+        for part in set(query.split()) | {query}:
+            weight = 1.0 if part == query else 0.9
+            for word, distance in self._close_words(part):
+                score = weight * (1 - distance / max(len(word), len(part)))
+                for term_id in self._words[word]:
+                    name = self.names[term_id]
+                    # Совпавшее слово длинного названия весит меньше совпадения названия целиком
+                    offer(term_id, score if word == name else score * (0.7 + 0.2 * len(word) / len(name)))
+
+        # Части названий: доля общих триграмм (коэффициент Дайса)
+        grams = sorted(set(_trigrams(query)), key=lambda gram: len(self._grams.get(gram, ())))
+        # Нужна хотя бы половина триграмм запроса - значит, название есть в одном из
+        # самых редких списков, и частые списки ("  a", "er ") перебирать не нужно
+        needed = (len(grams) + 1) // 2
+        candidates = set()
+        for gram in grams[:len(grams) - needed + 1]:
+            candidates.update(self._grams.get(gram, ()))
+        shared_counts = Counter()
+        for gram in grams:
+            shared_counts.update(candidates.intersection(self._grams.get(gram, ())))
+        for term_id, shared in shared_counts.items():
+            if shared < needed:
+                continue
+            name = self.names[term_id]
+            dice = 2 * shared / (len(grams) + self._gram_counts[term_id])
+            # Запрос целиком внутри названия ценится выше простого сходства
+            if query in name:
+                dice = max(dice, 0.5 + 0.4 * len(query) / len(name))
+            offer(term_id, dice)
+
+        best = heapq.nlargest(top, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.names[term_id], score) for term_id, score in best if score > 0.3]
+
+    def _close_words(self, part):
+        """Слова индекса на расстоянии правки не больше max_distance от part"""
+        # В коротких словах две правки превращают что угодно во что угодно
+        limit = 1 if len(part) <= 4 else self.max_distance
+        candidates = set()
+        for variant in _deletes(part[:self.prefix_length], limit):
+            candidates.update(self._deletes.get(variant, ()))
+        for word in candidates:
+            if abs(len(word) - len(part)) > limit:
+                continue
+            distance = edit_distance(part, word, limit)
+            if distance <= limit:
+                yield word, distance
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def _deletes(word, depth):
+    """Слово и все его варианты без depth и меньше символов"""
+    result = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        result |= frontier
+    return result
+
+
+def _trigrams(text):
+    padded = f'  {text} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a, b, limit=None):
+    """Расстояние Дамерау-Левенштейна (перестановка соседних символов - одна правка)
+
+    При заданном limit считается только полоса шириной limit вокруг диагонали,
+    а счёт обрывается, как только расстояние заведомо больше limit.
+    """
+    if limit is None:
+        limit = max(len(a), len(b))
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    big = limit + 1
+    previous2 = None
+    previous = [j if j <= limit else big for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [big] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cost = a[i - 1] != b[j - 1]
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and j > 1 and a[i - 1] == b[j - 2]
+                    and a[i - 2] == b[j - 1]):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            best = min(best, value)
+        if best > limit:
+            return big
+        previous2, previous = previous, current
+    return min(previous[-1], big)
+
@@ -0,0 +1,255 @@
+ISA_RELATIONS = ('является',)
+# Отрицательная связь ("не умеет") отменяет унаследованное свойство - случай пингвина
+NEGATION_PREFIX = 'не '
+
+
+class InheritanceIndex:
+    """Индекс достижимости по связи "является" и вывод наследуемых свойств с исключениями
+
+    Предки и потомки каждого узла хранятся битовыми масками (int), поэтому проверка
+    is-a и поиск ближайшего утверждения о свойстве не требуют обхода графа.
+    """
+
+    def __init__(self, G, isa_relations=ISA_RELATIONS):
+        self.G = G
+        self.isa_relations = set(isa_relations)
+        self.stale = True
+
+    # --- построение ---------------------------------------------------------------
+
+    def rebuild(self):
+        self.ids = {}
+        self.nodes = []
+        self._free = []
+        self.parents = []
+        self.children = []
+        self.anc = []
+        self.desc = []
+        # (связь, значение) -> маска узлов с положительным / отрицательным утверждением
+        self.positive = {}
+        self.negative = {}
+        self.edge_relation = {}
+        self.out_props = []
+        self.in_props = []
+
+        for node in self.G.nodes():
+            self._id(node)
+        for u, v, data in self.G.edges(data=True):
+            self._add_edge(u, v, data.get('relation', ''), propagate=False)
+
+        # Замыкание считаем один раз для всех узлов
+        everyone = set(range(len(self.nodes)))
+        self._relax(everyone, self.parents, self.anc)
+        self._relax(everyone, self.children, self.desc)
+        self.stale = False
+
+    def _ensure(self):
+        if self.stale:
+            self.rebuild()
+
+    def invalidate(self):
+        """Сеть заменена целиком - индекс пересоберётся при первом запросе"""
+        self.stale = True
+
+    # --- инкрементальные изменения ------------------------------------------------
+
+    def add_node(self, node):
+        if not self.stale:
+            self._id(node)
+
+    def add_edge(self, u, v, relation=None):
+        if self.stale:
+            return
+        if relation is None:
+            relation = self.G.edges[u, v].get('relation', '')
+        self._add_edge(u, v, relation, propagate=True)
+
+    def remove_edge(self, u, v):
+        if self.stale or (u, v) not in self.edge_relation:
+            return
+        relation = self.edge_relation.pop((u, v))
+        a, b = self.ids[u], self.ids[v]
+
+        if relation in self.isa_relations:
+            self.parents[a].discard(b)
+            self.children[b].discard(a)
+            # Пересчитываем только потомков a и предков b - остальных удаление не касается
+            below = _bits(self.desc[a]) | {a}
+            above = _bits(self.anc[b]) | {b}
+            for i in below:
+                self.anc[i] = 0
+            for i in above:
+                self.desc[i] = 0
+            self._relax(below, self.parents, self.anc)
+            self._relax(above, self.children, self.desc)
+        else:
+            key, table = self._statement(relation, v)
+            table[key] &= ~(1 << a)
+            self.out_props[a].discard((relation, v))
+            self.in_props[b].discard((u, relation))
+
+    def remove_node(self, node):
+        if self.stale or node not in self.ids:
+            return
+        i = self.ids[node]
+        for p in list(self.parents[i]):
+            self.remove_edge(node, self.nodes[p])
+        for c in list(self.children[i]):
+            self.remove_edge(self.nodes[c], node)
+        for relation, value in list(self.out_props[i]):
+            self.remove_edge(node, value)
+        for subject, relation in list(self.in_props[i]):
+            self.remove_edge(subject, node)
+
+        del self.ids[node]
+        self.nodes[i] = None
+        self._free.append(i)
+
+    def apply(self, change):
+        """Принимает изменения в том же виде, что и журнал правок"""
+        kind = change[0]
+        if kind == 'add_node':
+            self.add_node(change[1])
+        elif kind == 'add_edge':
+            self.add_edge(change[1], change[2])
+        elif kind == 'remove_edge':
+            self.remove_edge(change[1], change[2])
+        elif kind == 'remove_node':
+            self.remove_node(change[1])
+        else:
+            self.invalidate()
+
+    # --- запросы -------------------------------------------------------------------
+
+    def is_a(self, x, y):
+        """Является ли x (транзитивно) разновидностью y"""
+        self._ensure()
+        if x not in self.ids or y not in self.ids:
+            return False
+        return x == y or bool(self.anc[self.ids[x]] >> self.ids[y] & 1)
+
+    def ancestors(self, x):
+        self._ensure()
+        return {self.nodes[i] for i in _bits(self.anc[self.ids[x]])} if x in self.ids else set()
+
+    def descendants(self, x):
+        self._ensure()
+        return {self.nodes[i] for i in _bits(self.desc[self.ids[x]])} if x in self.ids else set()
+
+    def has_property(self, x, relation, value):
+        """True/False по ближайшему утверждению среди x и его предков, None - если его нет
+
+        Более частное утверждение перекрывает общее: "пингвин не умеет летать"
+        сильнее, чем унаследованное "птица умеет летать". Если ближайшие утверждения
+        противоречат друг другу, ответ тоже None.
+        """
+        self._ensure()
+        if x not in self.ids:
+            return None
+        i = self.ids[x]
+        scope = self.anc[i] | (1 << i)
+        pos = self.positive.get((relation, value), 0) & scope
+        neg = self.negative.get((relation, value), 0) & scope
+        candidates = pos | neg
+        if not candidates:
+            return None
+
+        # Ближайшие утверждения - те, ниже которых в иерархии других утверждений нет
+        nearest = [c for c in _bits(candidates) if not self.desc[c] & candidates]
+        verdicts = {bool(pos >> c & 1) for c in nearest if not (pos >> c & 1 and neg >> c & 1)}
+        return verdicts.pop() if len(verdicts) == 1 else None
+
+    def properties(self, x):
+        """Все свойства x с учётом наследования: {(связь, значение): True/False}"""
+        self._ensure()
+        if x not in self.ids:
+            return {}
+        i = self.ids[x]
+        keys = set()
+        for j in _bits(self.anc[i] | (1 << i)):
+            for relation, value in self.out_props[j]:
+                keys.add((relation[len(NEGATION_PREFIX):] if relation.startswith(NEGATION_PREFIX)
+                          else relation, value))
+        result = {}
+        for relation, value in keys:
+            verdict = self.has_property(x, relation, value)
+            if verdict is not None:
+                result[(relation, value)] = verdict
+        return result
+
+    # --- внутреннее ------------------------------------------------------------------
+
+    def _id(self, node):
+        if node in self.ids:
+            return self.ids[node]
+        if self._free:
+            i = self._free.pop()
+            self.nodes[i] = node
+        else:
+            i = len(self.nodes)
+            self.nodes.append(node)
+            for table in (self.parents, self.children, self.out_props, self.in_props):
+                table.append(set())
+            self.anc.append(0)
+            self.desc.append(0)
+        self.ids[node] = i
+        self.parents[i], self.children[i] = set(), set()
+        self.out_props[i], self.in_props[i] = set(), set()
+        self.anc[i] = self.desc[i] = 0
+        return i
+
+    def _statement(self, relation, value):
+        if relation.startswith(NEGATION_PREFIX):
+            return (relation[len(NEGATION_PREFIX):], value), self.negative
+        return (relation, value), self.positive
+
+    def _add_edge(self, u, v, relation, propagate):
+        a, b = self._id(u), self._id(v)
+        if (u, v) in self.edge_relation:
+            self.remove_edge(u, v)
+        self.edge_relation[(u, v)] = relation
+
+        if relation in self.isa_relations:
+            self.parents[a].add(b)
+            self.children[b].add(a)
+            if propagate:
+                # Все потомки a получают в предки b и его предков, и наоборот
+                up = self.anc[b] | (1 << b)
+                down = self.desc[a] | (1 << a)
+                for i in _bits(down):
+                    self.anc[i] |= up
+                for i in _bits(up):
+                    self.desc[i] |= down
+        else:
+            key, table = self._statement(relation, v)
+            table[key] = table.get(key, 0) | (1 << a)
+            self.out_props[a].add((relation, v))
+            self.in_props[b].add((u, relation))
+
+    def _relax(self, nodes, links, table):
+        """Досчитывает маски для nodes по прямым связям до неподвижной точки (циклы допустимы)"""
+        scope = set(nodes)
+        reverse = self.children if links is self.parents else self.parents
+        pending = scope
+        while pending:
+            changed = set()
+            for i in pending:
+                mask = 0
+                for j in links[i]:
+                    mask |= table[j] | (1 << j)
+                if mask != table[i]:
+                    table[i] = mask
+                    changed.add(i)
+            # Пересчитать нужно тех, кто опирается на изменившиеся узлы
+            pending = {k for i in changed for k in reverse[i]} & scope
+
+
+def _bits(mask):
+    """Номера установленных битов маски"""
+    result = set()
+    while mask:
+        low = mask & -mask
+        result.add(low.bit_length() - 1)
+        mask ^= low
+    return result
+
@@ -0,0 +1,294 @@
+import json
+import os
+import threading
+
+from network_io import save_network_file
+
+JOURNAL_SUFFIX = '.journal'
+COMPACTING_SUFFIX = '.journal.compacting'
+
+
+class ChangeJournal:
+    """Журнал изменений сети: каждая операция дописывается в файл рядом с базовым
+
+    Отмена и повтор записываются в журнал как обратные операции, поэтому
+    воспроизведение журнала - это просто последовательное применение записей.
+    """
+
+    def __init__(self, G, compact_every=1000):
+        self.G = G
+        self.compact_every = compact_every
+        self.filename = None
+        self.seq = 0
+        self.base_seq = 0
+        self.applied = []
+        self.undone = []
+        self._file = None
+        self._compact_thread = None
+        # base_seq и last_error меняет поток сжатия
+        self._lock = threading.Lock()
+        self.last_error = None
+
+    # --- привязка к файлу ---------------------------------------------------
+
+    def attach(self, filename, base_seq=0, replay=True):
+        """Привязывает журнал к базовому файлу и досчитывает в граф незакомпактированные записи"""
+        self.detach()
+        self.filename = filename
+        self.seq = base_seq
+        with self._lock:
+            self.base_seq = base_seq
+        self.applied = []
+        self.undone = []
+
+        stale = os.path.exists(filename + COMPACTING_SUFFIX)
+        if replay:
+            for path in (filename + COMPACTING_SUFFIX, filename + JOURNAL_SUFFIX):
+                self._replay_file(path)
+        else:
+            self._remove_journals()
+
+        # Файл журнала открывается при первой записи: простая загрузка ничего не создаёт
+        if stale:
+            # Прошлое сжатие не завершилось - доводим его до конца сразу
+            self.compact(background=False)
+
+    def detach(self):
+        self.wait()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.filename = None
+
+    def pending(self):
+        """Сколько записей ещё не перенесено в базовый файл"""
+        with self._lock:
+            return self.seq - self.base_seq
+
+    def take_error(self):
+        """Ошибка последнего сжатия (и сброс её), если была"""
+        with self._lock:
+            error, self.last_error = self.last_error, None
+        return error
+
+    # --- операции -------------------------------------------------------------
+
+    def execute(self, op):
+        """Применяет операцию к графу, пишет её в журнал и возвращает список изменений"""
+        op = self._complete(op)
+        changes = self._apply(op)
+        self.applied.append(op)
+        self.undone = []
+        self._write(op, 'do')
+        return changes
+
+    def undo(self):
+        if not self.applied:
+            return None
+        op = self.applied[-1]
+        inverse = self._inverse(op)
+        if inverse is None:
+            return None
+        self.applied.pop()
+        changes = self._apply(inverse)
+        self.undone.append(op)
+        self._write(inverse, 'undo')
+        return changes
+
+    def redo(self):
+        if not self.undone:
+            return None
+        op = self.undone.pop()
+        if op['op'] == 'clear':
+            # Снимок для повторной отмены берём заново
+            op = self._complete({'op': 'clear'})
+        changes = self._apply(op)
+        self.applied.append(op)
+        self._write(op, 'redo')
+        return changes
+
+    # --- сжатие ------------------------------------------------------------------
+
+    def needs_compaction(self):
+        return (self.filename is not None and self.pending() >= self.compact_every
+                and not self.compacting())
+
+    def compacting(self):
+        return self._compact_thread is not None and self._compact_thread.is_alive()
+
+    def compact(self, background=True):
+        """Переносит накопленные изменения в базовый файл и начинает журнал заново"""
+        if self.filename is None:
+            return
+        self.wait()
+
+        # Снимок состояния на момент seq; новые записи пойдут уже в свежий журнал
+        snapshot = self.G.copy()
+        seq = self.seq
+        journal_path = self.filename + JOURNAL_SUFFIX
+        compacting_path = self.filename + COMPACTING_SUFFIX
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if not os.path.exists(journal_path):
+            open(compacting_path, 'a', encoding='utf-8').close()
+        elif os.path.exists(compacting_path):
+            # Хвост незавершённого сжатия объединяем с текущим журналом
+            with open(compacting_path, 'a', encoding='utf-8') as dst, \
+                    open(journal_path, 'r', encoding='utf-8') as src:
+                dst.write(src.read())
+            os.remove(journal_path)
+        else:
+            os.replace(journal_path, compacting_path)
+
+        args = (snapshot, self.filename, seq, compacting_path)
+        if background:
+            self._compact_thread = threading.Thread(target=self._compact_worker, args=args, daemon=True)
+            self._compact_thread.start()
+        else:
+            self._compact_worker(*args)
+
+    def wait(self):
+        if self._compact_thread is not None:
+            self._compact_thread.join()
+            self._compact_thread = None
+
+    def _compact_worker(self, snapshot, filename, seq, compacting_path):
+        try:
+            # Базовый файл хранит номер последней вошедшей в него записи
+            save_network_file(snapshot, filename, meta={'journal_seq': seq})
+            os.remove(compacting_path)
+            with self._lock:
+                self.base_seq = seq
+                self.last_error = None
+        except Exception as e:
+            with self._lock:
+                self.last_error = e
+
+    # --- внутреннее ---------------------------------------------------------------
+
+    def _complete(self, op):
+        """Дополняет операцию данными, нужными для её отмены"""
+        op = dict(op)
+        kind = op['op']
+        if kind == 'add_node':
+            op.setdefault('attrs', {})
+            op.setdefault('edges', [])
+        elif kind == 'remove_node':
+            node = op['node']
+            op['attrs'] = dict(self.G.nodes[node])
+            op['edges'] = ([[u, v, dict(d)] for u, v, d in self.G.in_edges(node, data=True)] +
+                           [[u, v, dict(d)] for u, v, d in self.G.out_edges(node, data=True)
+                            if u != v])
+        elif kind == 'add_edge':
+            op.setdefault('attrs', {})
+        elif kind == 'remove_edge':
+            op['attrs'] = dict(self.G.edges[op['u'], op['v']])
+        elif kind == 'clear':
+            # Снимок живёт только в памяти и нужен лишь для отмены очистки;
+            # при воспроизведении журнала он снимается заново (_replay_file)
+            op['snapshot'] = self.G.copy()
+        return op
+
+    def _inverse(self, op):
+        kind = op['op']
+        if kind == 'add_node':
+            return dict(op, op='remove_node')
+        if kind == 'remove_node':
+            return dict(op, op='add_node')
+        if kind == 'add_edge':
+            return dict(op, op='remove_edge')
+        if kind == 'remove_edge':
+            return dict(op, op='add_edge')
+        if kind == 'clear' and 'snapshot' in op:
+            return {'op': 'restore', 'snapshot': op['snapshot']}
+        return None
+
+    def _apply(self, op):
+        G = self.G
+        kind = op['op']
+        if kind == 'add_node':
+            G.add_node(op['node'], **op.get('attrs', {}))
+            G.add_edges_from((u, v, d) for u, v, d in op.get('edges', []))
+            return [('add_node', op['node'])] + [('add_edge', u, v) for u, v, _ in op.get('edges', [])]
+        if kind == 'remove_node':
+            if op['node'] in G:
+                G.remove_node(op['node'])
+            return [('remove_node', op['node'])]
+        if kind == 'add_edge':
+            G.add_edge(op['u'], op['v'], **op.get('attrs', {}))
+            return [('add_edge', op['u'], op['v'])]
+        if kind == 'remove_edge':
+            if G.has_edge(op['u'], op['v']):
+                G.remove_edge(op['u'], op['v'])
+            return [('remove_edge', op['u'], op['v'])]
+        if kind == 'clear':
+            G.clear()
+            return [('clear',)]
+        if kind == 'restore':
+            G.clear()
+            if 'snapshot' in op:
+                G.add_nodes_from(op['snapshot'].nodes(data=True))
+                G.add_edges_from(op['snapshot'].edges(data=True))
+            else:
+                # Запись журнала: сеть целиком списками узлов и связей
+                G.add_nodes_from((n, d) for n, d in op['nodes'])
+                G.add_edges_from((u, v, d) for u, v, d in op['edges'])
+            return [('clear',), ('restore',)]
+        raise ValueError(f'Неизвестная операция: {kind}')
+
+    def _write(self, op, kind):
+        self.seq += 1
+        if self.filename is None:
+            return
+        record = {k: v for k, v in op.items() if k != 'snapshot'}
+        if op['op'] == 'restore':
+            # Восстановленная сеть пишется в журнал целиком: сбой во время сжатия её не потеряет
+            record['nodes'] = [[n, d] for n, d in op['snapshot'].nodes(data=True)]
+            record['edges'] = [[u, v, d] for u, v, d in op['snapshot'].edges(data=True)]
+        record['seq'] = self.seq
+        record['kind'] = kind
+        if self._file is None:
+            self._file = open(self.filename + JOURNAL_SUFFIX, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        if op['op'] == 'restore':
+            # Длинную запись восстановления сразу переносим в базовый файл
+            self.compact()
+
+    def _replay_file(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Недописанная при сбое последняя строка
+                    break
+                if record.get('seq', 0) <= self.seq:
+                    continue
+                kind = record.pop('kind', 'do')
+                self.seq = record.pop('seq')
+                if record['op'] == 'clear':
+                    # Снимок очистки в журнал не пишется: это сеть, досчитанная до этой записи
+                    record['snapshot'] = self.G.copy()
+                self._apply(record)
+
+                # Восстанавливаем стеки отмены, насколько это позволяет журнал
+                if kind == 'do':
+                    self.applied.append(record)
+                    self.undone = []
+                elif kind == 'undo' and self.applied:
+                    self.undone.append(self.applied.pop())
+                elif kind == 'redo':
+                    # Запись повтора - сама операция; отменённая могла уйти в базовый файл при сжатии
+                    self.applied.append(record)
+                    if self.undone:
+                        self.undone.pop()
+
+    def _remove_journals(self):
+        for suffix in (JOURNAL_SUFFIX, COMPACTING_SUFFIX):
+            if os.path.exists(self.filename + suffix):
+                os.remove(self.filename + suffix)
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import pickle
+import struct
+import sys
+
+from backward import BackwardChainer
+from build_ranking import BuildRanker, build_feature_matrix
+from facets import FacetIndex, build_facet_index
+from fuzzy_search import FuzzyIndex
+from rete import ReteEngine
+
+DEFAULT_KNOWLEDGE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'poe_knowledge.json')
+
+# Снимок: сигнатура, версия формата заголовка, SHA-256 исходного файла, отпечаток кода,
+# затем pickle собранной базы. Отпечаток - хеш исходников модулей, которые собирают базу
+# или чьи объекты лежат в снимке: правка любого из них сама делает снимок устаревшим
+SNAPSHOT_MAGIC = b'POEKBSN1'
+SNAPSHOT_VERSION = 4
+SNAPSHOT_SUFFIX = '.kbc'
+_HEADER = struct.Struct('<8sI32s32s')
+
+
+_SNAPSHOT_MODULES = (__name__, 'build_ranking', 'facets', 'fuzzy_search', 'rete')
+
+
+def code_fingerprint():
+    """SHA-256 исходников модулей, от которых зависит содержимое снимка"""
+    digest = hashlib.sha256()
+    for name in _SNAPSHOT_MODULES:
+        with open(sys.modules[name].__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+class KnowledgeBase:
+    """Общая база знаний только для чтения: таксономия, правила, индексы и сеть Rete
+
+    Один объект обслуживает сколько угодно сеансов, в том числе из разных
+    потоков: состояние пользователя живёт в сеансах (ExpertSession в lab2.py),
+    а таксономия, индексы и сеть Rete после сборки только читаются. Изменяется
+    одна таблица обратного вывода (prover): она общая для всех сеансов и
+    заполняется под блокировкой BackwardChainer.
+    """
+
+    def __init__(self, kb):
+        self.league = kb['league']
+        self.version = kb['source_hash']
+        self.classes = kb['classes']
+        self.class_advice = kb['class_advice']
+        self.playstyles = kb['playstyles']
+        self.budget_levels = kb['budget_levels']
+        self.rules = kb['rules']
+        self.facts = kb['facts']
+        self.build_info = kb['build_info']
+        self.build_search = kb['build_search']
+        self.playstyle_classes = kb['playstyle_classes']
+        self.ranker = BuildRanker(kb['features'])
+        self.facets = FacetIndex(kb['facets'])
+
+        self.engine = ReteEngine()
+        for rule in self.rules:
+            self.engine.add_rule(rule['name'], rule['if'], rule['then'])
+        for fact in self.facts:
+            self.engine.assert_fact(fact)
+        self.engine.run()
+        self.prover = BackwardChainer(self.rules, self.facts, askable=self.askable())
+
+    @classmethod
+    def from_file(cls, filename=DEFAULT_KNOWLEDGE_FILE, use_snapshot=True):
+        return cls(load_knowledge(filename, use_snapshot=use_snapshot))
+
+    def askable(self):
+        """Факты, которые сообщает пользователь, с допустимыми значениями: обратный вывод их допускает"""
+        return {'playstyle': self.playstyles, 'budget': self.budget_levels,
+                'class': list(self.classes), 'subclass': None}
+
+    def new_session_engine(self):
+        """Движок Rete для одного сеанса: сеть и факты базы общие, копируется только изменённое"""
+        return self.engine.session()
+
+
+def load_knowledge(filename=DEFAULT_KNOWLEDGE_FILE, snapshot=None, use_snapshot=True):
+    """База знаний из JSON-файла; собранные индексы берутся из снимка, если файл не менялся
+
+    Снимок лежит рядом с файлом (имя + .kbc) и пересобирается, когда меняется
+    хеш исходного файла, код сборки (code_fingerprint) или формат заголовка.
+    """
+    with open(filename, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha256(source).digest()
+    snapshot = snapshot or filename + SNAPSHOT_SUFFIX
+
+    if use_snapshot:
+        kb = read_snapshot(snapshot, digest)
+        if kb is not None:
+            return kb
+
+    kb = compile_knowledge(json.loads(source.decode('utf-8')))
+    kb['source_hash'] = digest.hex()
+    if use_snapshot:
+        try:
+            write_snapshot(kb, snapshot, digest)
+        except OSError:
+            # Каталог только для чтения - просто работаем без снимка
+            pass
+    return kb
+
+
+def read_snapshot(filename, digest):
+    """Собранная база из снимка или None, если снимка нет или он устарел"""
+    try:
+        with open(filename, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, version, source_hash, code_hash = _HEADER.unpack(header)
+            if (magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or source_hash != digest
+                    or code_hash != code_fingerprint()):
+                return None
+            return pickle.load(f)
+    except Exception:
+        # Битый или несовместимый снимок - промах: база просто соберётся заново
+        return None
+
+
+def write_snapshot(kb, filename, digest):
+    tmp_name = filename + '.tmp'
+    with open(tmp_name, 'wb') as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, digest, code_fingerprint()))
+        pickle.dump(kb, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_name, filename)
+
+
+def compile_knowledge(data):
+    """Таксономия из файла плюс все производные индексы"""
+    kb = {
+        'league': data.get('league', ''),
+        'playstyles': list(data['playstyles']),
+        'budget_levels': list(data['budget_levels']),
+        'classes': data['classes'],
+        'class_advice': data.get('class_advice', {}),
+        'build_ratings': data.get('build_ratings', {}),
+        'build_tags': data.get('build_tags', {}),
+        # В JSON нет кортежей - шаблоны правил приводим обратно
+        'rules': [{'name': rule['name'],
+                   'if': [tuple(condition) for condition in rule['if']],
+                   'then': [tuple(action) for action in rule['then']]}
+                  for rule in data['rules']],
+    }
+    kb['facts'] = list(knowledge_facts(kb))
+    kb['build_info'], kb['build_search'] = build_reverse_index(kb['classes'], kb['budget_levels'])
+
+    # Стиль игры -> классы: выводятся теми же правилами, что и в диалоге
+    engine = ReteEngine()
+    for rule in kb['rules']:
+        engine.add_rule(rule['name'], rule['if'], rule['then'])
+    for fact in kb['facts']:
+        engine.assert_fact(fact)
+    kb['playstyle_classes'] = {}
+    for playstyle in kb['playstyles']:
+        session = engine.session()
+        session.assert_fact(('playstyle', playstyle))
+        session.run()
+        options = {b['?c'] for b in session.matches(('class_option', '?c'))}
+        kb['playstyle_classes'][playstyle] = [key for key in kb['classes'] if key in options]
+
+    kb['features'] = build_feature_matrix(kb)
+    # Фасеты нумеруют билды так же, как строки матрицы признаков
+    kb['facets'] = build_facet_index(kb, kb['features']['rows'])
+    return kb
+
+
+def knowledge_facts(kb):
+    """Факты базы знаний для машин вывода"""
+    for class_key, class_data in kb['classes'].items():
+        for playstyle in [class_data['playstyle']] + class_data.get('also_playstyles', []):
+            yield ('class_playstyle', class_key, playstyle)
+        for subclass in class_data['subclasses']:
+            for build, budget_level in zip(class_data['builds'][subclass], kb['budget_levels']):
+                yield ('build', class_key, subclass, build, budget_level)
+    for class_key, advice in kb['class_advice'].items():
+        yield ('class_advice', class_key, advice)
+
+
+def build_reverse_index(classes, budget_levels):
+    """Обратный индекс по билдам и поиск по их названиям с опечатками"""
+    build_info = {}
+    build_search = FuzzyIndex()
+    for class_key, class_data in classes.items():
+        for subclass in class_data['subclasses']:
+            builds = class_data['builds'][subclass]
+            # Билды подкласса перечислены в порядке уровней бюджета
+            for build, budget_level in zip(builds, budget_levels):
+                build_info[build.lower()] = {
+                    'class': class_key,
+                    'class_name': class_data['name'],
+                    'subclass': subclass,
+                    'playstyle': class_data['playstyle'],
+                    'budget': budget_level,
+                    'full_build_name': build
+                }
+                build_search.add(build)
+    return build_info, build_search
+
@@ -1,11 +1,24 @@
 import networkx as nx
 import matplotlib.pyplot as plt
-from matplotlib.widgets import Button, TextBox
-import json
+from matplotlib.widgets import Button, TextBox, RectangleSelector, LassoSelector
 import os
+import queue
+import threading
 import numpy as np
 import tkinter as tk
 from tkinter import filedialog
+from layout_cache import LayoutCache
+from layout_worker import LayoutWorker
+from spatial_index import GridIndex
+from renderer import NetworkRenderer
+from network_io import DEFAULT_RELATION, load_network_file, save_network_file
+from journal import ChangeJournal
+from inheritance import InheritanceIndex
+from relation_index import RelationIndex
+from activation import SpreadingActivation
+from analytics import NetworkAnalytics
+from lod import LevelOfDetail
+from label_placement import place_edge_labels
 
 class SemanticNetworkApp:
     def __init__(self):
@@ -15,6 +28,42 @@ class SemanticNetworkApp:
         
         self.selected_node = None
         self.current_filename = None
+        # Раскладка считается один раз и дальше обновляется инкрементально
+        self.layout = LayoutCache(k=3, iterations=100, version=lambda: self.graph_version)
+        # Полный пересчёт больших сетей идёт в фоне, промежуточные позиции сразу попадают на холст
+        self.layout_worker = LayoutWorker(k=3, iterations=100)
+        self.background_layout_limit = 300
+        # Индекс для поиска узлов по координатам, перестраивается вслед за раскладкой
+        self.index = GridIndex()
+        self.node_size = 2000
+        self.selected_nodes = []
+        self.select_modes = ['клик', 'рамка', 'лассо']
+        self.select_mode = 'клик'
+        # Артисты узлов и связей живут между перерисовками, правка трогает только изменённое
+        self.renderer = NetworkRenderer(self.ax, node_size=self.node_size,
+                                        label_positions=self.optimize_edge_label_positions)
+        self.setup_overlay()
+        # Версия графа растёт с каждой правкой; по ней кэшируются кластеры для крупного плана,
+        # матрица активации и результаты аналитики
+        self.graph_version = 0
+        # Большие сети рисуются по уровням детализации: в кадре только видимая часть или кластеры
+        self.lod = LevelOfDetail(self.ax, self.renderer, self.index, self._lod_source)
+        
+        # Фоновое сохранение и сообщения от него
+        self._save_thread = None
+        self._status_queue = queue.Queue()
+        # Файл, в который идёт сохранение сжатием журнала (для сообщения о завершении)
+        self._journal_saving = None
+        # Журнал изменений: автосохранение, восстановление после сбоя, отмена и повтор
+        self.journal = ChangeJournal(self.G)
+        # Индекс наследования по связи "является" для запросов к сети
+        self.reasoner = InheritanceIndex(self.G)
+        # Индекс связей по типу отношения для запросов вида "?x является птица"
+        self.relations = RelationIndex(self.G)
+        # Ассоциативный поиск распространением активации и аналитика (пути, компоненты,
+        # рейтинги): кэши обоих привязаны к graph_version и сбрасываются с каждой правкой
+        self.associations = SpreadingActivation(self.G, version=lambda: self.graph_version)
+        self.analytics = NetworkAnalytics(self.G, version=lambda: self.graph_version)
         self.setup_ui()
         self.draw_network()
         
@@ -27,12 +76,22 @@ class SemanticNetworkApp:
         self.edge_to_text = TextBox(plt.axes([0.45, 0.18, 0.1, 0.04]), 'К:')
         self.relation_text = TextBox(plt.axes([0.6, 0.18, 0.1, 0.04]), 'Связь:')
         
+        # Режим выделения: одиночный клик, рамка или лассо
+        self.select_mode_btn = Button(plt.axes([0.75, 0.18, 0.15, 0.04]), 'Выделение: клик')
+        
         # Кнопки управления
         self.add_node_btn = Button(plt.axes([0.1, 0.05, 0.1, 0.06]), 'Добавить узел')
         self.add_edge_btn = Button(plt.axes([0.22, 0.05, 0.1, 0.06]), 'Добавить связь')
         self.delete_node_btn = Button(plt.axes([0.34, 0.05, 0.1, 0.06]), 'Удалить узел')
         self.clear_btn = Button(plt.axes([0.46, 0.05, 0.1, 0.06]), 'Очистить всё')
         
+        # Отмена и повтор
+        self.undo_btn = Button(plt.axes([0.1, 0.12, 0.1, 0.04]), 'Отменить')
+        self.redo_btn = Button(plt.axes([0.22, 0.12, 0.1, 0.04]), 'Повторить')
+        
+        # Панель аналитики: компоненты, циклы "является", рейтинги, путь между "От" и "К"
+        self.analytics_btn = Button(plt.axes([0.34, 0.12, 0.1, 0.04]), 'Анализ')
+        
         # Кнопки работы с файлами
         self.save_btn = Button(plt.axes([0.58, 0.05, 0.1, 0.06]), 'Сохранить')
         self.save_as_btn = Button(plt.axes([0.70, 0.05, 0.1, 0.06]), 'Сохранить как')
@@ -46,113 +105,219 @@ class SemanticNetworkApp:
         self.add_edge_btn.on_clicked(self.add_edge)
         self.delete_node_btn.on_clicked(self.delete_node)
         self.clear_btn.on_clicked(self.clear_network)
+        self.undo_btn.on_clicked(self.undo)
+        self.redo_btn.on_clicked(self.redo)
         self.save_btn.on_clicked(self.save_network)
         self.save_as_btn.on_clicked(self.save_network_as)
         self.load_btn.on_clicked(self.load_network)
+        self.select_mode_btn.on_clicked(self.switch_select_mode)
+        self.analytics_btn.on_clicked(self.toggle_analytics)
+        
+        self.status_timer = self.fig.canvas.new_timer(interval=200)
+        self.status_timer.add_callback(self._poll_status)
+        self.status_timer.start()
         
         # Привязка события клика по графику
         self.fig.canvas.mpl_connect('button_press_event', self.on_click)
         
+        # Множественное выделение, по умолчанию выключено
+        self.rect_selector = RectangleSelector(self.ax, self.on_rect_select, button=[1], useblit=True)
+        self.lasso_selector = LassoSelector(self.ax, self.on_lasso_select, button=[1], useblit=True)
+        self.rect_selector.set_active(False)
+        self.lasso_selector.set_active(False)
+        
+    def set_status(self, message):
+        """Обновляет строку статуса без синхронной перерисовки всей фигуры"""
+        # TextBox.set_val перерисовывает холст целиком, что на больших сетях стоит секунды
+        self.info_text.text_disp.set_text(message)
+        self.fig.canvas.draw_idle()
+        
+    def _sync_index(self):
+        pos = self.layout.positions(self.G)
+        self.index.sync(pos, self.layout.version)
+        return pos
+        
+    def pick_radius(self, event):
+        """Радиус попадания в узел в координатах данных с учётом текущего масштаба"""
+        # node_size - площадь маркера в pt^2, переводим радиус в пиксели
+        radius_px = np.sqrt(self.node_size) / 2 * self.fig.dpi / 72
+        inv = self.ax.transData.inverted()
+        x0, y0 = inv.transform((event.x, event.y))
+        x1, y1 = inv.transform((event.x + radius_px, event.y + radius_px))
+        return max(abs(x1 - x0), abs(y1 - y0))
+        
     def on_click(self, event):
-        if event.inaxes == self.ax:
+        if event.inaxes == self.ax and self.select_mode == 'клик':
             # Поиск ближайшего узла
             if self.G.number_of_nodes() > 0:
-                pos = nx.spring_layout(self.G)
-                for node, (x, y) in pos.items():
-                    if ((event.xdata - x)**2 + (event.ydata - y)**2) < 0.01:
-                        self.selected_node = node
-                        self.info_text.set_val(f'Выбран узел: {node}')
-                        self.highlight_connections(node)
-                        return
+                self._sync_index()
+                node = self.index.nearest(event.xdata, event.ydata, max_dist=self.pick_radius(event))
+                if node is not None:
+                    self.selected_node = node
+                    self.selected_nodes = []
+                    self.set_status(f'Выбран узел: {node}')
+                    self.highlight_connections(node)
+                    return
                 self.selected_node = None
-                self.draw_network()
+                self.selected_nodes = []
+                self.renderer.clear_highlight()
+        
+    def switch_select_mode(self, event):
+        i = self.select_modes.index(self.select_mode)
+        self.select_mode = self.select_modes[(i + 1) % len(self.select_modes)]
+        self.rect_selector.set_active(self.select_mode == 'рамка')
+        self.lasso_selector.set_active(self.select_mode == 'лассо')
+        self.select_mode_btn.label.set_text(f'Выделение: {self.select_mode}')
+        plt.draw()
         
-    def highlight_connections(self, node):
-        self.draw_network()
+    def on_rect_select(self, press, release):
+        self._sync_index()
+        nodes = self.index.query_rect(press.xdata, press.ydata, release.xdata, release.ydata)
+        self.select_nodes(nodes)
+        
+    def on_lasso_select(self, vertices):
+        self._sync_index()
+        self.select_nodes(self.index.query_polygon(vertices))
         
+    def select_nodes(self, nodes):
+        self.selected_node = None
+        self.selected_nodes = list(nodes)
+        pos = self.layout.positions(self.G)
+        self.renderer.highlight(pos, {'red': (self.selected_nodes, self.node_size + 500)})
+        self.set_status(f'Выделено узлов: {len(self.selected_nodes)}')
+        
+
+    def highlight_connections(self, node):
         if self.G.number_of_nodes() > 0:
-            pos = nx.spring_layout(self.G)
-            
-            # Подсветка выбранного узла
-            nx.draw_networkx_nodes(self.G, pos, nodelist=[node], 
-                                  node_color='red', node_size=2500, ax=self.ax)
+            pos = self.layout.positions(self.G)
             
-            # Подсветка связанных узлов
+            # Подсветка выбранного узла и связанных с ним
             predecessors = list(self.G.predecessors(node))
             successors = list(self.G.successors(node))
+            groups = {
+                'red': ([node], 2500),
+                'orange': (predecessors, 2200),
+                'yellow': (successors, 2200),
+            }
             
-            if predecessors:
-                nx.draw_networkx_nodes(self.G, pos, nodelist=predecessors, 
-                                      node_color='orange', node_size=2200, ax=self.ax)
-            
-            if successors:
-                nx.draw_networkx_nodes(self.G, pos, nodelist=successors, 
-                                      node_color='yellow', node_size=2200, ax=self.ax)
-            
-            # Перерисовываем подписи связей для выделенного узла
-            edge_labels = {}
-            for u, v, data in self.G.edges(data=True):
-                if u == node or v == node:
-                    edge_labels[(u, v)] = data['relation']
-            
-            current_pos = nx.spring_layout(self.G)
-            nx.draw_networkx_edge_labels(self.G, current_pos, edge_labels=edge_labels, 
-                                        ax=self.ax, font_size=9, font_weight='bold',
-                                        bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.8))
+            # Подписи только связей выделенного узла, без обхода всех рёбер графа
+            edge_labels = {(u, v): d['relation'] for u, v, d in self.G.in_edges(node, data=True)}
+            edge_labels.update({(u, v): d['relation'] for u, v, d in self.G.out_edges(node, data=True)})
             
-            plt.draw()
+            self.renderer.highlight(pos, groups, edge_labels)
         
     def add_node(self, event):
         node_name = self.node_text.text.strip()
         
         if node_name:
             if node_name not in self.G.nodes():
-                self.G.add_node(node_name)
-                self.info_text.set_val(f'Добавлен узел: {node_name}')
-                self.draw_network()
+                self.apply_changes(self.journal.execute({'op': 'add_node', 'node': node_name}))
+                self.set_status(f'Добавлен узел: {node_name}')
+                self.refresh()
             else:
-                self.info_text.set_val(f'Узел {node_name} уже существует!')
+                self.set_status(f'Узел {node_name} уже существует!')
         
     def add_edge(self, event):
         from_node = self.edge_from_text.text.strip()
         to_node = self.edge_to_text.text.strip()
-        relation = self.relation_text.text.strip() or "связан с"
+        relation = self.relation_text.text.strip() or DEFAULT_RELATION
         
         if from_node and to_node:
             if from_node in self.G.nodes() and to_node in self.G.nodes():
                 if not self.G.has_edge(from_node, to_node):
-                    self.G.add_edge(from_node, to_node, relation=relation)
-                    self.info_text.set_val(f'Добавлена связь: {from_node} → {to_node} ({relation})')
-                    self.draw_network()
+                    self.apply_changes(self.journal.execute({'op': 'add_edge', 'u': from_node, 'v': to_node,
+                                                             'attrs': {'relation': relation}}))
+                    self.set_status(f'Добавлена связь: {from_node} → {to_node} ({relation})')
+                    self.refresh()
                 else:
-                    self.info_text.set_val(f'Связь уже существует!')
+                    self.set_status(f'Связь уже существует!')
             else:
-                self.info_text.set_val('Один из узлов не существует!')
+                self.set_status('Один из узлов не существует!')
         
     def delete_node(self, event):
-        if self.selected_node:
-            self.G.remove_node(self.selected_node)
-            self.info_text.set_val(f'Удален узел: {self.selected_node}')
+        if self.selected_nodes:
+            for node in self.selected_nodes:
+                self.apply_changes(self.journal.execute({'op': 'remove_node', 'node': node}))
+            self.set_status(f'Удалено узлов: {len(self.selected_nodes)}')
+            self.selected_nodes = []
+            self.refresh()
+        elif self.selected_node:
+            self.apply_changes(self.journal.execute({'op': 'remove_node', 'node': self.selected_node}))
+            self.set_status(f'Удален узел: {self.selected_node}')
             self.selected_node = None
-            self.draw_network()
+            self.refresh()
         else:
             node_to_delete = self.node_text.text.strip()
             if node_to_delete in self.G.nodes():
-                self.G.remove_node(node_to_delete)
-                self.info_text.set_val(f'Удален узел: {node_to_delete}')
-                self.draw_network()
+                self.apply_changes(self.journal.execute({'op': 'remove_node', 'node': node_to_delete}))
+                self.set_status(f'Удален узел: {node_to_delete}')
+                self.refresh()
             else:
-                self.info_text.set_val('Укажите узел для удаления!')
+                self.set_status('Укажите узел для удаления!')
         
     def clear_network(self, event):
-        self.G.clear()
+        # Очистка тоже попадает в журнал и отменяется, поэтому сеть остаётся привязанной к файлу
+        self.apply_changes(self.journal.execute({'op': 'clear'}))
         self.selected_node = None
-        self.current_filename = None
-        self.info_text.set_val('Сеть очищена')
+        self.selected_nodes = []
+        self.set_status('Сеть очищена')
         self.draw_network()
         
+    def undo(self, event):
+        changes = self.journal.undo()
+        if changes is None:
+            self.set_status('Нечего отменять')
+            return
+        self.apply_changes(changes)
+        self.selected_node = None
+        self.selected_nodes = []
+        self.set_status('Действие отменено')
+        self.refresh()
+        
+    def redo(self, event):
+        changes = self.journal.redo()
+        if changes is None:
+            self.set_status('Нечего повторять')
+            return
+        self.apply_changes(changes)
+        self.set_status('Действие повторено')
+        self.refresh()
+        
+    def apply_changes(self, changes):
+        """Переносит изменения графа из журнала в раскладку"""
+        self.graph_version += 1
+        for change in changes:
+            self.reasoner.apply(change)
+            self.relations.apply(change)
+            self.analytics.apply(change)
+            kind = change[0]
+            if kind == 'add_node':
+                self.layout.add_node(self.G, change[1])
+            elif kind == 'add_edge':
+                self.layout.add_edge(self.G, change[1], change[2])
+            elif kind == 'remove_node':
+                self.layout.remove_node(self.G, change[1])
+            elif kind == 'remove_edge':
+                self.layout.remove_edge(self.G, change[1], change[2])
+            elif kind == 'clear':
+                self.layout.clear()
+        
+        # Недосчитанная раскладка перезапускается с учётом правки от текущих позиций
+        if self.layout_worker.busy():
+            self.layout_worker.start(self.G, self.layout.positions(self.G))
+        
     def save_network(self, event):
-        if self.current_filename:
+        if self.current_filename and self.journal.filename == self.current_filename:
+            # Явное сохранение переносит журнал в базовый файл: его читают и network_cli.py,
+            # и остальные инструменты без журнала
+            self.journal.wait()
+            if self.journal.pending():
+                self.set_status(f'Сохранение в {os.path.basename(self.current_filename)}...')
+                self.journal.compact()
+                self._journal_saving = self.current_filename
+            else:
+                self.set_status(f'Сеть уже сохранена в {os.path.basename(self.current_filename)}')
+        elif self.current_filename:
             self._save_to_file(self.current_filename)
         else:
             self.save_network_as(event)
@@ -163,7 +328,7 @@ class SemanticNetworkApp:
         
         filename = filedialog.asksaveasfilename(
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            filetypes=[("JSON files", "*.json"), ("Binary network", "*.snb"), ("All files", "*.*")],
             title="Сохранить семантическую сеть как"
         )
         
@@ -174,25 +339,56 @@ class SemanticNetworkApp:
             self._save_to_file(filename)
         
     def _save_to_file(self, filename):
+        # Запись идёт в фоне по снимку графа, чтобы интерфейс не замирал на больших сетях
+        if self._save_thread is not None:
+            self._save_thread.join()
+        snapshot = self.G.copy()
+        seq = self.journal.seq
+        self.set_status(f'Сохранение в {os.path.basename(filename)}...')
+        self._save_thread = threading.Thread(target=self._save_worker,
+                                             args=(snapshot, filename, seq), daemon=True)
+        self._save_thread.start()
+        # Дальнейшие правки пишутся в журнал рядом с новым файлом
+        self.journal.attach(filename, base_seq=seq, replay=False)
+        
+    def _save_worker(self, snapshot, filename, seq):
         try:
-            data = {
-                'nodes': list(self.G.nodes(data=True)),
-                'edges': list(self.G.edges(data=True))
-            }
-            
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            self.info_text.set_val(f'Сеть сохранена в {os.path.basename(filename)}')
+            save_network_file(snapshot, filename, meta={'journal_seq': seq})
+            self._status_queue.put(f'Сеть сохранена в {os.path.basename(filename)}')
         except Exception as e:
-            self.info_text.set_val(f'Ошибка сохранения: {str(e)}')
+            self._status_queue.put(f'Ошибка сохранения: {str(e)}')
+        
+    def _poll_status(self):
+        # Сообщения фоновых потоков выводим из потока интерфейса
+        while not self._status_queue.empty():
+            self.set_status(self._status_queue.get_nowait())
+        
+        # Журнал периодически сжимается в базовый файл в фоне
+        if self.journal.needs_compaction():
+            self.journal.compact()
+        error = self.journal.take_error()
+        if error is not None:
+            self.set_status(f'Ошибка сжатия журнала: {error}')
+            self._journal_saving = None
+        elif self._journal_saving and not self.journal.compacting():
+            self.set_status(f'Сеть сохранена в {os.path.basename(self._journal_saving)}')
+            self._journal_saving = None
+        
+        # Промежуточные позиции фоновой раскладки
+        result = self.layout_worker.poll()
+        if result is not None:
+            pos, done = result
+            self.layout.set_positions(pos)
+            self.refresh()
+            if done:
+                self.set_status('Раскладка готова')
         
     def load_network(self, event):
         root = tk.Tk()
         root.withdraw()  # Скрываем основное окно Tkinter
         
         filename = filedialog.askopenfilename(
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            filetypes=[("JSON files", "*.json"), ("Binary network", "*.snb"), ("All files", "*.*")],
             title="Загрузить семантическую сеть"
         )
         
@@ -204,131 +400,137 @@ class SemanticNetworkApp:
     def _load_from_file(self, filename):
         try:
             if os.path.exists(filename):
-                with open(filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                self.G.clear()
-                
-                # Загрузка узлов
-                for node_data in data['nodes']:
-                    if isinstance(node_data, list) and len(node_data) == 2:
-                        node, attrs = node_data
-                        self.G.add_node(node, **attrs)
-                    else:
-                        # Для обратной совместимости со старым форматом
-                        self.G.add_node(node_data)
-                
-                # Загрузка связей
-                for edge_data in data['edges']:
-                    if isinstance(edge_data, list) and len(edge_data) == 3:
-                        from_node, to_node, attrs = edge_data
-                        self.G.add_edge(from_node, to_node, **attrs)
-                    else:
-                        # Для обратной совместимости
-                        from_node, to_node = edge_data
-                        self.G.add_edge(from_node, to_node, relation="связан с")
+                # Потоковое чтение с пакетной вставкой; JSON или бинарный формат
+                meta = {}
+                self.journal.detach()
+                load_network_file(filename, self.G, meta=meta)
+                # Досчитываем правки из журнала, не попавшие в файл
+                self.journal.attach(filename, base_seq=meta.get('journal_seq', 0))
+                self.selected_node = None
+                self.selected_nodes = []
                 
+                # Новая сеть - раскладку и индексы считаем заново целиком
+                self.reasoner.invalidate()
+                self.relations.invalidate()
+                self.analytics.invalidate()
+                self.graph_version += 1
                 self.current_filename = filename
-                self.info_text.set_val(f'Сеть загружена из {os.path.basename(filename)}')
+                self.set_status(f'Сеть загружена из {os.path.basename(filename)}')
+                self.start_layout()
                 self.draw_network()
             else:
-                self.info_text.set_val(f'Файл не найден!')
+                self.set_status(f'Файл не найден!')
         except Exception as e:
-            self.info_text.set_val(f'Ошибка загрузки: {str(e)}')
+            self.set_status(f'Ошибка загрузки: {str(e)}')
     
-    def optimize_edge_label_positions(self, pos, edge_labels):
-        """Оптимизация позиций надписей связей чтобы не перекрывались"""
-        optimized_positions = {}
-        
-        for (u, v), label in edge_labels.items():
-            if u in pos and v in pos:
-                x1, y1 = pos[u]
-                x2, y2 = pos[v]
-                
-                # Позиция посередине связи
-                mid_x = (x1 + x2) / 2
-                mid_y = (y1 + y2) / 2
-                
-                # Смещение перпендикулярно линии связи
-                dx = x2 - x1
-                dy = y2 - y1
-                length = np.sqrt(dx**2 + dy**2)
-                
-                if length > 0:
-                    # Нормализованный перпендикулярный вектор
-                    perp_x = -dy / length
-                    perp_y = dx / length
-                    
-                    # Смещение на фиксированное расстояние
-                    offset = 0.1
-                    optimized_positions[(u, v)] = (mid_x + perp_x * offset, mid_y + perp_y * offset)
-                else:
-                    optimized_positions[(u, v)] = (mid_x, mid_y)
-        
-        return optimized_positions
-        
-    def draw_network(self):
-        self.ax.clear()
-        
-        if self.G.number_of_nodes() == 0:
-            # self.ax.text(0.5, 0.5, 'Добавьте узлы и связи\n\n'
-            
-            # Показываем текущий файл если есть
-            if self.current_filename:
-                file_info = f'\n\nТекущий файл: {os.path.basename(self.current_filename)}'
-                self.ax.text(0.5, 0.1, file_info, ha='center', va='center', fontsize=10, color='blue')
-            
-            plt.draw()
+    def start_layout(self):
+        """Пересчёт раскладки: маленькие сети сразу, большие - в фоне с показом промежуточных шагов"""
+        if self.G.number_of_nodes() <= self.background_layout_limit:
+            self.layout_worker.cancel()
+            self.layout.recompute(self.G)
             return
+        # Пока фон считает, показываем случайную раскладку - интерфейс остаётся живым
+        nodes = list(self.G)
+        self.layout.set_positions(dict(zip(nodes, np.random.uniform(-1, 1, (len(nodes), 2)))))
+        self.layout_worker.start(self.G)
+        self.set_status(f'{self.info_text.text_disp.get_text()} | раскладка считается...')
         
-        # Позиционирование узлов
-        pos = nx.spring_layout(self.G, k=3, iterations=100)
-        
-        # Все узлы одного цвета
-        node_colors = ['lightblue'] * len(self.G.nodes())
-        
-        # Рисуем узлы
-        nx.draw_networkx_nodes(self.G, pos, node_color=node_colors, 
-                              node_size=2000, ax=self.ax, alpha=0.8)
-        
-        # Рисуем подписи узлов
-        nx.draw_networkx_labels(self.G, pos, ax=self.ax, font_size=10)
-        
-        # Рисуем связи
-        nx.draw_networkx_edges(self.G, pos, ax=self.ax, 
-                              arrowstyle='->', arrowsize=20, 
-                              edge_color='gray', width=2)
-        
-        # Подписи связей с оптимизацией позиций
-        edge_labels = {(u, v): d['relation'] for u, v, d in self.G.edges(data=True)}
-        
-        # Оптимизируем позиции надписей
-        label_pos = self.optimize_edge_label_positions(pos, edge_labels)
-        
-        # Рисуем подписи связей
-        for (u, v), label in edge_labels.items():
-            if (u, v) in label_pos:
-                x, y = label_pos[(u, v)]
-                self.ax.text(x, y, label, 
-                            ha='center', va='center',
-                            fontsize=9, fontweight='bold',
-                            bbox=dict(boxstyle='round,pad=0.3', 
-                                     facecolor='white', 
-                                     edgecolor='gray', 
-                                     alpha=0.9))
-        
+    def optimize_edge_label_positions(self, pos, edge_labels):
+        """Оптимизация позиций надписей связей чтобы не перекрывались"""
+        # Размер символа подписи (fontsize=9, жирный, с рамкой) в координатах данных
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        bbox = self.ax.bbox
+        points = self.fig.dpi / 72
+        char_size = (9 * 0.65 * points * abs(x1 - x0) / max(bbox.width, 1),
+                     9 * 1.8 * points * abs(y1 - y0) / max(bbox.height, 1))
+        return place_edge_labels(pos, edge_labels, offset=0.1, char_size=char_size, bounds=(x0, x1, y0, y1))
+        
+    def setup_overlay(self):
+        """Служебные надписи на холсте создаются один раз и дальше только обновляются"""
+        self.ax.axis('off')
+        self.stats_artist = self.ax.text(0.02, 0.98, '', transform=self.ax.transAxes, 
+                                         verticalalignment='top', zorder=5,
+                                         bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
+        self.file_artist = self.ax.text(0.5, 0.1, '', transform=self.ax.transAxes,
+                                        ha='center', va='center', fontsize=10, color='blue')
+        self.analytics_artist = self.ax.text(0.98, 0.98, '', transform=self.ax.transAxes,
+                                             ha='right', va='top', fontsize=9, zorder=5, visible=False,
+                                             bbox=dict(boxstyle='round', facecolor='lavender', alpha=0.9))
+        
+    def update_overlay(self):
         # Настройка внешнего вида
         title = 'Семантическая сеть'
         if self.current_filename:
             title += f' - {os.path.basename(self.current_filename)}'
         self.ax.set_title(title, fontsize=16, pad=20)
-        self.ax.axis('off')
         
         # Информация о сети
-        stats_text = f'Узлов: {self.G.number_of_nodes()} | Связей: {self.G.number_of_edges()}'
-        self.ax.text(0.02, 0.98, stats_text, transform=self.ax.transAxes, 
-                    verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
+        empty = self.G.number_of_nodes() == 0
+        self.stats_artist.set_text(f'Узлов: {self.G.number_of_nodes()} | Связей: {self.G.number_of_edges()} | '
+                                   f'Компонент: {self.analytics.component_count()}')
+        self.stats_artist.set_visible(not empty)
+        
+        # Для пустой сети показываем текущий файл если есть
+        if empty and self.current_filename:
+            self.file_artist.set_text(f'\n\nТекущий файл: {os.path.basename(self.current_filename)}')
+            self.file_artist.set_visible(True)
+        else:
+            self.file_artist.set_visible(False)
+        
+        if self.analytics_artist.get_visible():
+            self.update_analytics()
+        
+    def _lod_source(self):
+        return self.G, self.layout.positions(self.G), self.layout.version, self.graph_version
         
+    def toggle_analytics(self, event):
+        self.analytics_artist.set_visible(not self.analytics_artist.get_visible())
+        self.update_overlay()
+        plt.draw()
+        
+    def update_analytics(self):
+        """Текст панели аналитики; всё тяжёлое берётся из кэша, пока граф не менялся"""
+        text = self.analytics.summary()
+        source, target = self.edge_from_text.text.strip(), self.edge_to_text.text.strip()
+        if source and target:
+            path = self.analytics.shortest_path(source, target)
+            steps = '; '.join(f'{u} {relation} {v}' for u, relation, v in path) if path else 'нет'
+            text += f'\nПуть {source} → {target}: {steps}'
+        self.analytics_artist.set_text(text)
+        
+    def refresh(self):
+        """Инкрементальная перерисовка: обновляются только узлы, затронутые правкой"""
+        if self.lod.wanted(self.G) != self.lod.active:
+            # Сеть пересекла порог детализации - перерисовываем её целиком
+            self.draw_network()
+            return
+        pos = self.layout.positions(self.G)
+        changed = self.layout.take_changes()
+        if self.lod.active:
+            self.lod.update_view()
+        elif changed is None:
+            self.renderer.sync(self.G, pos)
+        else:
+            self.renderer.update(self.G, pos, changed)
+        self.renderer.clear_highlight(blit=False)
+        self.update_overlay()
+        plt.draw()
+        
+    def draw_network(self):
+        """Полная сверка картинки с графом (после загрузки или очистки)"""
+        pos = self.layout.positions(self.G)
+        self.layout.take_changes()
+        if self.lod.wanted(self.G):
+            # Пределы осей - по всей сети, а рисуется только то, что видно при этом масштабе
+            self.lod.deactivate()
+            self.renderer.update_limits(pos)
+            self.lod.activate()
+            self.lod.update_view()
+        else:
+            self.lod.deactivate()
+            self.renderer.sync(self.G, pos)
+        self.renderer.clear_highlight(blit=False)
+        self.update_overlay()
         plt.draw()
 
 # Запуск приложения
@@ -1,130 +1,159 @@
+import argparse
+
+from backward import explain
+from knowledge_base import DEFAULT_KNOWLEDGE_FILE, KnowledgeBase
+from recommendation_cache import RecommendationCache, preferences_key
+from tracing import DISABLED, Tracer
+
+
+class ExpertSession:
+    """Состояние одного пользователя: ответы, выбор и рабочая память вывода
+
+    Всё общее (таксономия, правила, индексы) берётся из KnowledgeBase по
+    ссылке, поэтому сеанс стоит несколько словарей. Факты попадают в движок
+    только тогда, когда нужен вывод: если результат уже есть в кэше
+    (RecommendationCache), правила не запускаются вовсе.
+    """
+    __slots__ = ('kb', 'cache', 'tracer', 'engine', 'selected_class', 'selected_subclass', 'selected_build',
+                 'user_preferences', 'available_classes', '_pending')
+
+    def __init__(self, kb, cache=None, tracer=None):
+        self.kb = kb
+        self.cache = cache
+        self.tracer = tracer if tracer is not None else DISABLED
+        self.engine = kb.new_session_engine()
+        self.engine.tracer = self.tracer
+        self.selected_class = None
+        self.selected_subclass = None
+        self.selected_build = None
+        self.user_preferences = {}
+        self.available_classes = []
+        self._pending = []
+
+    def tell(self, name, value):
+        """Добавляет факт сессии; правила, которых он касается, сработают при следующем выводе"""
+        self._pending.append((name, value))
+
+    def _sync(self):
+        with self.tracer.span("rule_evaluation"):
+            for fact in self._pending:
+                self.engine.assert_fact(fact)
+            self._pending = []
+            self.engine.run()
+
+    def derived(self, name):
+        """Значения выведенных фактов вида (name, значение)"""
+        self._sync()
+        return [bindings["?x"] for bindings in self.engine.matches((name, "?x"))]
+
+    def _cached(self, stage, compute, *extra):
+        """Результат стадии вывода из кэша по ответам и выбору сеанса
+
+        Ответ из кэша попадает в трассировку участком cache_hit со временем
+        поиска в кэше; промах виден по участкам самого вывода.
+        """
+        if self.cache is None:
+            return compute()
+        key = (self.kb.version, stage, preferences_key(self.user_preferences),
+               self.selected_class, self.selected_subclass) + extra
+        computed = []
+
+        def derive():
+            computed.append(True)
+            return compute()
+        start = self.tracer.clock()
+        value = self.cache.lookup(key, derive)
+        if not computed:
+            self.tracer.add("cache_hit", self.tracer.clock() - start)
+        return value
+
+    def answer(self, question_key, option):
+        self.user_preferences[question_key] = option
+        self.tell(question_key, option)
+
+    def class_options(self):
+        with self.tracer.span("class_filtering"):
+            self.available_classes = list(self._cached("class_options", self._class_options))
+        return self.available_classes
+
+    def _class_options(self):
+        options = set(self.derived("class_option"))
+        if options:
+            return tuple(key for key in self.kb.classes if key in options)
+        return tuple(self.kb.classes)
+
+    def choose_class(self, class_key):
+        self.selected_class = class_key
+        self.tell("class", class_key)
+
+    def choose_subclass(self, subclass):
+        with self.tracer.span("subclass_selection"):
+            self.selected_subclass = subclass
+            self.tell("subclass", subclass)
+
+    def recommended_build(self):
+        """Билд по бюджету из правил; без ответа о бюджете - самый дешёвый вариант подкласса"""
+        with self.tracer.span("build_selection"):
+            return self._cached("recommended_build", self._recommended_build)
+
+    def _recommended_build(self):
+        recommended = self.derived("recommended_build")
+        if recommended:
+            return recommended[0]
+        return self.kb.classes[self.selected_class]["builds"][self.selected_subclass][0]
+
+    def advice(self):
+        with self.tracer.span("advice"):
+            return list(self._cached("advice", lambda: tuple(self.derived("advice"))))
+
+    def top_builds(self, k=3, **ratings):
+        """Лучшие билды каталога под ответы сеанса; ratings - важность defense, clear_speed, bossing"""
+        profile = dict(self.user_preferences, **ratings)
+        exclude = (self.selected_build,) if self.selected_build else ()
+        with self.tracer.span("ranking_lookup"):
+            return list(self._cached("top_builds", lambda: tuple(self.kb.ranker.top(profile, k, exclude=exclude)),
+                                     k, exclude, preferences_key(ratings)))
+
+    def why(self):
+        """Объяснение выбранного билда обратным выводом при ответах сеанса; пусто, если билд выбран вручную"""
+        chosen = dict(self.user_preferences, **{"class": self.selected_class, "subclass": self.selected_subclass})
+        with self.tracer.span("why_proof"):
+            answers = self.kb.prover.prove(("recommended_build", self.selected_build))
+        for answer in answers:
+            if all(value is None or chosen.get(name) == value for name, value in answer.assumptions):
+                return explain(answer.proof)
+        return []
+
+
 class POEExpertSystem:
-    def __init__(self):
-        self.classes = {
-            "duelist": {
-                "name": "Duelist",
-                "subclasses": ["slayer", "champion", "gladiator"],
-                "builds": {
-                    "slayer": ["Boneshatter", "Cyclone", "Flicker Strike"],
-                    "champion": ["Spectral Helix", "Lightning Strike", "Armour Stacker"],
-                    "gladiator": ["Bleed Lacerate", "Blade Flurry", "Max Block Shattering Steel"]
-                },
-                "playstyle": "melee combat"
-            },
-            "ranger": {
-                "name": "Ranger",
-                "subclasses": ["deadeye", "pathfinder", "raider"],
-                "builds": {
-                    "deadeye": ["Lightning Arrow", "Ice Shot", "Tornado Shot"],
-                    "pathfinder": ["Toxic Rain", "Caustic Arrow", "Scourge Arrow"],
-                    "raider": ["Spectral Throw", "Frost Blades", "Elemental Hit"]
-                },
-                "playstyle": "ranged combat"
-            },
-            "shadow": {
-                "name": "Shadow",
-                "subclasses": ["assassin", "trickster", "saboteur"],
-                "builds": {
-                    "assassin": ["Poisonous Concoction", "Blade Trap", "CoC Ice Spear"],
-                    "trickster": ["ED/Contagion", "Lightning Trap", "Winter Orb"],
-                    "saboteur": ["Lightning Trap", "Ice Trap", "Explosive Trap"]
-                },
-                "playstyle": "spellcasting"
-            },
-            "marauder": {
-                "name": "Marauder",
-                "subclasses": ["juggernaut", "berserker", "chieftain"],
-                "builds": {
-                    "juggernaut": ["Boneshatter", "Static Strike", "Accuracy Stacking"],
-                    "berserker": ["Earthshatter", "Tectonic Slam", "Rage Vortex"],
-                    "chieftain": ["Volcanic Fissure", "Consecrated Path", "Fire Cyclone"]
-                },
-                "playstyle": "melee combat"
-            },
-            "witch": {
-                "name": "Witch",
-                "subclasses": ["necromancer", "elementalist", "occultist"],
-                "builds": {
-                    "necromancer": ["Skeleton Warriors", "Zombie Army", "Carrion Golem"],
-                    "elementalist": ["Arc", "Winter Orb", "Golementalist"],
-                    "occultist": ["Bane", "Cold DOT", "Power Siphon"]
-                },
-                "playstyle": "minions/summons"
-            },
-            "templar": {
-                "name": "Templar",
-                "subclasses": ["inquisitor", "hierophant", "guardian"],
-                "builds": {
-                    "inquisitor": ["Spark", "Storm Brand", "CoC"],
-                    "hierophant": ["Freezing Pulse", "Arc", "Manabond"],
-                    "guardian": ["Dominating Blow", "SRS", "Aura Stacker"]
-                },
-                "playstyle": "spellcasting"
-            },
-            "scion": {
-                "name": "Scion",
-                "subclasses": ["necromancer", "elementalist", "occultist"],
-                "builds": {
-                    "necromancer": ["Absolution", "Skeleton Mages", "Spectre"],
-                    "elementalist": ["Exsanguinate", "Winter Orb", "CoC"],
-                    "occultist": ["Cold DOT", "Bane", "Int Stacker"]
-                },
-                "playstyle": "flexible"
-            }
-        }
-        
-        # Создаем словарь для обратного поиска билдов
-        self.build_info = {}
-        self._create_build_reverse_index()
+    def __init__(self, knowledge=None, knowledge_file=DEFAULT_KNOWLEDGE_FILE, cache_size=1024, cache_ttl=None,
+                 trace=False):
+        # Общая база знаний: несколько экземпляров (и сеансов) могут делить один объект
+        self.kb = knowledge if knowledge is not None else KnowledgeBase.from_file(knowledge_file)
+        # Выводы по одинаковым ответам повторяются от пользователя к пользователю
+        self.cache = RecommendationCache(cache_size, cache_ttl)
+        # Трассировку можно включать и выключать на ходу: self.tracer.enabled
+        self.tracer = Tracer(enabled=trace)
+        self.classes = self.kb.classes
+        self.build_info = self.kb.build_info
+        self.build_search = self.kb.build_search
+        self.prover = self.kb.prover
         
         self.playstyle_questions = {
             "playstyle": {
                 "question": "What playstyle do you prefer?",
-                "options": {
-                    "1": "melee combat",
-                    "2": "ranged combat", 
-                    "3": "spellcasting",
-                    "4": "minions/summons"
-                }
+                "options": {str(i): option for i, option in enumerate(self.kb.playstyles, 1)}
             },
             "budget": {
                 "question": "What's your build budget?",
-                "options": {
-                    "1": "free/cheap (self-found)",
-                    "2": "medium (a few divine orbs)",
-                    "3": "expensive (min-max build)"
-                }
+                "options": {str(i): option for i, option in enumerate(self.kb.budget_levels, 1)}
             }
         }
         
-        self.selected_class = None
-        self.selected_subclass = None
-        self.selected_build = None
-        self.user_preferences = {}
-        self.available_classes = []
+        self.session = ExpertSession(self.kb, self.cache, self.tracer)
     
-    def _create_build_reverse_index(self):
-        """Создает обратный индекс для поиска информации по билдам"""
-        for class_key, class_data in self.classes.items():
-            for subclass in class_data["subclasses"]:
-                builds = class_data["builds"][subclass]
-                for i, build in enumerate(builds):
-                    budget_level = ""
-                    if i == 0:
-                        budget_level = "free/cheap (self-found)"
-                    elif i == 1:
-                        budget_level = "medium (a few divine orbs)"
-                    else:
-                        budget_level = "expensive (min-max build)"
-                    
-                    self.build_info[build.lower()] = {
-                        "class": class_key,
-                        "class_name": class_data["name"],
-                        "subclass": subclass,
-                        "playstyle": class_data["playstyle"],
-                        "budget": budget_level,
-                        "full_build_name": build
-                    }
+    def reset_session(self):
+        self.session = ExpertSession(self.kb, self.cache, self.tracer)
     
     def display_menu(self, options, title):
         print(f"\n{title}")
@@ -155,27 +184,14 @@ class POEExpertSystem:
                 choice = input("Your choice (1-{}): ".format(len(question_data['options'])))
                 if choice in question_data['options']:
                     selected_option = question_data['options'][choice]
-                    self.user_preferences[question_key] = selected_option
+                    self.session.answer(question_key, selected_option)
                     print(f"Selected: {selected_option}")
                     break
                 else:
                     print("Please choose a valid option!")
     
     def filter_classes_by_playstyle(self):
-        playstyle = self.user_preferences.get('playstyle', '')
-        
-        if "melee" in playstyle:
-            self.available_classes = ["duelist", "marauder", "scion"]
-        elif "ranged" in playstyle:
-            self.available_classes = ["ranger", "scion"]
-        elif "spell" in playstyle:
-            self.available_classes = ["shadow", "templar", "witch", "scion"]
-        elif "minion" in playstyle:
-            self.available_classes = ["witch", "scion"]
-        else:
-            self.available_classes = list(self.classes.keys())
-        
-        return self.available_classes
+        return self.session.class_options()
     
     def select_class(self):
         filtered_classes = self.filter_classes_by_playstyle()
@@ -189,40 +205,36 @@ class POEExpertSystem:
         
         for key, data in self.classes.items():
             if data['name'] == selected_class_name:
-                self.selected_class = key
+                self.session.choose_class(key)
                 break
         
-        return self.selected_class
+        return self.session.selected_class
     
     def select_subclass(self):
-        if not self.selected_class:
+        session = self.session
+        if not session.selected_class:
             return None
         
-        subclass_options = self.classes[self.selected_class]["subclasses"]
-        self.selected_subclass = self.display_menu(subclass_options, 
-                                                  f"Choose subclass for {self.classes[self.selected_class]['name']}")
-        return self.selected_subclass
+        subclass_options = self.classes[session.selected_class]["subclasses"]
+        session.choose_subclass(self.display_menu(subclass_options, 
+                                                  f"Choose subclass for {self.classes[session.selected_class]['name']}"))
+        return session.selected_subclass
     
     def select_build(self):
-        if not self.selected_class or not self.selected_subclass:
+        session = self.session
+        if not session.selected_class or not session.selected_subclass:
             return None
         
-        budget = self.user_preferences.get('budget', '')
-        build_options = self.classes[self.selected_class]["builds"][self.selected_subclass]
+        build_options = self.classes[session.selected_class]["builds"][session.selected_subclass]
         
-        # Автоматически выбираем билд на основе бюджета
-        if "cheap" in budget:
-            selected_build = build_options[0]
-        elif "medium" in budget:
-            selected_build = build_options[1]
-        else:
-            selected_build = build_options[2]
+        # Рекомендацию по бюджету выводят правила
+        selected_build = session.recommended_build()
         
         print(f"\nBased on your budget preference, recommended build:")
         print(f"{selected_build}")
         
         # Показываем все варианты
-        print(f"\nAll available builds for {self.selected_subclass}:")
+        print(f"\nAll available builds for {session.selected_subclass}:")
         for i, build in enumerate(build_options, 1):
             print(f"{i}. {build}")
         
@@ -230,47 +242,49 @@ class POEExpertSystem:
         while True:
             choice = input("\nPress Enter to accept recommended build or choose another (1-3): ").strip()
             if choice == "":
-                self.selected_build = selected_build
+                session.selected_build = selected_build
                 break
             elif choice in ["1", "2", "3"]:
-                self.selected_build = build_options[int(choice) - 1]
+                session.selected_build = build_options[int(choice) - 1]
                 break
             else:
                 print("Please enter 1, 2, 3 or press Enter")
         
-        return self.selected_build
+        return session.selected_build
     
     def show_final_recommendation(self):
-        if not self.selected_build:
+        session = self.session
+        if not session.selected_build:
             return
         
-        print(f"\nClass: {self.classes[self.selected_class]['name']}")
-        print(f"Subclass: {self.selected_subclass}")
-        print(f"Build: {self.selected_build}")
+        print(f"\nClass: {self.classes[session.selected_class]['name']}")
+        print(f"Subclass: {session.selected_subclass}")
+        print(f"Build: {session.selected_build}")
         print("="*40)
         
         self.give_final_advice()
+        
+        if self.tracer.enabled:
+            self.tracer.explain(session.selected_build, session.why(),
+                                preferences=dict(session.user_preferences),
+                                selected_class=session.selected_class, subclass=session.selected_subclass)
+        
+        others = session.top_builds(3)
+        if others:
+            print("\nAlso matching your preferences:")
+            for class_key, subclass, build, score in others:
+                print(f"- {build} ({self.classes[class_key]['name']}, {subclass})")
     
     def give_final_advice(self):
-        playstyle = self.user_preferences.get('playstyle', '')
-        budget = self.user_preferences.get('budget', '')
+        playstyle = self.session.user_preferences.get('playstyle', '')
+        budget = self.session.user_preferences.get('budget', '')
         
         print(f"\nBased on your preferences:")
         print(f"Playstyle: {playstyle}")
         print(f"Budget: {budget}")
         
-        class_advice = {
-            "duelist": "Great for melee combat and physical damage. Good for beginners.",
-            "ranger": "Master of ranged attacks and evasion. Versatile and mobile.",
-            "shadow": "Specializes in critical strikes and stealth. High damage potential.",
-            "marauder": "Tanky fighter with high health and damage. Very durable.",
-            "witch": "Powerful spellcaster with minions and elemental damage.",
-            "templar": "Hybrid class combining spells and attacks. Good all-rounder.",
-            "scion": "Flexible class that can adapt to many playstyles. Advanced class."
-        }
-        
-        if self.selected_class in class_advice:
-            print(f"Advice: {class_advice[self.selected_class]}")
+        for advice in self.session.advice():
+            print(f"Advice: {advice}")
     
     def backward_chain(self):
         """Обратный логический вывод - поиск по названию билда"""
@@ -288,26 +302,39 @@ class POEExpertSystem:
             if build_input == 'quit':
                 break
             
-            if build_input in self.build_info:
-                info = self.build_info[build_input]
+            with self.tracer.span("build_lookup"):
+                info = self.build_info.get(build_input)
+            
+            if info is not None:
                 #print("\n" + "="*50)
                 print(f"BUILD INFORMATION: {info['full_build_name']}")
                 #print("="*50)
-                print(f"Class: {info['class_name']}")
-                print(f"Subclass: {info['subclass']}")
-                print(f"Playstyle: {info['playstyle']}")
-                print(f"Budget: {info['budget']}")
+                # Каждый ответ - набор ответов пользователя, при котором билд будет рекомендован
+                with self.tracer.span("backward_proof"):
+                    answers = self.prover.prove(("recommended_build", info['full_build_name']))
+                for answer in answers:
+                    assumed = dict(answer.assumptions)
+                    class_data = self.classes[assumed['class']]
+                    print(f"Class: {class_data['name']}")
+                    print(f"Subclass: {assumed['subclass']}")
+                    # Правило по бюджету стиль не спрашивает - показываем стиль класса, как раньше
+                    print(f"Playstyle: {class_data['playstyle'] or 'any'}")
+                    print(f"Budget: {assumed['budget']}")
+                    print("Why:")
+                    print("\n".join(explain(answer.proof, 1)))
                 #print("="*50)
             else:
                 print("Build not found. Please try another name.")
                 # Подсказка похожих билдов
-                similar = [b for b in self.build_info.keys() if build_input in b]
+                with self.tracer.span("fuzzy_search"):
+                    similar = [name for name, score in self.build_search.search(build_input, top=3)]
                 if similar:
                     print("Similar builds: " + ", ".join([self.build_info[b]['full_build_name'] for b in similar[:3]]))
     
     def forward_chain(self):
         """Прямой логический вывод - выбор через вопросы"""
         #print("\n=== FORWARD CHAINING ===")
+        self.reset_session()
         self.ask_playstyle_questions()
         
         if self.select_class():
@@ -330,15 +357,28 @@ class POEExpertSystem:
                 self.forward_chain()
             elif choice == "2":
                 self.backward_chain()
+            elif choice == "trace":
+                # Скрытая команда: профилирование включается и выключается без перезапуска
+                self.tracer.enabled = not self.tracer.enabled
+                print(f"Tracing {'on' if self.tracer.enabled else 'off'}")
             elif choice == "3":
                 #print("Goodbye! Good luck in Wraeclast!")
                 break
             else:
                 print("Invalid choice. Please select 1, 2 or 3.")
 
-def main():
-    expert_system = POEExpertSystem()
-    expert_system.run()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Path of Exile expert system")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="profile rules and lookups; .folded/.txt for flame graphs, JSON otherwise")
+    args = parser.parse_args(argv)
+    
+    expert_system = POEExpertSystem(trace=bool(args.trace))
+    try:
+        expert_system.run()
+    finally:
+        if args.trace:
+            expert_system.tracer.save(args.trace)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
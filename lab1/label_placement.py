@@ -0,0 +1,115 @@
+import numpy as np
+
+# Места для подписи вдоль связи (доля пути от начала) в порядке предпочтения;
+# каждое пробуется по обе стороны от линии
+ALONG = (0.5, 0.35, 0.65, 0.2, 0.8)
+
+
+def place_edge_labels(pos, edge_labels, offset=0.1, char_size=None, bounds=None):
+    """Позиции подписей связей {(u, v): (x, y)}, все связи обрабатываются одним проходом по массивам
+
+    Подпись ставится посередине связи со смещением offset по нормали. Если задан
+    char_size - (ширина символа, высота строки) в координатах данных, - то
+    пересекающиеся подписи разводятся: проигравшая в конфликте переходит на
+    следующее место из ALONG, пока конфликты не кончатся или места не исчерпаются.
+    bounds - видимая область (x0, x1, y0, y1): разводятся только подписи в ней,
+    остальные остаются на исходных местах, так что стоимость разведения
+    зависит от числа подписей на экране, а не от размера сети.
+    """
+    keys = [edge for edge in edge_labels if edge[0] in pos and edge[1] in pos]
+    if not keys:
+        return {}
+
+    start = np.array([pos[u] for u, _ in keys], dtype=float)
+    delta = np.array([pos[v] for _, v in keys], dtype=float) - start
+    length = np.hypot(delta[:, 0], delta[:, 1])
+    # Нормаль к связи; у петель её нет, и подпись остаётся в точке узла
+    normal = np.zeros_like(delta)
+    nonzero = length > 0
+    normal[nonzero] = np.column_stack([-delta[nonzero, 1], delta[nonzero, 0]]) / length[nonzero, None]
+
+    along = np.repeat(ALONG, 2)
+    side = np.tile([1.0, -1.0], len(ALONG))
+
+    def candidate(idx, choice):
+        return start[idx] + delta[idx] * along[choice, None] + normal[idx] * (offset * side[choice, None])
+
+    choice = np.zeros(len(keys), dtype=np.intp)
+    xy = candidate(slice(None), choice)
+
+    if char_size is not None:
+        char_width, height = char_size
+        if bounds is None:
+            shown = np.arange(len(keys))
+        else:
+            # С запасом на сдвиг: с другого места вдоль связи подпись может попасть в кадр
+            x0, x1, y0, y1 = bounds
+            reach = np.abs(delta).max(axis=1) * (max(ALONG) - ALONG[0]) + 2 * offset
+            shown = np.flatnonzero((xy[:, 0] + reach >= min(x0, x1)) & (xy[:, 0] - reach <= max(x0, x1)) &
+                                   (xy[:, 1] + reach >= min(y0, y1)) & (xy[:, 1] - reach <= max(y0, y1)))
+        if len(shown) > 1:
+            half_w = (char_width * np.array([len(str(edge_labels[keys[i]])) for i in shown.tolist()]) +
+                      height) / 2
+            half_h = np.full(len(shown), height / 2)
+            sub_xy, sub_choice = xy[shown], choice[shown]
+            # Проигравший в одном раунде может снова уступить позже, поэтому раундов с запасом
+            # После первого раунда новые пересечения возможны только у сдвинутых подписей
+            moved = None
+            for _ in range(3 * len(along)):
+                losers = _collisions(sub_xy, half_w, half_h, sub_choice, moved)
+                losers = losers[sub_choice[losers] < len(along) - 1]
+                if len(losers) == 0:
+                    break
+                sub_choice[losers] += 1
+                sub_xy[losers] = candidate(shown[losers], sub_choice[losers])
+                moved = losers
+            xy[shown] = sub_xy
+
+    return dict(zip(keys, map(tuple, xy.tolist())))
+
+
+def _collisions(xy, half_w, half_h, choice, active=None):
+    """Номера подписей, проигравших хотя бы в одном пересечении прямоугольников
+
+    Прямоугольники раскладываются по хэш-сетке с ячейкой не меньше самой большой
+    подписи, поэтому пересекаться могут только подписи из соседних ячеек.
+    active - подписи, для которых ищутся пересечения (по умолчанию все).
+    """
+    n = len(xy)
+    cell = np.array([half_w.max() * 2, half_h.max() * 2])
+    cells = np.floor(xy / cell).astype(np.int64)
+    cells -= cells.min(axis=0) - 1
+    stride = cells[:, 1].max() + 2
+    keys = cells[:, 0] * stride + cells[:, 1]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    # Искомые ключи идут по возрастанию - так searchsorted работает намного быстрее
+    needles = order if active is None else active[np.argsort(keys[active], kind='stable')]
+    needle_keys = keys[needles]
+
+    first, second = [], []
+    for dx in (-1, 0, 1):
+        # Три соседние по y ячейки дают непрерывный диапазон ключей
+        target = needle_keys + dx * stride
+        lo = np.searchsorted(sorted_keys, target - 1, 'left')
+        counts = np.searchsorted(sorted_keys, target + 1, 'right') - lo
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        # Все пары (i, j), где j лежит в соседней ячейке
+        i = np.repeat(needles, counts)
+        j = order[np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(total)]
+        keep = i != j
+        first.append(i[keep])
+        second.append(j[keep])
+
+    if not first:
+        return np.empty(0, dtype=np.intp)
+    i, j = np.concatenate(first), np.concatenate(second)
+    hit = ((np.abs(xy[i, 0] - xy[j, 0]) < half_w[i] + half_w[j]) &
+           (np.abs(xy[i, 1] - xy[j, 1]) < half_h[i] + half_h[j]))
+    i, j = i[hit], j[hit]
+    # Уступает подпись, уже сдвинутая дальше от предпочтительного места, при равенстве - более поздняя
+    priority = choice * n + np.arange(n)
+    return np.unique(np.where(priority[i] > priority[j], i, j))
@@ -0,0 +1,160 @@
+import networkx as nx
+import numpy as np
+
+
+class LayoutCache:
+    """Кэш позиций узлов семантической сети с инкрементальным обновлением"""
+
+    def __init__(self, k=3, iterations=100, local_iterations=30, seed=None, version=None):
+        self.k = k
+        self.iterations = iterations
+        self.local_iterations = local_iterations
+        # Функция без аргументов -> версия графа (в приложении - app.graph_version);
+        # узлы графа сверяются с кэшем один раз на версию. Без неё - при каждом вызове positions()
+        self.graph_version = version
+        self._checked_version = None
+        self.pos = {}
+        # Счётчик изменений раскладки - по нему зависимые структуры понимают, что пора перестроиться
+        self.version = 0
+        # Узлы, сдвинутые с прошлого опроса; None - поменялось всё
+        self.changed = None
+        self._rng = np.random.default_rng(seed)
+        self._seed = seed
+
+    def positions(self, G):
+        """Возвращает актуальные позиции всех узлов графа"""
+        if G.number_of_nodes() == 0:
+            if self.pos:
+                self.clear()
+            return self.pos
+
+        version = None if self.graph_version is None else self.graph_version()
+        if not self.pos:
+            self.recompute(G)
+        elif version is not None and version == self._checked_version:
+            # Граф с прошлой сверки не менялся - обход всех узлов не нужен
+            pass
+        elif len(self.pos) != G.number_of_nodes() or any(n not in self.pos for n in G):
+            # Граф менялся в обход кэша - досчитываем только недостающее
+            for node in [n for n in self.pos if n not in G]:
+                del self.pos[node]
+            missing = [n for n in G if n not in self.pos]
+            for node in missing:
+                self.pos[node] = self._initial_position(G, node)
+            if missing:
+                self._relax(G, missing)
+            self._mark(None)
+
+        self._checked_version = version
+        return self.pos
+
+    def recompute(self, G, pos=None):
+        """Полный пересчёт раскладки (при загрузке файла или по запросу)"""
+        if G.number_of_nodes() == 0:
+            self.clear()
+            return self.pos
+        self.pos = nx.spring_layout(G, k=self.k, iterations=self.iterations,
+                                    pos=pos, seed=self._seed)
+        self._mark(None)
+        return self.pos
+
+    def set_positions(self, pos):
+        """Подменяет позиции целиком (например, результатом фонового расчёта)"""
+        self.pos = dict(pos)
+        # Позиции посчитаны снаружи, возможно для прежнего графа - при следующем опросе сверяем
+        self._checked_version = None
+        self._mark(None)
+
+    def add_node(self, G, node):
+        if not self.pos:
+            # Первый узел или кэш ещё не построен - пусть positions() посчитает всё сразу
+            return
+        self.pos[node] = self._initial_position(G, node)
+        self._mark({node} | self._relax(G, [node]))
+
+    def add_edge(self, G, u, v):
+        if not self.pos:
+            return
+        for node in (u, v):
+            if node not in self.pos:
+                self.pos[node] = self._initial_position(G, node)
+        self._mark({u, v} | self._relax(G, [u, v]))
+
+    def remove_edge(self, G, u, v):
+        # Позиции не меняются, но отрисовке нужно знать о затронутых узлах
+        self._mark({u, v} & set(self.pos))
+
+    def remove_node(self, G, node):
+        if node in self.pos:
+            del self.pos[node]
+            self._mark({node})
+
+    def clear(self):
+        self.pos = {}
+        self._checked_version = None
+        self._mark(None)
+
+    def take_changes(self):
+        """Забирает накопленные изменения: множество узлов или None, если поменялось всё"""
+        changed, self.changed = self.changed, set()
+        return changed
+
+    def _mark(self, nodes):
+        self.version += 1
+        if nodes is None or self.changed is None:
+            self.changed = None
+        else:
+            self.changed |= nodes
+
+    def _initial_position(self, G, node):
+        """Начальная позиция нового узла - рядом с уже размещёнными соседями"""
+        neighbours = [n for n in nx.all_neighbors(G, node) if n in self.pos] if node in G else []
+        spread = self._local_k(G)
+
+        if neighbours:
+            center = np.mean([self.pos[n] for n in neighbours], axis=0)
+            return center + self._rng.normal(scale=spread * 0.3, size=2)
+
+        # Соседей нет - ставим в случайную точку внутри текущей области рисунка
+        coords = np.array(list(self.pos.values()))
+        low, high = coords.min(axis=0), coords.max(axis=0)
+        if np.allclose(low, high):
+            return low + self._rng.normal(scale=spread, size=2)
+        return self._rng.uniform(low, high)
+
+    def _relax(self, G, nodes):
+        """Локальная релаксация: двигаются только затронутые узлы и их соседи"""
+        movable = set()
+        for node in nodes:
+            if node in G:
+                movable.add(node)
+                movable.update(nx.all_neighbors(G, node))
+
+        # Граница области остаётся на месте и удерживает её в общей раскладке
+        boundary = set()
+        for node in movable:
+            boundary.update(nx.all_neighbors(G, node))
+        boundary -= movable
+
+        region = movable | boundary
+        if len(region) < 2:
+            return set()
+
+        # Область рисунка до релаксации - локальный пересчёт не должен её раздувать
+        coords = np.array([self.pos[n] for n in self.pos if n not in movable] or list(self.pos.values()))
+        low, high = coords.min(axis=0), coords.max(axis=0)
+        margin = np.maximum((high - low) * 0.1, 0.1)
+
+        sub = G.subgraph(region)
+        local_pos = nx.spring_layout(sub, k=self._local_k(G),
+                                     pos={n: self.pos[n] for n in region},
+                                     fixed=list(boundary),
+                                     iterations=self.local_iterations,
+                                     seed=self._seed)
+        for node in movable:
+            self.pos[node] = np.clip(local_pos[node], low - margin, high + margin)
+        return movable
+
+    def _local_k(self, G):
+        # Раскладка нормирована в квадрат [-1, 1], поэтому оптимальное расстояние ~ 2 / sqrt(n)
+        return 2.0 / np.sqrt(max(G.number_of_nodes(), 1))
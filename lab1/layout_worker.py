@@ -0,0 +1,126 @@
+import queue
+import threading
+
+import networkx as nx
+import numpy as np
+
+
+class LayoutWorker:
+    """Расчёт раскладки в фоновом потоке с промежуточными результатами
+
+    Каждые chunk итераций текущие позиции кладутся в очередь, откуда их забирает
+    поток интерфейса. Новый запуск отменяет предыдущий; результаты старых
+    запусков отбрасываются по номеру поколения.
+    """
+
+    def __init__(self, k=3, iterations=100, chunk=10, warm_temperature=0.3, seed=None):
+        self.k = k
+        self.iterations = iterations
+        self.chunk = chunk
+        # Тёплый старт начинается с меньшей "температуры", чтобы не разрушать готовую картину
+        self.warm_temperature = warm_temperature
+        self.generation = 0
+        self.results = queue.Queue()
+        self._delivered = 0
+        self._cancel = None
+        self._rng = np.random.default_rng(seed)
+
+    def start(self, G, pos=None):
+        """Запускает расчёт по снимку графа; pos - позиции для тёплого старта"""
+        self.cancel()
+        self.generation += 1
+        if G.number_of_nodes() == 0:
+            self._delivered = self.generation
+            return
+
+        nodes = list(G)
+        ids = {node: i for i, node in enumerate(nodes)}
+        edges = np.array([(ids[u], ids[v]) for u, v in G.edges() if u != v],
+                         dtype=np.int64).reshape(-1, 2)
+
+        init = self._rng.random((len(nodes), 2))
+        warm = bool(pos) and any(node in pos for node in nodes)
+        if warm:
+            known = [i for i, node in enumerate(nodes) if node in pos]
+            coords = np.array([pos[nodes[i]] for i in known], dtype=float)
+            low, high = coords.min(axis=0), coords.max(axis=0)
+            # Узлы без позиции - в случайную точку текущей области
+            init = low + init * np.maximum(high - low, 1e-3)
+            init[known] = coords
+
+        self._cancel = threading.Event()
+        threading.Thread(target=self._run, daemon=True,
+                         args=(self.generation, nodes, edges, init, warm, self._cancel)).start()
+
+    def cancel(self):
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+        # Результаты, которые отменённый поток успел положить в очередь, уже не нужны
+        self.generation += 1
+        self._delivered = self.generation
+
+    def busy(self):
+        """Есть ли незабранные результаты текущего запуска"""
+        return self._delivered != self.generation
+
+    def poll(self):
+        """Последние позиции текущего запуска: (pos, готово) или None"""
+        latest = None
+        while True:
+            try:
+                generation, pos, done = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self.generation:
+                latest = (pos, done)
+                if done:
+                    self._delivered = generation
+        return latest
+
+    def _run(self, generation, nodes, edges, pos, warm, cancel):
+        # Начальная температура и её линейное убывание - как в nx.spring_layout
+        t = max(np.ptp(pos[:, 0]), np.ptp(pos[:, 1])) * 0.1
+        if warm:
+            t *= self.warm_temperature
+        dt = t / (self.iterations + 1)
+
+        done = False
+        for i in range(self.iterations):
+            if cancel.is_set():
+                return
+            delta = _fruchterman_reingold_step(pos, edges, self.k, t)
+            pos += delta
+            t -= dt
+            done = np.linalg.norm(delta) / len(nodes) < 1e-4 or i == self.iterations - 1
+            if done or (i + 1) % self.chunk == 0:
+                scaled = nx.rescale_layout(pos.copy())
+                self.results.put((generation, dict(zip(nodes, scaled)), done))
+            if done:
+                return
+
+
+def _fruchterman_reingold_step(pos, edges, k, t):
+    """Одна итерация Фрюхтермана-Рейнгольда: отталкивание всех пар и притяжение по связям"""
+    n = len(pos)
+    disp = np.zeros_like(pos)
+    # Отталкивание считаем блоками строк, чтобы матрица разностей не занимала n^2 памяти
+    x, y = pos[:, 0], pos[:, 1]
+    block = max(1, 1_000_000 // n)
+    for start in range(0, n, block):
+        stop = start + block
+        dx = x[start:stop, None] - x
+        dy = y[start:stop, None] - y
+        weight = k * k / np.maximum(dx * dx + dy * dy, 1e-4)
+        disp[start:stop, 0] = (dx * weight).sum(axis=1)
+        disp[start:stop, 1] = (dy * weight).sum(axis=1)
+
+    if len(edges):
+        delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+        dist = np.maximum(np.hypot(delta[:, 0], delta[:, 1]), 0.01)
+        force = delta * (dist / k)[:, None]
+        np.subtract.at(disp, edges[:, 0], force)
+        np.add.at(disp, edges[:, 1], force)
+
+    length = np.maximum(np.hypot(disp[:, 0], disp[:, 1]), 0.01)
+    return disp * (t / length)[:, None]
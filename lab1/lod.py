@@ -0,0 +1,188 @@
+import networkx as nx
+import numpy as np
+from matplotlib.collections import LineCollection
+
+
+class LevelOfDetail:
+    """Уровни детализации для больших сетей
+
+    Пока в кадре мало узлов, рисуются сами узлы (и только попавшие в кадр).
+    Если узлов в кадре слишком много, сеть показывается кластерами - сообществами,
+    найденными один раз на версию графа. При изменении пределов осей картинка
+    уточняется заново.
+    """
+
+    def __init__(self, ax, renderer, index, source, detail_limit=300, label_limit=120,
+                 min_edge_px=4, edge_label_px=80, cluster_labels=15):
+        self.ax = ax
+        self.renderer = renderer
+        self.index = index
+        # source() -> (G, pos, версия раскладки, версия графа)
+        self.source = source
+        self.detail_limit = detail_limit
+        self.label_limit = label_limit
+        self.min_edge_px = min_edge_px
+        self.edge_label_px = edge_label_px
+        self.cluster_labels = cluster_labels
+
+        self.active = False
+        self.mode = None
+        self._clusters_version = None
+        self._centroids_version = None
+        self._cluster_artists = []
+        self._updating = False
+        self._timer = None
+
+        ax.callbacks.connect('xlim_changed', self._on_limits_changed)
+        ax.callbacks.connect('ylim_changed', self._on_limits_changed)
+
+    def wanted(self, G):
+        """Детализация нужна только сетям, которые целиком не помещаются в кадр"""
+        return G.number_of_nodes() > self.detail_limit
+
+    def activate(self):
+        self.active = True
+
+    def deactivate(self):
+        self.active = False
+        self.mode = None
+        self._clear_clusters()
+
+    # --- обновление картинки ---------------------------------------------------
+
+    def update_view(self):
+        if not self.active or self._updating:
+            return
+        self._updating = True
+        try:
+            G, pos, layout_version, graph_version = self.source()
+            self.index.sync(pos, layout_version)
+            (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+            visible = self.index.query_rect(x0, y0, x1, y1)
+
+            if len(visible) > self.detail_limit:
+                self._show_clusters(G, pos, graph_version, layout_version)
+            else:
+                self._show_detail(G, pos, visible)
+        finally:
+            self._updating = False
+
+    def _show_detail(self, G, pos, visible):
+        self._clear_clusters()
+        self.mode = 'detail'
+        px = self._pixels_per_unit()
+
+        visible_set = set(visible)
+        edges, edge_labels = set(), set()
+        for node in visible:
+            for u, v in list(G.out_edges(node)) + list(G.in_edges(node)):
+                if (u, v) in edges:
+                    continue
+                length = np.hypot(*(np.asarray(pos[u]) - np.asarray(pos[v])) * px)
+                # Слишком короткие на экране связи не рисуем - они сливаются с узлами
+                if length < self.min_edge_px:
+                    continue
+                edges.add((u, v))
+                if length >= self.edge_label_px and u in visible_set and v in visible_set:
+                    edge_labels.add((u, v))
+
+        self.renderer.show_subset(G, pos, visible, edges,
+                                  node_labels=len(visible) <= self.label_limit,
+                                  edge_labels=edge_labels)
+
+    def _show_clusters(self, G, pos, graph_version, layout_version):
+        # Отдельные артисты узлов в этом режиме не нужны
+        self.renderer.show_subset(G, pos, (), ())
+        self.mode = 'clusters'
+        self._ensure_clusters(G, graph_version)
+        self._ensure_centroids(pos, graph_version, layout_version)
+        self._clear_clusters()
+
+        centers, sizes = self.centroids, self.cluster_sizes
+        px = self._pixels_per_unit()
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        inside = ((centers[:, 0] >= x0) & (centers[:, 0] <= x1) &
+                  (centers[:, 1] >= y0) & (centers[:, 1] <= y1))
+
+        # Связи между кластерами: толщина растёт с числом исходных связей
+        if len(self.cluster_edges):
+            a, b, counts = self.cluster_edges.T
+            segments = np.stack([centers[a], centers[b]], axis=1)
+            lengths = np.hypot(*((segments[:, 1] - segments[:, 0]) * px).T)
+            keep = (inside[a] | inside[b]) & (lengths >= self.min_edge_px)
+            if keep.any():
+                lines = LineCollection(segments[keep], colors='gray', alpha=0.5,
+                                       linewidths=0.5 + np.log1p(counts[keep]), zorder=1)
+                self.ax.add_collection(lines, autolim=False)
+                self._cluster_artists.append(lines)
+
+        marker_sizes = 100 + 40 * np.sqrt(sizes)
+        dots = self.ax.scatter(centers[inside, 0], centers[inside, 1], s=marker_sizes[inside],
+                               c='lightblue', edgecolors='gray', alpha=0.8, zorder=2)
+        self._cluster_artists.append(dots)
+
+        # Подписываем только крупнейшие кластеры в кадре
+        order = [i for i in np.argsort(-sizes) if inside[i]][:self.cluster_labels]
+        for i in order:
+            text = self.ax.text(centers[i, 0], centers[i, 1],
+                                f'{self.representatives[i]}\n({sizes[i]})',
+                                ha='center', va='center', fontsize=9, zorder=3)
+            self._cluster_artists.append(text)
+
+    def _clear_clusters(self):
+        for artist in self._cluster_artists:
+            artist.remove()
+        self._cluster_artists = []
+
+    # --- кэш кластеров ---------------------------------------------------------------
+
+    def _ensure_clusters(self, G, graph_version):
+        if self._clusters_version == graph_version:
+            return
+        communities = nx.community.louvain_communities(G.to_undirected(as_view=True), seed=0)
+        self.members = [list(c) for c in communities]
+        self.cluster_of = {n: i for i, c in enumerate(self.members) for n in c}
+        self.cluster_sizes = np.array([len(c) for c in self.members])
+        # Кластер подписывается самым связанным своим узлом
+        self.representatives = [max(c, key=G.degree) for c in self.members]
+
+        if G.number_of_edges():
+            ends = np.array([(self.cluster_of[u], self.cluster_of[v]) for u, v in G.edges()])
+            ends = ends[ends[:, 0] != ends[:, 1]]
+            if len(ends):
+                pairs, counts = np.unique(ends, axis=0, return_counts=True)
+                self.cluster_edges = np.column_stack([pairs, counts])
+            else:
+                self.cluster_edges = np.empty((0, 3), dtype=int)
+        else:
+            self.cluster_edges = np.empty((0, 3), dtype=int)
+        self._clusters_version = graph_version
+        self._centroids_version = None
+
+    def _ensure_centroids(self, pos, graph_version, layout_version):
+        key = (graph_version, layout_version)
+        if self._centroids_version == key:
+            return
+        self.centroids = np.array([np.mean([pos[n] for n in c], axis=0) for c in self.members])
+        self._centroids_version = key
+
+    # --- события осей -------------------------------------------------------------------
+
+    def _pixels_per_unit(self):
+        bbox = self.ax.bbox
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        return np.array([bbox.width / max(x1 - x0, 1e-12), bbox.height / max(y1 - y0, 1e-12)])
+
+    def _on_limits_changed(self, ax):
+        if not self.active or self._updating:
+            return
+        # xlim и ylim меняются парой - откладываем уточнение, чтобы сделать его один раз
+        if self._timer is None:
+            self._timer = self.ax.figure.canvas.new_timer(interval=50)
+            self._timer.single_shot = True
+            self._timer.add_callback(self._refine)
+        self._timer.start()
+
+    def _refine(self):
+        self.update_view()
+        self.ax.figure.canvas.draw_idle()
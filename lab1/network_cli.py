@@ -0,0 +1,322 @@
+# Пакетная работа с семантическими сетями без графического интерфейса
+#
+# Примеры:
+#   python network_cli.py import -o net.json edges.csv more_edges.tsv facts.jsonl
+#   python network_cli.py merge -o all.snb net1.json net2.snb --prefer first
+#   python network_cli.py filter -o birds.json net.json --relation является --drop-isolated
+#   python network_cli.py export -o edges.tsv net.json
+#
+# Запросы к одной сети:
+#   python network_cli.py ask semantic_network.json дрозд умеет летать
+#   python network_cli.py query semantic_network.json "?x является птица" "?x умеет ?y"
+#   python network_cli.py snapshot -o snapshot_dir big_network.snb
+#   python network_cli.py activate semantic_network.json дрозд петь --top 5
+#   python network_cli.py stats semantic_network.json --path дрозд животное
+#
+# Модуль не импортирует matplotlib и tkinter и пользуется теми же функциями
+# чтения и записи, что и lab1.py.
+import argparse
+import csv
+import json
+import os
+import sys
+
+import networkx as nx
+
+from activation import SpreadingActivation
+from analytics import NetworkAnalytics
+from csr_snapshot import GraphSnapshot
+from inheritance import InheritanceIndex
+from network_io import DEFAULT_RELATION, iter_network, load_network_file, save_network_file
+from relation_index import RelationIndex
+
+# Названия колонок в заголовке таблицы связей
+SOURCE_COLUMNS = ('source', 'from', 'subject', 'u', 'от')
+TARGET_COLUMNS = ('target', 'to', 'object', 'v', 'к')
+RELATION_COLUMNS = ('relation', 'predicate', 'связь')
+
+TABLE_EXTENSIONS = {'.csv': ',', '.tsv': '\t', '.tab': '\t'}
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+
+
+def is_edge_table(filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return ext in TABLE_EXTENSIONS or ext in JSONL_EXTENSIONS
+
+
+# ---------------------------------------------------------------------------
+# Чтение
+
+def iter_edge_table(filename, default_relation=DEFAULT_RELATION):
+    """Строки таблицы связей (CSV/TSV/JSONL) по одной: (u, v, атрибуты)
+
+    Заголовок CSV/TSV распознаётся по названиям колонок; без него колонки идут
+    в порядке источник, цель, связь. Строка JSONL - объект с теми же ключами
+    или список [u, v, связь].
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        if ext in JSONL_EXTENSIONS:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield _jsonl_edge(json.loads(line), default_relation, filename, line_no)
+            return
+
+        reader = csv.reader(f, delimiter=TABLE_EXTENSIONS.get(ext, ','))
+        columns = None
+        for row in reader:
+            if not row or not any(cell.strip() for cell in row):
+                continue
+            if columns is None:
+                columns = _header_columns(row)
+                if columns is not None:
+                    continue
+                columns = False
+            yield _table_edge(row, columns, default_relation)
+
+
+def _header_columns(row):
+    """Номера колонок (источник, цель, связь, прочие), если строка - заголовок, иначе None"""
+    names = [cell.strip().lower() for cell in row]
+
+    def find(aliases):
+        return next((i for i, name in enumerate(names) if name in aliases), None)
+
+    source, target = find(SOURCE_COLUMNS), find(TARGET_COLUMNS)
+    if source is None or target is None:
+        return None
+    relation = find(RELATION_COLUMNS)
+    extra = {i: row[i].strip() for i in range(len(row)) if i not in (source, target, relation)}
+    return source, target, relation, extra
+
+
+def _table_edge(row, columns, default_relation):
+    if not columns:
+        relation = row[2].strip() if len(row) > 2 and row[2].strip() else default_relation
+        return row[0].strip(), row[1].strip(), {'relation': relation}
+
+    source, target, relation, extra = columns
+    attrs = {name: row[i] for i, name in extra.items() if i < len(row) and row[i] != ''}
+    value = row[relation].strip() if relation is not None and relation < len(row) else ''
+    attrs['relation'] = value or default_relation
+    return row[source].strip(), row[target].strip(), attrs
+
+
+def _jsonl_edge(item, default_relation, filename, line_no):
+    if isinstance(item, list) and len(item) >= 2:
+        relation = item[2] if len(item) > 2 else default_relation
+        return item[0], item[1], {'relation': relation}
+    if isinstance(item, dict):
+        item = dict(item)
+        ends = [next((item.pop(k) for k in aliases if k in item), None)
+                for aliases in (SOURCE_COLUMNS, TARGET_COLUMNS)]
+        if None not in ends:
+            relation = next((item.pop(k) for k in RELATION_COLUMNS if k in item), None)
+            item['relation'] = relation or default_relation
+            return ends[0], ends[1], item
+    raise ValueError(f'{filename}:{line_no}: не удалось разобрать связь')
+
+
+def iter_source(filename, default_relation=DEFAULT_RELATION):
+    """Элементы любого входного файла: сети (JSON/.snb) или таблицы связей"""
+    if is_edge_table(filename):
+        for edge in iter_edge_table(filename, default_relation):
+            yield 'edges', edge
+    else:
+        yield from iter_network(filename)
+
+
+# ---------------------------------------------------------------------------
+# Построение и преобразование
+
+def build_network(filenames, G=None, prefer='last', relations=None, exclude=None,
+                  batch_size=10000, default_relation=DEFAULT_RELATION):
+    """Собирает одну сеть из нескольких файлов с удалением дублей
+
+    Повторная связь между теми же узлами не создаёт вторую: при prefer='last'
+    остаются атрибуты последнего файла, при prefer='first' - первого.
+    relations/exclude - какие отношения оставить или отбросить.
+    """
+    if G is None:
+        G = nx.DiGraph()
+    keep = set(relations) if relations else None
+    drop = set(exclude) if exclude else set()
+
+    nodes, edges = [], []
+
+    def flush():
+        if prefer == 'first':
+            # Генераторы читают граф по ходу вставки, так что дубли внутри пачки тоже отсекаются
+            G.add_nodes_from((n, {k: v for k, v in d.items() if n not in G or k not in G.nodes[n]})
+                             for n, d in nodes)
+            G.add_edges_from(e for e in edges if not G.has_edge(e[0], e[1]))
+        else:
+            G.add_nodes_from(nodes)
+            G.add_edges_from(edges)
+        nodes.clear()
+        edges.clear()
+
+    for filename in filenames:
+        for kind, item in iter_source(filename, default_relation):
+            if kind == 'nodes':
+                nodes.append(item)
+            else:
+                relation = item[2].get('relation', '')
+                if (keep is not None and relation not in keep) or relation in drop:
+                    continue
+                edges.append(item)
+            if len(nodes) + len(edges) >= batch_size:
+                flush()
+        # Порядок файлов важен для prefer, поэтому пачки не переходят через границу файла
+        flush()
+    return G
+
+
+def filter_network(G, relations=None, exclude=None, drop_isolated=False):
+    """Оставляет в сети только связи с нужными отношениями (на месте)"""
+    keep = set(relations) if relations else None
+    drop = set(exclude) if exclude else set()
+    G.remove_edges_from([(u, v) for u, v, relation in G.edges(data='relation', default='')
+                         if (keep is not None and relation not in keep) or relation in drop])
+    if drop_isolated:
+        G.remove_nodes_from(list(nx.isolates(G)))
+    return G
+
+
+def write_edge_table(G, filename):
+    """Выгружает связи в CSV/TSV/JSONL (формат по расширению); узлы без связей не попадают"""
+    ext = os.path.splitext(filename)[1].lower()
+    tmp_name = filename + '.tmp'
+    with open(tmp_name, 'w', encoding='utf-8', newline='') as f:
+        if ext in JSONL_EXTENSIONS:
+            for u, v, d in G.edges(data=True):
+                f.write(json.dumps(dict(d, source=u, target=v), ensure_ascii=False) + '\n')
+        else:
+            writer = csv.writer(f, delimiter=TABLE_EXTENSIONS.get(ext, ','))
+            writer.writerow(['source', 'target', 'relation'])
+            writer.writerows((u, v, relation) for u, v, relation
+                             in G.edges(data='relation', default=''))
+    os.replace(tmp_name, filename)
+
+
+def export_network(G, filename):
+    """Сохраняет сеть в формат по расширению: таблица связей, JSON или .snb"""
+    if is_edge_table(filename):
+        write_edge_table(G, filename)
+    else:
+        save_network_file(G, filename)
+
+
+# ---------------------------------------------------------------------------
+# Запросы к сети
+
+def ask(args):
+    answer = InheritanceIndex(load_network_file(args.network)).has_property(args.node, args.relation, args.value)
+    print({True: 'да', False: 'нет', None: 'неизвестно'}[answer])
+    return 0
+
+
+def query_triples(args):
+    for row in RelationIndex(load_network_file(args.network)).query(args.patterns, limit=args.limit):
+        print(', '.join(f'{var} = {value}' for var, value in sorted(row.items())))
+    return 0
+
+
+def snapshot(args):
+    # Снимок строится прямо из файла, граф networkx не создаётся
+    GraphSnapshot.from_file(args.network).save(args.output)
+    result = GraphSnapshot.load(args.output)
+    print(f'{args.output}: узлов {result.number_of_nodes()}, связей {result.number_of_edges()}')
+    return 0
+
+
+def activate(args):
+    G = load_network_file(args.network)
+    missing = [node for node in args.seeds if node not in G]
+    if missing:
+        print(f'Нет узлов: {", ".join(missing)}', file=sys.stderr)
+        return 1
+    retrieval = SpreadingActivation(G, steps=args.steps)
+    for node, score in retrieval.activate(args.seeds, top=args.top):
+        print(f'{score:.4f}  {node}')
+    return 0
+
+
+def stats(args):
+    analytics = NetworkAnalytics(load_network_file(args.network))
+    print(analytics.summary(top=args.top))
+    if args.path:
+        path = analytics.shortest_path(*args.path)
+        print('Путь:', ' ; '.join(f'{u} {r} {v}' for u, r, v in path) if path else 'нет')
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Командная строка
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Пакетная обработка семантических сетей')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def command(name, help_text):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument('inputs', nargs='+', help='входные файлы')
+        sub.add_argument('-o', '--output', required=True, help='выходной файл (.json, .snb, .csv, .tsv, .jsonl)')
+        sub.add_argument('--relation', action='append', help='оставить только это отношение (можно несколько)')
+        sub.add_argument('--exclude', action='append', help='отбросить это отношение (можно несколько)')
+        sub.add_argument('--drop-isolated', action='store_true', help='удалить узлы без связей')
+        return sub
+
+    sub = command('import', 'таблицы связей CSV/TSV/JSONL -> сеть')
+    sub.add_argument('--default-relation', default=DEFAULT_RELATION, help='отношение для строк без него')
+    sub = command('merge', 'объединение нескольких сетей с удалением дублей')
+    sub.add_argument('--prefer', choices=('first', 'last'), default='last',
+                     help='чьи атрибуты оставлять при повторе связи')
+    command('filter', 'отбор связей по отношению')
+    command('export', 'выгрузка сети в другой формат')
+
+    queries = {}
+
+    def query(name, help_text, handler):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument('network', help='файл сети (.json или .snb)')
+        queries[name] = handler
+        return sub
+
+    sub = query('ask', 'наследуемое свойство узла: да, нет или неизвестно', ask)
+    sub.add_argument('node')
+    sub.add_argument('relation')
+    sub.add_argument('value')
+    sub = query('query', 'шаблоны троек с переменными ?x, соединённые по общим переменным', query_triples)
+    sub.add_argument('patterns', nargs='+', help='шаблон "субъект отношение объект"')
+    sub.add_argument('--limit', type=int, help='не больше стольких ответов')
+    sub = query('snapshot', 'снимок CSR для чтения через mmap (csr_snapshot.py)', snapshot)
+    sub.add_argument('-o', '--output', required=True, help='каталог снимка')
+    sub = query('activate', 'ассоциативный поиск распространением активации от узлов', activate)
+    sub.add_argument('seeds', nargs='+', help='начальные узлы')
+    sub.add_argument('--top', type=int, default=10, help='сколько узлов вывести')
+    sub.add_argument('--steps', type=int, default=3, help='шагов распространения')
+    sub = query('stats', 'компоненты, циклы "является", рейтинги узлов и кратчайший путь', stats)
+    sub.add_argument('--top', type=int, default=5, help='длина рейтингов')
+    sub.add_argument('--path', nargs=2, metavar=('ОТ', 'К'), help='кратчайшая цепочка связей между узлами')
+
+    args = parser.parse_args(argv)
+    if args.command in queries:
+        return queries[args.command](args)
+    if args.command == 'import':
+        not_tables = [name for name in args.inputs if not is_edge_table(name)]
+        if not_tables:
+            parser.error(f'не таблицы связей: {", ".join(not_tables)}')
+
+    G = build_network(args.inputs, prefer=getattr(args, 'prefer', 'last'),
+                      relations=args.relation, exclude=args.exclude,
+                      default_relation=getattr(args, 'default_relation', DEFAULT_RELATION))
+    if args.drop_isolated:
+        filter_network(G, drop_isolated=True)
+    export_network(G, args.output)
+    print(f'{args.output}: узлов {G.number_of_nodes()}, связей {G.number_of_edges()}')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+import json
+import os
+import struct
+
+import networkx as nx
+import numpy as np
+
+# Компактный бинарный формат: заголовок, таблица строк и целочисленные массивы связей
+BINARY_MAGIC = b'SNETBIN1'
+BINARY_EXTENSION = '.snb'
+_HEADER = struct.Struct('<8sIQQQ')
+
+DEFAULT_RELATION = "связан с"
+
+
+def load_network_file(filename, G=None, batch_size=10000, meta=None):
+    """Загружает сеть из JSON или бинарного файла, формат определяется по содержимому
+
+    Если передан словарь meta, в него попадают служебные данные файла (например, номер журнала).
+    """
+    if G is None:
+        G = nx.DiGraph()
+    G.clear()
+
+    if is_binary_network(filename):
+        read_binary_network(filename, G, meta=meta)
+    else:
+        read_json_network(filename, G, batch_size=batch_size, meta=meta)
+    return G
+
+
+def save_network_file(G, filename, meta=None):
+    """Сохраняет сеть; файлы с расширением .snb пишутся в бинарном формате"""
+    if filename.lower().endswith(BINARY_EXTENSION):
+        write_binary_network(G, filename, meta=meta)
+    else:
+        write_json_network(G, filename, meta=meta)
+
+
+def iter_network(filename, meta=None):
+    """Элементы сети любого формата по одному: ('nodes', (узел, атрибуты)) и ('edges', (u, v, атрибуты))"""
+    if is_binary_network(filename):
+        # Бинарный файл читается массивами целиком, но отдаётся так же поэлементно
+        G = read_binary_network(filename, nx.DiGraph(), meta=meta)
+        for node, attrs in G.nodes(data=True):
+            yield 'nodes', (node, attrs)
+        for u, v, attrs in G.edges(data=True):
+            yield 'edges', (u, v, attrs)
+        return
+
+    for kind, item in iter_json_network(filename):
+        if kind == 'meta':
+            if meta is not None and isinstance(item, dict):
+                meta.update(item)
+        elif kind == 'nodes':
+            entry = _node_entry(item)
+            yield kind, entry if isinstance(entry, tuple) else (entry, {})
+        elif kind == 'edges':
+            yield kind, _edge_entry(item)
+
+
+def is_binary_network(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+# ---------------------------------------------------------------------------
+# Потоковый JSON
+
+def read_json_network(filename, G, batch_size=10000, meta=None):
+    """Читает {"nodes": [...], "edges": [...]} по элементам и добавляет их пачками"""
+    nodes, edges = [], []
+    for kind, item in iter_json_network(filename):
+        if kind == 'meta':
+            if meta is not None and isinstance(item, dict):
+                meta.update(item)
+        elif kind == 'nodes':
+            nodes.append(_node_entry(item))
+            if len(nodes) >= batch_size:
+                G.add_nodes_from(nodes)
+                nodes = []
+        elif kind == 'edges':
+            edges.append(_edge_entry(item))
+            if len(edges) >= batch_size:
+                G.add_edges_from(edges)
+                edges = []
+    G.add_nodes_from(nodes)
+    G.add_edges_from(edges)
+    return G
+
+
+def iter_json_network(filename, chunk_size=1 << 20):
+    """Генератор пар (раздел, элемент) без загрузки всего документа в память
+
+    Раздел 'meta' отдаётся одним элементом целиком.
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f, chunk_size)
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        while True:
+            key = stream.read_value()
+            stream.expect(':')
+            if key in ('nodes', 'edges') and stream.peek() == '[':
+                for item in stream.iter_array():
+                    yield key, item
+            else:
+                value = stream.read_value()
+                # Прочие разделы, кроме служебного, пропускаем
+                if key == 'meta':
+                    yield key, value
+            if stream.next_char() == '}':
+                return
+
+
+def write_json_network(G, filename, batch_size=10000, meta=None):
+    """Пишет сеть потоково: по одному элементу на строку, без построения документа в памяти"""
+    tmp_name = filename + '.tmp'
+    with open(tmp_name, 'w', encoding='utf-8') as f:
+        f.write('{')
+        if meta:
+            f.write('"meta": ' + json.dumps(meta, ensure_ascii=False) + ',\n')
+        f.write('"nodes": [\n')
+        _write_items(f, ([n, d] for n, d in G.nodes(data=True)), batch_size)
+        f.write('],\n"edges": [\n')
+        _write_items(f, ([u, v, d] for u, v, d in G.edges(data=True)), batch_size)
+        f.write(']}\n')
+    # Подменяем файл целиком, чтобы сбой посреди записи не испортил старую версию
+    os.replace(tmp_name, filename)
+
+
+def _write_items(f, items, batch_size):
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(', ', ': ')).encode
+    batch = []
+    first = True
+    for item in items:
+        batch.append(('' if first else ',\n') + dumps(item))
+        first = False
+        if len(batch) >= batch_size:
+            f.write(''.join(batch))
+            batch = []
+    if batch:
+        f.write(''.join(batch))
+    if not first:
+        f.write('\n')
+
+
+def _node_entry(item):
+    if isinstance(item, list) and len(item) == 2 and isinstance(item[1], dict):
+        return item[0], item[1]
+    # Для обратной совместимости со старым форматом
+    return item
+
+
+def _edge_entry(item):
+    if len(item) == 3:
+        return item[0], item[1], item[2]
+    # Для обратной совместимости
+    return item[0], item[1], {'relation': DEFAULT_RELATION}
+
+
+class _JsonStream:
+    """Минимальный потоковый разбор JSON поверх json.JSONDecoder.raw_decode"""
+
+    _WHITESPACE = ' \t\n\r'
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Отбрасываем уже разобранную часть буфера
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self._WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError('Неожиданный конец файла')
+
+    def next_char(self):
+        ch = self.peek()
+        self.pos += 1
+        return ch
+
+    def expect(self, ch):
+        got = self.next_char()
+        if got != ch:
+            raise ValueError(f'Ожидался символ {ch!r}, получен {got!r}')
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Значение, упёршееся в конец буфера (например, число), могло быть обрезано
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.read_value()
+            ch = self.next_char()
+            if ch == ']':
+                return
+            if ch != ',':
+                raise ValueError(f'Ожидалась запятая, получен {ch!r}')
+
+
+# ---------------------------------------------------------------------------
+# Бинарный формат
+
+def write_binary_network(G, filename, meta=None):
+    """Пишет сеть с интернированием строк: имена узлов, связи и атрибуты хранятся один раз"""
+    strings = {}
+
+    def intern(s):
+        if s not in strings:
+            strings[s] = len(strings)
+        return strings[s]
+
+    node_ids = {}
+    node_names = np.empty(G.number_of_nodes(), dtype=np.int32)
+    node_attrs = np.empty(G.number_of_nodes(), dtype=np.int32)
+    for i, (node, attrs) in enumerate(G.nodes(data=True)):
+        if not isinstance(node, str):
+            raise ValueError('Бинарный формат поддерживает только строковые имена узлов')
+        node_ids[node] = i
+        node_names[i] = intern(node)
+        node_attrs[i] = intern(json.dumps(attrs, ensure_ascii=False, sort_keys=True))
+
+    n_edges = G.number_of_edges()
+    src = np.empty(n_edges, dtype=np.int32)
+    dst = np.empty(n_edges, dtype=np.int32)
+    rel = np.empty(n_edges, dtype=np.int32)
+    extra = np.empty(n_edges, dtype=np.int32)
+    for i, (u, v, attrs) in enumerate(G.edges(data=True)):
+        src[i] = node_ids[u]
+        dst[i] = node_ids[v]
+        rest = {k: val for k, val in attrs.items() if k != 'relation'}
+        rel[i] = intern(attrs['relation']) if 'relation' in attrs else -1
+        extra[i] = intern(json.dumps(rest, ensure_ascii=False, sort_keys=True))
+
+    encoded = [s.encode('utf-8') for s in strings]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.uint32, count=len(encoded))
+
+    tmp_name = filename + '.tmp'
+    with open(tmp_name, 'wb') as f:
+        f.write(_HEADER.pack(BINARY_MAGIC, 1, len(node_ids), len(encoded), n_edges))
+        f.write(lengths.tobytes())
+        f.write(b''.join(encoded))
+        for array in (node_names, node_attrs, src, dst, rel, extra):
+            f.write(array.tobytes())
+        # Необязательный хвост со служебными данными: длина и JSON
+        if meta:
+            blob = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+            f.write(struct.pack('<I', len(blob)) + blob)
+    os.replace(tmp_name, filename)
+
+
+def read_binary_arrays(filename, meta=None):
+    """Сырые массивы бинарного файла: таблица строк, узлы и связи в виде номеров"""
+    with open(filename, 'rb') as f:
+        magic, version, n_nodes, n_strings, n_edges = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != BINARY_MAGIC or version != 1:
+            raise ValueError('Неподдерживаемый формат файла')
+
+        lengths = np.frombuffer(f.read(4 * n_strings), dtype=np.uint32)
+        offsets = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64))).tolist()
+        blob = f.read(offsets[-1])
+        strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(n_strings)]
+
+        node_names = np.frombuffer(f.read(4 * n_nodes), dtype=np.int32)
+        node_attrs = np.frombuffer(f.read(4 * n_nodes), dtype=np.int32)
+        src, dst, rel, extra = (np.frombuffer(f.read(4 * n_edges), dtype=np.int32) for _ in range(4))
+
+        tail = f.read(4)
+        if meta is not None and len(tail) == 4:
+            meta.update(json.loads(f.read(struct.unpack('<I', tail)[0]).decode('utf-8')))
+
+    return strings, node_names, node_attrs, src, dst, rel, extra
+
+
+def read_binary_network(filename, G, meta=None):
+    strings, node_names, node_attrs, src, dst, rel, extra = read_binary_arrays(filename, meta=meta)
+
+    # Одинаковые наборы атрибутов разбираются один раз
+    attr_cache = {}
+
+    def attrs_of(string_id):
+        if string_id not in attr_cache:
+            attr_cache[string_id] = json.loads(strings[string_id])
+        return attr_cache[string_id]
+
+    names = [strings[i] for i in node_names.tolist()]
+    G.add_nodes_from((name, attrs_of(a)) for name, a in zip(names, node_attrs.tolist()))
+
+    def edge_attrs(r, e):
+        attrs = dict(attrs_of(e))
+        if r >= 0:
+            attrs['relation'] = strings[r]
+        return attrs
+
+    G.add_edges_from((names[u], names[v], edge_attrs(r, e))
+                     for u, v, r, e in zip(src.tolist(), dst.tolist(), rel.tolist(), extra.tolist()))
+    return G
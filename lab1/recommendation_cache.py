@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class RecommendationCache:
+    """LRU-кэш выводов экспертной системы с необязательным временем жизни записей
+
+    Ключ - версия базы знаний (хеш исходного файла), стадия вывода и
+    канонизированный набор ответов; значение - результат вывода. База в
+    процессе не меняется, а записи другой версии (после перезагрузки базы)
+    не совпадают по ключу и со временем вытесняются.
+
+    Кэш можно делить между потоками: записи и счётчики меняются под
+    блокировкой, а сам вывод (compute) идёт без неё - два потока с одним
+    промахом могут посчитать значение оба, и останется последнее.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, key, compute):
+        """Значение из кэша или compute(), запомненное под ключом"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or self.clock() < expires:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            expires = None if self.ttl is None else self.clock() + self.ttl
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits,
+                    'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else None,
+                    'evictions': self.evictions, 'expirations': self.expirations}
+
+
+def preferences_key(preferences):
+    """Канонический вид ответов: порядок ответов и пропущенные вопросы не влияют на ключ"""
+    return tuple(sorted((name, _freeze(value)) for name, value in preferences.items() if value is not None))
+
+
+def _freeze(value):
+    """Вложенные словари и списки (например, weights профиля) - в хешируемые кортежи"""
+    if isinstance(value, dict):
+        return tuple(sorted((name, _freeze(item)) for name, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
@@ -0,0 +1,216 @@
+import shlex
+
+
+class RelationIndex:
+    """Инвертированный индекс связей сети по типу отношения
+
+    Хранит тройки (субъект, отношение, объект) сразу в нескольких разрезах, чтобы
+    шаблоны вида "?x является птица" отвечались поиском в словаре, а не обходом рёбер.
+    """
+
+    def __init__(self, G):
+        self.G = G
+        self.stale = True
+
+    def rebuild(self):
+        self.by_relation = {}
+        self.by_subject_relation = {}
+        self.by_relation_object = {}
+        self.by_subject = {}
+        self.by_object = {}
+        self.edge_relation = {}
+        for u, v, data in self.G.edges(data=True):
+            self._add(u, data.get('relation', ''), v)
+        self.stale = False
+
+    def invalidate(self):
+        self.stale = True
+
+    def _ensure(self):
+        if self.stale:
+            self.rebuild()
+
+    # --- инкрементальные изменения ------------------------------------------------
+
+    def add_edge(self, u, v, relation=None):
+        if self.stale:
+            return
+        if relation is None:
+            relation = self.G.edges[u, v].get('relation', '')
+        if (u, v) in self.edge_relation:
+            self.remove_edge(u, v)
+        self._add(u, relation, v)
+
+    def remove_edge(self, u, v):
+        if self.stale or (u, v) not in self.edge_relation:
+            return
+        relation = self.edge_relation.pop((u, v))
+        _discard(self.by_relation, relation, (u, v))
+        _discard(self.by_subject_relation, (u, relation), v)
+        _discard(self.by_relation_object, (relation, v), u)
+        _discard(self.by_subject, u, (relation, v))
+        _discard(self.by_object, v, (u, relation))
+
+    def remove_node(self, node):
+        if self.stale:
+            return
+        for relation, v in list(self.by_subject.get(node, ())):
+            self.remove_edge(node, v)
+        for u, relation in list(self.by_object.get(node, ())):
+            self.remove_edge(u, node)
+
+    def apply(self, change):
+        """Принимает изменения в том же виде, что и журнал правок"""
+        kind = change[0]
+        if kind == 'add_edge':
+            self.add_edge(change[1], change[2])
+        elif kind == 'remove_edge':
+            self.remove_edge(change[1], change[2])
+        elif kind == 'remove_node':
+            self.remove_node(change[1])
+        elif kind != 'add_node':
+            self.invalidate()
+
+    def _add(self, u, relation, v):
+        self.edge_relation[(u, v)] = relation
+        self.by_relation.setdefault(relation, set()).add((u, v))
+        self.by_subject_relation.setdefault((u, relation), set()).add(v)
+        self.by_relation_object.setdefault((relation, v), set()).add(u)
+        self.by_subject.setdefault(u, set()).add((relation, v))
+        self.by_object.setdefault(v, set()).add((u, relation))
+
+    # --- простые выборки -------------------------------------------------------------
+
+    def edges_with(self, relation):
+        """Все пары (субъект, объект) с данным отношением"""
+        self._ensure()
+        return set(self.by_relation.get(relation, ()))
+
+    def objects(self, subject, relation):
+        self._ensure()
+        return set(self.by_subject_relation.get((subject, relation), ()))
+
+    def subjects(self, relation, obj):
+        self._ensure()
+        return set(self.by_relation_object.get((relation, obj), ()))
+
+    def relations(self):
+        self._ensure()
+        return {relation: len(pairs) for relation, pairs in self.by_relation.items()}
+
+    # --- шаблоны троек ------------------------------------------------------------------
+
+    def query(self, patterns, limit=None):
+        """Ответ на конъюнкцию шаблонов троек, например '?x является птица'
+
+        Переменные начинаются с '?'. Названия с пробелами берутся в кавычки:
+        '?x "имеет цвет" черный'. Несколько шаблонов соединяются по общим
+        переменным; порядок соединения выбирается по оценке избирательности.
+        Возвращает список словарей {переменная: значение}.
+        """
+        self._ensure()
+        if isinstance(patterns, (str, tuple)):
+            patterns = [patterns]
+        patterns = [parse_pattern(p) for p in patterns]
+
+        results = []
+        self._solve(patterns, {}, results, limit)
+        return results
+
+    def _solve(self, patterns, binding, results, limit):
+        if limit is not None and len(results) >= limit:
+            return
+        if not patterns:
+            results.append(dict(binding))
+            return
+
+        # Следующим берём шаблон с наименьшим числом кандидатов при текущих привязках
+        best = min(range(len(patterns)), key=lambda i: self._estimate(patterns[i], binding))
+        pattern = patterns[best]
+        rest = patterns[:best] + patterns[best + 1:]
+
+        for triple in self._match(pattern, binding):
+            extended = dict(binding)
+            consistent = True
+            for term, value in zip(pattern, triple):
+                if _is_var(term):
+                    if extended.get(term, value) != value:
+                        consistent = False
+                        break
+                    extended[term] = value
+            if consistent:
+                self._solve(rest, extended, results, limit)
+                if limit is not None and len(results) >= limit:
+                    return
+
+    def _bound(self, term, binding):
+        if _is_var(term):
+            return binding.get(term)
+        return term
+
+    def _estimate(self, pattern, binding):
+        """Оценка числа троек, подходящих под шаблон (по размерам списков индекса)"""
+        s, r, o = (self._bound(t, binding) for t in pattern)
+        if s is not None and r is not None and o is not None:
+            return 0 if self.edge_relation.get((s, o)) == r else 0.5
+        if s is not None and r is not None:
+            return len(self.by_subject_relation.get((s, r), ()))
+        if r is not None and o is not None:
+            return len(self.by_relation_object.get((r, o), ()))
+        if s is not None:
+            return len(self.by_subject.get(s, ()))
+        if o is not None:
+            return len(self.by_object.get(o, ()))
+        if r is not None:
+            return len(self.by_relation.get(r, ()))
+        return len(self.edge_relation)
+
+    def _match(self, pattern, binding):
+        """Тройки (s, r, o), подходящие под шаблон при текущих привязках"""
+        s, r, o = (self._bound(t, binding) for t in pattern)
+        if s is not None and o is not None:
+            relation = self.edge_relation.get((s, o))
+            if relation is not None and (r is None or relation == r):
+                yield s, relation, o
+        elif s is not None and r is not None:
+            for obj in self.by_subject_relation.get((s, r), ()):
+                yield s, r, obj
+        elif r is not None and o is not None:
+            for subj in self.by_relation_object.get((r, o), ()):
+                yield subj, r, o
+        elif s is not None:
+            for relation, obj in self.by_subject.get(s, ()):
+                yield s, relation, obj
+        elif o is not None:
+            for subj, relation in self.by_object.get(o, ()):
+                yield subj, relation, o
+        elif r is not None:
+            for subj, obj in self.by_relation.get(r, ()):
+                yield subj, r, obj
+        else:
+            for (subj, obj), relation in self.edge_relation.items():
+                yield subj, relation, obj
+
+
+def parse_pattern(pattern):
+    """'?x является птица' -> ('?x', 'является', 'птица')"""
+    if isinstance(pattern, str):
+        terms = shlex.split(pattern)
+    else:
+        terms = list(pattern)
+    if len(terms) != 3:
+        raise ValueError(f'Шаблон должен состоять из трёх частей: {pattern!r}')
+    return tuple(terms)
+
+
+def _is_var(term):
+    return isinstance(term, str) and term.startswith('?')
+
+
+def _discard(table, key, item):
+    items = table.get(key)
+    if items is not None:
+        items.discard(item)
+        if not items:
+            del table[key]
+
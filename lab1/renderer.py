@@ -0,0 +1,217 @@
+import numpy as np
+from matplotlib.patches import FancyArrowPatch
+
+
+class NetworkRenderer:
+    """Отрисовка сети с сохранением артистов: при правке меняется только затронутое"""
+
+    def __init__(self, ax, node_size=2000, label_positions=None):
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.node_size = node_size
+        # Функция (pos, edge_labels) -> {(u, v): (x, y)} для размещения подписей связей
+        self.label_positions = label_positions
+
+        self.node_artists = {}
+        self.edge_artists = {}
+        self._node_edges = {}
+        self._drawn_pos = {}
+
+        # Подсветка выделения рисуется поверх сохранённого фона через blit
+        self.highlight_artists = []
+        self._background = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def sync(self, G, pos):
+        """Полная сверка артистов с графом (после загрузки или очистки)"""
+        for node in [n for n in self.node_artists if n not in G]:
+            self._remove_node(node)
+        for edge in [e for e in self.edge_artists if not G.has_edge(*e)]:
+            self._remove_edge(edge)
+
+        for node in G.nodes():
+            self._put_node(node, pos[node])
+        self._put_edges(G, pos, list(G.edges()))
+        # Подписи могли остаться скрытыми после режима детализации
+        for _, text in list(self.node_artists.values()) + list(self.edge_artists.values()):
+            text.set_visible(True)
+        self.update_limits(pos)
+
+    def update(self, G, pos, nodes):
+        """Инкрементальное обновление: только указанные узлы и их связи"""
+        edges = set()
+        for node in nodes:
+            if node not in G:
+                self._remove_node(node)
+                continue
+            self._put_node(node, pos[node])
+            edges.update(G.in_edges(node))
+            edges.update(G.out_edges(node))
+            # Связи, которых в графе уже нет
+            for edge in [e for e in self._node_edges.get(node, ()) if not G.has_edge(*e)]:
+                self._remove_edge(edge)
+
+        self._put_edges(G, pos, list(edges))
+        self.update_limits(pos, nodes)
+
+    def show_subset(self, G, pos, nodes, edges, node_labels=True, edge_labels=()):
+        """Держит артисты только для видимой части сети (режим детализации)
+
+        Лишние артисты удаляются, недостающие создаются; подписи узлов и связей
+        включаются по флагу и по набору edge_labels.
+        """
+        nodes = set(nodes)
+        edges = set(edges)
+        for node in [n for n in self.node_artists if n not in nodes]:
+            self._remove_node(node)
+        for edge in [e for e in self.edge_artists if e not in edges]:
+            self._remove_edge(edge)
+
+        moved = {n for n in nodes if n in self.node_artists and self._moved(n, pos)}
+        for node in nodes:
+            self._put_node(node, pos[node])
+            self.node_artists[node][1].set_visible(node_labels)
+        # Пересчитываем только новые связи и связи сдвинутых узлов
+        self._put_edges(G, pos, [e for e in edges if e not in self.edge_artists
+                                 or e[0] in moved or e[1] in moved])
+        for edge, (arrow, text) in self.edge_artists.items():
+            text.set_visible(edge in edge_labels)
+
+    def update_limits(self, pos, nodes=None):
+        """Подгоняет пределы осей, чтобы все узлы помещались в кадр"""
+        if not pos:
+            return
+        if nodes is None:
+            coords = np.array(list(pos.values()))
+        else:
+            coords = np.array([pos[n] for n in nodes if n in pos])
+            if len(coords) == 0:
+                return
+            # При частичном обновлении пределы только расширяются
+            (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+            coords = np.vstack([coords, [[x0, y0], [x1, y1]]])
+            if ((coords[:-2] >= (x0, y0)) & (coords[:-2] <= (x1, y1))).all():
+                return
+
+        low, high = coords.min(axis=0), coords.max(axis=0)
+        margin = np.maximum((high - low) * 0.1, 0.2)
+        self.ax.set_xlim(low[0] - margin[0], high[0] + margin[0])
+        self.ax.set_ylim(low[1] - margin[1], high[1] + margin[1])
+
+    def clear(self):
+        for node in list(self.node_artists):
+            self._remove_node(node)
+        self.clear_highlight()
+
+    def highlight(self, pos, groups, edge_labels=None):
+        """Подсветка групп узлов {цвет: (узлы, размер)} и подписей {(u, v): текст} поверх картинки"""
+        self.clear_highlight(blit=False)
+        for color, (nodes, size) in groups.items():
+            nodes = [n for n in nodes if n in pos]
+            if not nodes:
+                continue
+            coords = np.array([pos[n] for n in nodes])
+            artist = self.ax.scatter(coords[:, 0], coords[:, 1], s=size, c=color,
+                                     zorder=3, animated=True)
+            self.highlight_artists.append(artist)
+
+        edge_labels = edge_labels or {}
+        label_pos = self.label_positions(pos, edge_labels) if self.label_positions and edge_labels else {}
+        for (u, v), label in edge_labels.items():
+            x, y = label_pos.get((u, v), (np.array(pos[u]) + np.array(pos[v])) / 2)
+            artist = self.ax.text(x, y, label, ha='center', va='center',
+                                  fontsize=9, fontweight='bold', zorder=4, animated=True,
+                                  bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.8))
+            self.highlight_artists.append(artist)
+        self.blit()
+
+    def clear_highlight(self, blit=True):
+        for artist in self.highlight_artists:
+            artist.remove()
+        self.highlight_artists = []
+        if blit:
+            self.blit()
+
+    def blit(self):
+        """Перерисовка одной подсветки поверх сохранённого фона"""
+        if self._background is None or not self.canvas.supports_blit:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        for artist in self.highlight_artists:
+            self.ax.draw_artist(artist)
+        self.canvas.blit(self.ax.bbox)
+
+    def _on_draw(self, event):
+        # После полной перерисовки запоминаем фон и возвращаем подсветку на место
+        if self.canvas.supports_blit:
+            self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        for artist in self.highlight_artists:
+            self.ax.draw_artist(artist)
+
+    def _moved(self, node, pos):
+        return not np.array_equal(self._drawn_pos.get(node), pos[node])
+
+    def _put_node(self, node, xy):
+        x, y = xy
+        if node in self.node_artists:
+            if np.array_equal(self._drawn_pos.get(node), xy):
+                return
+            marker, label = self.node_artists[node]
+            marker.set_data([x], [y])
+            label.set_position((x, y))
+        else:
+            marker, = self.ax.plot([x], [y], 'o', markersize=np.sqrt(self.node_size),
+                                   color='lightblue', alpha=0.8, zorder=2,
+                                   scalex=False, scaley=False)
+            label = self.ax.text(x, y, str(node), ha='center', va='center',
+                                 fontsize=10, zorder=2.5)
+            self.node_artists[node] = (marker, label)
+            self._node_edges.setdefault(node, set())
+        self._drawn_pos[node] = np.array(xy)
+
+    def _remove_node(self, node):
+        for edge in list(self._node_edges.pop(node, ())):
+            self._remove_edge(edge)
+        marker, label = self.node_artists.pop(node)
+        marker.remove()
+        label.remove()
+        self._drawn_pos.pop(node, None)
+
+    def _put_edges(self, G, pos, edges):
+        if not edges:
+            return
+        edge_labels = {(u, v): G.edges[u, v].get('relation', '') for u, v in edges}
+        label_pos = self.label_positions(pos, edge_labels) if self.label_positions else {}
+        # Отступ стрелки от центра узла - радиус маркера в пунктах
+        shrink = np.sqrt(self.node_size) / 2
+
+        for (u, v), relation in edge_labels.items():
+            xy = label_pos.get((u, v), (np.array(pos[u]) + np.array(pos[v])) / 2)
+            if (u, v) in self.edge_artists:
+                arrow, text = self.edge_artists[(u, v)]
+                arrow.set_positions(pos[u], pos[v])
+                text.set_position(xy)
+                text.set_text(relation)
+                continue
+
+            arrow = FancyArrowPatch(pos[u], pos[v], arrowstyle='->', mutation_scale=20,
+                                    color='gray', linewidth=2, shrinkA=shrink, shrinkB=shrink,
+                                    zorder=1)
+            # add_artist не пересчитывает пределы данных по геометрии стрелки - пределы ведём сами
+            self.ax.add_artist(arrow)
+            text = self.ax.text(xy[0], xy[1], relation, ha='center', va='center',
+                                fontsize=9, fontweight='bold', zorder=2.6,
+                                bbox=dict(boxstyle='round,pad=0.3', facecolor='white',
+                                          edgecolor='gray', alpha=0.9))
+            self.edge_artists[(u, v)] = (arrow, text)
+            self._node_edges.setdefault(u, set()).add((u, v))
+            self._node_edges.setdefault(v, set()).add((u, v))
+
+    def _remove_edge(self, edge):
+        arrow, text = self.edge_artists.pop(edge)
+        arrow.remove()
+        text.remove()
+        for node in edge:
+            if node in self._node_edges:
+                self._node_edges[node].discard(edge)
@@ -0,0 +1,359 @@
+class ReteEngine:
+    """Прямой вывод по правилам-данным через сеть Rete
+
+    Факт - кортеж, например ('playstyle', 'melee combat'). Условие правила -
+    кортеж той же длины, где строки с '?' - переменные: ('build', '?c', '?s', '?b').
+    Одинаковые условия разных правил делят одну альфа-память, одинаковые начала
+    списков условий - одни и те же узлы соединения и бета-памяти. Новый факт
+    проходит только через альфа-памяти, которым он подходит, и только через
+    соединения после них, поэтому пересчитываются лишь затронутые правила.
+
+    Узлы сети хранят только структуру, а содержимое памятей лежит в движке.
+    session() даёт лёгкий движок поверх этого: он делит с ним сеть и готовые
+    памяти и копирует память, лишь когда сам что-то в неё добавляет.
+    """
+
+    def __init__(self):
+        self.facts = set()
+        self.rules = {}
+        # Альфа-памяти по (длина факта, первый элемент); None - для условий с переменной в начале
+        self._alpha = {}
+        self._alpha_by_key = {}
+        self._root = _BetaMemory(None, 0)
+        self._joins = {}
+        # Содержимое памятей: альфа-память -> факты, бета-память -> токены
+        self._alpha_facts = {}
+        self._tokens = {self._root: [_Token((), {})]}
+        self._base = None
+        self._frozen = False
+        self._agenda = []
+        self._order = 0
+        self.fired = []
+        # Трассировщик (tracing.Tracer): время срабатывания каждого правила
+        self.tracer = None
+
+    def session(self):
+        """Движок для одного сеанса поверх этого; сам движок после этого менять нельзя"""
+        if self._agenda:
+            self.run()
+        self._frozen = True
+        session = ReteEngine.__new__(ReteEngine)
+        session.__dict__.update(self.__dict__)
+        session.facts = set()
+        session._alpha_facts = {}
+        session._tokens = {}
+        session._base = self
+        session._frozen = False
+        session._agenda = []
+        session.fired = []
+        return session
+
+    def __contains__(self, fact):
+        return fact in self.facts or (self._base is not None and fact in self._base)
+
+    def _check_writable(self):
+        if self._frozen:
+            raise RuntimeError('движок заморожен: от него созданы сеансы')
+
+    # --- правила ---------------------------------------------------------------------
+
+    def add_rule(self, name, conditions, actions, salience=0):
+        """Добавляет правило: conditions - список шаблонов, actions - шаблоны новых фактов
+
+        Действие может быть и функцией f(bindings, engine) - например, для вывода.
+        """
+        self._check_writable()
+        if self._base is not None:
+            raise RuntimeError('правила сеанса задаёт базовый движок')
+        conditions, renaming = canonical(conditions)
+        rule = _Rule(name, conditions, actions, renaming, salience, self._order)
+        self._order += 1
+        self.rules[name] = rule
+
+        memory = self._root
+        for condition in conditions:
+            memory = self._join(memory, condition).child
+        memory.productions.append(rule)
+        # Уже известные факты сразу дают активации нового правила
+        for token in self._tokens_of(memory):
+            self._activate(rule, token)
+        return rule
+
+    def _join(self, parent, condition):
+        key = (id(parent), condition)
+        if key in self._joins:
+            return self._joins[key]
+
+        alpha = self._alpha_memory(condition)
+        bound = parent.variables
+        tests, binds = [], []
+        for position, term in enumerate(condition):
+            if is_var(term):
+                (tests if term in bound else binds).append((term, position))
+        join = _JoinNode(parent, alpha, tests, binds)
+        self._joins[key] = join
+        parent.children.append(join)
+        # Глубокие соединения получают новые факты раньше мелких - так не появляются дубли токенов
+        alpha.successors.append(join)
+        alpha.successors.sort(key=lambda node: -node.depth)
+
+        for token in self._tokens_of(parent):
+            for fact in self._facts_of(alpha):
+                join.emit(self, token, fact)
+        return join
+
+    def _alpha_memory(self, condition):
+        key = _alpha_key(condition)
+        if key in self._alpha_by_key:
+            return self._alpha_by_key[key]
+        alpha = _AlphaMemory(key)
+        self._alpha_by_key[key] = alpha
+        first = None if is_var(condition[0]) else condition[0]
+        self._alpha.setdefault((len(condition), first), []).append(alpha)
+        self._alpha_facts[alpha] = [fact for fact in self.facts if alpha.matches(fact)]
+        return alpha
+
+    # --- содержимое памятей ---------------------------------------------------------------
+
+    def _facts_of(self, alpha):
+        facts = self._alpha_facts.get(alpha)
+        if facts is None:
+            return self._base._facts_of(alpha) if self._base is not None else []
+        return facts
+
+    def _own_facts(self, alpha):
+        # Копирование при записи: память базового движка не меняется
+        if alpha not in self._alpha_facts:
+            self._alpha_facts[alpha] = list(self._facts_of(alpha))
+        return self._alpha_facts[alpha]
+
+    def _tokens_of(self, memory):
+        tokens = self._tokens.get(memory)
+        if tokens is None:
+            return self._base._tokens_of(memory) if self._base is not None else []
+        return tokens
+
+    def _own_tokens(self, memory):
+        if memory not in self._tokens:
+            self._tokens[memory] = list(self._tokens_of(memory))
+        return self._tokens[memory]
+
+    # --- факты --------------------------------------------------------------------------
+
+    def assert_fact(self, fact):
+        self._check_writable()
+        fact = tuple(fact)
+        if fact in self:
+            return False
+        self.facts.add(fact)
+        for alpha in self._candidate_alphas(fact):
+            if alpha.matches(fact):
+                self._own_facts(alpha).append(fact)
+                for join in alpha.successors:
+                    for token in list(self._tokens_of(join.parent)):
+                        join.emit(self, token, fact)
+        return True
+
+    def retract_fact(self, fact):
+        """Убирает факт; факты базового движка сеанс убрать не может"""
+        self._check_writable()
+        fact = tuple(fact)
+        if fact not in self.facts:
+            return False
+        self.facts.discard(fact)
+        for alpha in self._candidate_alphas(fact):
+            if fact in self._facts_of(alpha):
+                self._own_facts(alpha).remove(fact)
+                for join in alpha.successors:
+                    join.child.remove_with(self, fact)
+        return True
+
+    def _candidate_alphas(self, fact):
+        return (self._alpha.get((len(fact), fact[0]), []) +
+                self._alpha.get((len(fact), None), []))
+
+    def matches(self, pattern):
+        """Привязки переменных для всех известных фактов, подходящих под шаблон"""
+        key = _alpha_key(canonical([pattern])[0][0])
+        alpha = self._alpha_by_key.get(key)
+        if alpha is not None:
+            facts = self._facts_of(alpha)
+        else:
+            # Сеть общая с сеансами, поэтому новые узлы ради запроса не заводим
+            probe = _AlphaMemory(key)
+            facts = [fact for fact in self._all_facts() if probe.matches(fact)]
+        result = []
+        for fact in facts:
+            bindings = {}
+            for term, value in zip(pattern, fact):
+                if is_var(term):
+                    bindings[term] = value
+            result.append(bindings)
+        return result
+
+    def _all_facts(self):
+        if self._base is not None:
+            yield from self._base._all_facts()
+        yield from self.facts
+
+    # --- повестка ------------------------------------------------------------------------
+
+    def _activate(self, rule, token):
+        self._agenda.append((rule, token))
+
+    def _deactivate(self, token):
+        self._agenda = [item for item in self._agenda if item[1] is not token]
+
+    def run(self, limit=None):
+        """Срабатывают правила, пока повестка не опустеет; возвращает число срабатываний"""
+        count = 0
+        tracer = self.tracer if self.tracer is not None and self.tracer.enabled else None
+        while self._agenda and (limit is None or count < limit):
+            # Сначала правила с большим приоритетом, при равенстве - раньше объявленные
+            best = min(range(len(self._agenda)),
+                       key=lambda i: (-self._agenda[i][0].salience, self._agenda[i][0].order))
+            rule, token = self._agenda.pop(best)
+            bindings = rule.bindings(token)
+            self.fired.append((rule.name, bindings))
+            if tracer is None:
+                self._fire(rule, bindings)
+            else:
+                with tracer.span('rule:' + rule.name):
+                    self._fire(rule, bindings)
+            count += 1
+        return count
+
+    def _fire(self, rule, bindings):
+        for action in rule.actions:
+            if callable(action):
+                action(bindings, self)
+            else:
+                self.assert_fact(substitute(action, bindings))
+
+
+class _Rule:
+    def __init__(self, name, conditions, actions, renaming, salience, order):
+        self.name = name
+        self.conditions = conditions
+        self.actions = actions
+        self.renaming = renaming
+        self.salience = salience
+        self.order = order
+
+    def bindings(self, token):
+        """Привязки в исходных именах переменных правила"""
+        return {original: token.bindings[canonical] for original, canonical in self.renaming.items()}
+
+
+class _AlphaMemory:
+    def __init__(self, key):
+        self.key = key
+        self.successors = []
+
+    def matches(self, fact):
+        length, constants, same = self.key
+        if len(fact) != length:
+            return False
+        for position, value in constants:
+            if fact[position] != value:
+                return False
+        for a, b in same:
+            if fact[a] != fact[b]:
+                return False
+        return True
+
+
+class _Token:
+    __slots__ = ('facts', 'bindings')
+
+    def __init__(self, facts, bindings):
+        self.facts = facts
+        self.bindings = bindings
+
+
+class _BetaMemory:
+    def __init__(self, parent_join, depth):
+        self.parent_join = parent_join
+        self.depth = depth
+        self.children = []
+        self.productions = []
+        self.variables = set() if parent_join is None else (
+            parent_join.parent.variables | {term for term, _ in parent_join.binds})
+
+    def add(self, engine, token):
+        engine._own_tokens(self).append(token)
+        for rule in self.productions:
+            engine._activate(rule, token)
+        for join in self.children:
+            for fact in engine._facts_of(join.alpha):
+                join.emit(engine, token, fact)
+
+    def remove_with(self, engine, fact):
+        tokens = engine._tokens_of(self)
+        removed = [token for token in tokens if fact in token.facts]
+        if not removed:
+            return
+        engine._tokens[self] = [token for token in tokens if fact not in token.facts]
+        for token in removed:
+            engine._deactivate(token)
+        for join in self.children:
+            join.child.remove_with(engine, fact)
+
+
+class _JoinNode:
+    def __init__(self, parent, alpha, tests, binds):
+        self.parent = parent
+        self.alpha = alpha
+        self.tests = tests
+        self.binds = binds
+        self.depth = parent.depth + 1
+        self.child = _BetaMemory(self, self.depth)
+
+    def emit(self, engine, token, fact):
+        bindings = token.bindings
+        for variable, position in self.tests:
+            if bindings[variable] != fact[position]:
+                return
+        extended = dict(bindings)
+        for variable, position in self.binds:
+            extended[variable] = fact[position]
+        self.child.add(engine, _Token(token.facts + (fact,), extended))
+
+
+def is_var(term):
+    return isinstance(term, str) and term.startswith('?')
+
+
+def canonical(conditions):
+    """Переименовывает переменные в ?0, ?1, ... по порядку появления - для разделения узлов"""
+    renaming = {}
+    result = []
+    for condition in conditions:
+        renamed = []
+        for term in condition:
+            if is_var(term):
+                renaming.setdefault(term, f'?{len(renaming)}')
+                term = renaming[term]
+            renamed.append(term)
+        result.append(tuple(renamed))
+    return result, renaming
+
+
+def _alpha_key(condition):
+    """Ключ альфа-памяти: длина, константы по позициям и позиции повторяющихся переменных"""
+    constants = []
+    first_seen = {}
+    same = []
+    for position, term in enumerate(condition):
+        if is_var(term):
+            if term in first_seen:
+                same.append((first_seen[term], position))
+            else:
+                first_seen[term] = position
+        else:
+            constants.append((position, term))
+    return len(condition), tuple(constants), tuple(same)
+
+
+def substitute(pattern, bindings):
+    return tuple(bindings.get(term, term) if is_var(term) else term for term in pattern)
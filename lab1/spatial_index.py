@@ -0,0 +1,125 @@
+import numpy as np
+
+
+class GridIndex:
+    """Равномерная сетка над позициями узлов для быстрого поиска по координатам"""
+
+    def __init__(self, points_per_cell=2):
+        self.points_per_cell = points_per_cell
+        self.version = None
+        self.nodes = []
+        self.coords = np.empty((0, 2))
+        self._order = np.empty(0, dtype=np.intp)
+        self._keys = np.empty(0, dtype=np.int64)
+
+    def sync(self, pos, version):
+        """Перестраивает индекс, только если раскладка изменилась"""
+        if version != self.version:
+            self.build(pos)
+            self.version = version
+
+    def build(self, pos):
+        self.nodes = list(pos.keys())
+        self.coords = np.array([pos[n] for n in self.nodes], dtype=float).reshape(-1, 2)
+
+        if len(self.nodes) == 0:
+            self._order = np.empty(0, dtype=np.intp)
+            self._keys = np.empty(0, dtype=np.int64)
+            return
+
+        self._low = self.coords.min(axis=0)
+        self._high = self.coords.max(axis=0)
+        extent = np.maximum(self._high - self._low, 1e-9)
+
+        # Размер ячейки подбирается так, чтобы в среднем в ней было несколько точек
+        cells = max(1, int(np.sqrt(len(self.nodes) / self.points_per_cell)))
+        self._cell = float(extent.max()) / cells
+        self._shape = (np.floor(extent / self._cell).astype(np.int64) + 1)
+
+        ix, iy = self._cell_of(self.coords)
+        keys = ix * self._shape[1] + iy
+        self._order = np.argsort(keys, kind='stable')
+        self._keys = keys[self._order]
+
+    def nearest(self, x, y, max_dist=None):
+        """Ближайший узел к точке (x, y) или None, если в радиусе max_dist никого нет"""
+        if len(self.nodes) == 0:
+            return None
+
+        if max_dist is not None:
+            idx = self._candidates(x - max_dist, y - max_dist, x + max_dist, y + max_dist)
+            return self._closest(idx, x, y, max_dist)
+
+        # Без ограничения радиуса расширяем окно поиска, пока кто-нибудь не найдётся
+        radius = self._cell
+        limit = self._cell * (self._shape.max() + 1) * 2
+        while True:
+            idx = self._candidates(x - radius, y - radius, x + radius, y + radius)
+            node = self._closest(idx, x, y, radius)
+            if node is not None or radius > limit:
+                return node if node is not None else self._closest(np.arange(len(self.nodes)), x, y, None)
+            radius *= 2
+
+    def query_rect(self, x0, y0, x1, y1):
+        """Все узлы внутри прямоугольника"""
+        if len(self.nodes) == 0:
+            return []
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        idx = self._candidates(x0, y0, x1, y1)
+        pts = self.coords[idx]
+        inside = (pts[:, 0] >= x0) & (pts[:, 0] <= x1) & (pts[:, 1] >= y0) & (pts[:, 1] <= y1)
+        return [self.nodes[i] for i in idx[inside]]
+
+    def query_polygon(self, vertices):
+        """Все узлы внутри многоугольника (выделение лассо)"""
+        poly = np.asarray(vertices, dtype=float).reshape(-1, 2)
+        if len(self.nodes) == 0 or len(poly) < 3:
+            return []
+        (x0, y0), (x1, y1) = poly.min(axis=0), poly.max(axis=0)
+        idx = self._candidates(x0, y0, x1, y1)
+        inside = _points_in_polygon(self.coords[idx], poly)
+        return [self.nodes[i] for i in idx[inside]]
+
+    def _cell_of(self, coords):
+        cell = np.floor((np.atleast_2d(coords) - self._low) / self._cell).astype(np.int64)
+        ix = np.clip(cell[:, 0], 0, self._shape[0] - 1)
+        iy = np.clip(cell[:, 1], 0, self._shape[1] - 1)
+        return ix, iy
+
+    def _candidates(self, x0, y0, x1, y1):
+        """Индексы точек из ячеек, пересекающих прямоугольник"""
+        if x1 < self._low[0] or y1 < self._low[1] or x0 > self._high[0] or y0 > self._high[1]:
+            return np.empty(0, dtype=np.intp)
+        (ix0, ix1), (iy0, iy1) = self._cell_of(np.array([[x0, y0], [x1, y1]]))
+
+        # Ячейки одного столбца лежат в отсортированном массиве подряд
+        parts = []
+        for ix in range(ix0, ix1 + 1):
+            start = np.searchsorted(self._keys, ix * self._shape[1] + iy0, side='left')
+            stop = np.searchsorted(self._keys, ix * self._shape[1] + iy1, side='right')
+            if stop > start:
+                parts.append(self._order[start:stop])
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(parts)
+
+    def _closest(self, idx, x, y, max_dist):
+        if len(idx) == 0:
+            return None
+        d2 = ((self.coords[idx] - (x, y)) ** 2).sum(axis=1)
+        best = int(np.argmin(d2))
+        if max_dist is not None and d2[best] > max_dist ** 2:
+            return None
+        return self.nodes[idx[best]]
+
+
+def _points_in_polygon(points, poly):
+    """Векторизованная проверка попадания точек в многоугольник (метод лучей)"""
+    x, y = points[:, 0][:, None], points[:, 1][:, None]
+    xa, ya = poly[:, 0], poly[:, 1]
+    xb, yb = np.roll(xa, -1), np.roll(ya, -1)
+    crosses = (ya > y) != (yb > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = xa + (y - ya) * (xb - xa) / (yb - ya)
+    return (crosses & (x < x_cross)).sum(axis=1) % 2 == 1
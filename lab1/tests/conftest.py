@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули лабораторной лежат плоско в lab1/ и импортируют друг друга по имени
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,108 @@
+import os
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from activation import DEFAULT_WEIGHT, RELATION_WEIGHTS, SpreadingActivation
+from network_io import load_network_file
+
+BUNDLED = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'semantic_network.json')
+
+
+def dense_scores(G, seeds, steps=3, decay=0.5, reverse_weight=0.5):
+    """Та же активация на плотной матрице по определению - эталон для CSR"""
+    names = list(G)
+    ids = {name: i for i, name in enumerate(names)}
+    M = np.zeros((len(names), len(names)))
+    for u, v, relation in G.edges(data='relation', default=''):
+        weight = RELATION_WEIGHTS.get(relation, DEFAULT_WEIGHT)
+        M[ids[v], ids[u]] += weight
+        M[ids[u], ids[v]] += weight * reverse_weight
+    fan_out = M.sum(axis=0)
+    M = M / np.where(fan_out > 0, fan_out, 1)
+    x = np.zeros(len(names))
+    for node in seeds:
+        x[ids[node]] = 1.0
+    total, current = x.copy(), x
+    for _ in range(steps):
+        current = decay * M @ current
+        total += current
+    return {name: total[ids[name]] for name in names if name not in seeds and total[ids[name]] > 0}
+
+
+def random_network(seed, n=60, m=150):
+    rng = random.Random(seed)
+    G = nx.DiGraph()
+    G.add_nodes_from(f'у{i}' for i in range(n))
+    while G.number_of_edges() < m:
+        u, v = rng.sample(list(G), 2)
+        G.add_edge(u, v, relation=rng.choice(['является', 'умеет', 'имеет']))
+    return G
+
+
+def test_matches_dense_reference_on_bundled_network():
+    G = load_network_file(BUNDLED)
+    result = dict(SpreadingActivation(G).activate(['дрозд'], top=None))
+    expected = dense_scores(G, ['дрозд'])
+    assert result.keys() == expected.keys()
+    for node, score in expected.items():
+        assert result[node] == pytest.approx(score)
+    assert 'дрозд' not in result
+
+
+def test_batch_equals_single_queries_and_sorted():
+    G = random_network(1)
+    retrieval = SpreadingActivation(G)
+    queries = [['у0'], ['у1', 'у2'], {'у3': 2.0}, 'у4']
+    batch = retrieval.activate_many(queries, top=7)
+    for query, answer in zip(queries, batch):
+        single = retrieval.activate(query, top=7)
+        assert [node for node, _ in answer] == [node for node, _ in single]
+        assert np.allclose([score for _, score in answer], [score for _, score in single])
+        scores = [score for _, score in answer]
+        assert scores == sorted(scores, reverse=True) and len(answer) == 7
+
+
+def test_sparse_and_dense_steps_agree():
+    G = random_network(2, n=400, m=1200)
+    retrieval = SpreadingActivation(G)
+    # Один затравочный узел - ветка по исходящим связям; все узлы - плотная ветка
+    for seeds in (['у5'], list(G)):
+        result = dict(retrieval.activate(seeds, top=None))
+        expected = dense_scores(G, seeds)
+        assert result.keys() == expected.keys()
+        assert np.allclose([result[n] for n in expected], list(expected.values()))
+
+
+def test_matrix_rebuilt_after_invalidate():
+    G = load_network_file(BUNDLED)
+    retrieval = SpreadingActivation(G)
+    assert 'новый' not in dict(retrieval.activate('дрозд', top=None))
+    G.add_edge('дрозд', 'новый', relation='умеет')
+    retrieval.invalidate()
+    assert 'новый' in dict(retrieval.activate('дрозд', top=None))
+
+
+def test_cli_activate(capsys):
+    import network_cli
+    assert network_cli.main(['activate', BUNDLED, 'дрозд', '--top', '3']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3 and lines[0].split()[1] == 'птица'
+    assert network_cli.main(['activate', BUNDLED, 'воробей']) == 1
+
+
+def test_matrix_follows_external_version():
+    G = load_network_file(BUNDLED)
+    app_version = [0]
+    retrieval = SpreadingActivation(G, version=lambda: app_version[0])
+    retrieval.activate('дрозд')
+    G.add_edge('дрозд', 'новый', relation='умеет')
+    assert 'новый' not in dict(retrieval.activate('дрозд', top=None))
+    app_version[0] += 1
+    assert 'новый' in dict(retrieval.activate('дрозд', top=None))
+
+
+def test_empty_network():
+    assert SpreadingActivation(nx.DiGraph()).activate_many(['а', ['б']]) == [[], []]
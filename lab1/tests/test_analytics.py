@@ -0,0 +1,86 @@
+import os
+import random
+
+import networkx as nx
+import pytest
+
+from analytics import NetworkAnalytics
+from network_io import load_network_file
+
+BUNDLED = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'semantic_network.json')
+
+
+def test_components_follow_edits():
+    rng = random.Random(5)
+    G = nx.DiGraph()
+    analytics = NetworkAnalytics(G)
+    nodes = [f'у{i}' for i in range(30)]
+    for step in range(400):
+        roll = rng.random()
+        if roll < 0.6:
+            u, v = rng.sample(nodes, 2)
+            G.add_edge(u, v, relation='является')
+            analytics.apply(('add_edge', u, v))
+        elif roll < 0.7:
+            node = rng.choice(nodes)
+            G.add_node(node)
+            analytics.apply(('add_node', node))
+        elif roll < 0.9 and G.number_of_edges():
+            u, v = rng.choice(list(G.edges()))
+            G.remove_edge(u, v)
+            analytics.apply(('remove_edge', u, v))
+        elif G.number_of_nodes():
+            node = rng.choice(list(G))
+            G.remove_node(node)
+            analytics.apply(('remove_node', node))
+        expected = sorted(map(len, nx.weakly_connected_components(G)), reverse=True)
+        assert analytics.component_count() == len(expected)
+        assert [len(c) for c in analytics.components()] == expected
+
+
+def test_shortest_path_against_stored_edges():
+    G = load_network_file(BUNDLED)
+    analytics = NetworkAnalytics(G)
+    path = analytics.shortest_path('дрозд', 'ходит')
+    assert len(path) == nx.shortest_path_length(G.to_undirected(), 'дрозд', 'ходит')
+    # Шаги против стрелок остаются в исходном направлении связи
+    assert all(G.edges[u, v]['relation'] == relation for u, relation, v in path)
+    assert analytics.shortest_path('дрозд', 'ходит', directed=True) is None
+    assert analytics.shortest_path('дрозд', 'нет такого') is None
+
+
+def test_isa_cycles_and_rankings():
+    G = load_network_file(BUNDLED)
+    analytics = NetworkAnalytics(G)
+    assert analytics.isa_cycles() == []
+    assert analytics.degree_ranking(1) == [('птица', 6)]
+
+    expected = nx.pagerank(G, tol=1e-12)
+    ranking = analytics.centrality_ranking(top=None)
+    assert [node for node, _ in ranking] == sorted(expected, key=lambda n: -expected[n])
+    for node, rank in ranking:
+        assert rank == pytest.approx(expected[node], abs=1e-6)
+
+    G.add_edge('животное', 'птица', relation='является')
+    analytics.invalidate()
+    assert sorted(analytics.isa_cycles()[0]) == ['животное', 'птица']
+
+
+def test_cache_follows_external_version():
+    G = load_network_file(BUNDLED)
+    app_version = [0]
+    analytics = NetworkAnalytics(G, version=lambda: app_version[0])
+    before = analytics.degree_ranking(1)
+    G.add_edges_from((f'н{i}', 'животное') for i in range(10))
+    # Пока версия не изменилась, ответ берётся из кэша
+    assert analytics.degree_ranking(1) == before
+    app_version[0] += 1
+    assert analytics.degree_ranking(1) == [('животное', 11)]
+
+
+def test_cli_stats(capsys):
+    import network_cli
+    assert network_cli.main(['stats', BUNDLED, '--path', 'дрозд', 'животное']) == 0
+    out = capsys.readouterr().out
+    assert 'Компонент: 1' in out
+    assert 'Путь: дрозд является птица ; птица является животное' in out
@@ -0,0 +1,103 @@
+import pytest
+
+from backward import BackwardChainer, explain
+from knowledge_base import KnowledgeBase
+from lab2 import ExpertSession, POEExpertSystem
+
+
+@pytest.fixture(scope='module')
+def kb():
+    return KnowledgeBase.from_file(use_snapshot=False)
+
+
+def test_budget_alone_picks_build_without_playstyle(kb):
+    session = ExpertSession(kb)
+    session.answer('budget', 'free/cheap (self-found)')
+    session.choose_class('duelist')
+    session.choose_subclass('slayer')
+    assert session.recommended_build() == 'Boneshatter'
+
+
+def test_without_budget_falls_back_to_cheapest(kb):
+    session = ExpertSession(kb)
+    session.answer('playstyle', 'melee combat')
+    session.choose_class('duelist')
+    session.choose_subclass('champion')
+    assert session.recommended_build() == kb.classes['duelist']['builds']['champion'][0]
+
+
+def test_backward_answers_agree_with_forward_chaining(kb):
+    catalogue = {}
+    for class_key, class_data in kb.classes.items():
+        for subclass, builds in class_data['builds'].items():
+            for build, budget in zip(builds, kb.budget_levels):
+                catalogue.setdefault(build, []).append({'class': class_key, 'subclass': subclass, 'budget': budget})
+
+    for build, expected in catalogue.items():
+        # Одно название может быть у билдов разных классов - ответ на каждый
+        answers = [dict(answer.assumptions) for answer in kb.prover.prove(('recommended_build', build))]
+        assert sorted(sorted(a.items()) for a in answers) == sorted(sorted(e.items()) for e in expected)
+
+        # Те же ответы в прямом выводе дают тот же билд
+        for assumed in answers:
+            session = ExpertSession(kb)
+            session.answer('budget', assumed['budget'])
+            session.choose_class(assumed['class'])
+            session.choose_subclass(assumed['subclass'])
+            assert session.recommended_build() == build
+
+
+def test_class_options_with_playstyle_assumed(kb):
+    answers = kb.prover.prove(('class_option', '?c'))
+    options = {}
+    for answer in answers:
+        playstyle = dict(answer.assumptions)['playstyle']
+        # Гибкий класс подходит под любой ответ о стиле игры
+        for value in kb.playstyles if playstyle is None else [playstyle]:
+            options.setdefault(value, set()).add(answer.fact[1])
+    assert options == {playstyle: set(classes) for playstyle, classes in kb.playstyle_classes.items()}
+
+
+def test_explanation_names_rule_and_answers(kb):
+    answer, = kb.prover.prove(('recommended_build', 'Cyclone'))
+    lines = explain(answer.proof)
+    assert lines[0] == 'recommended_build Cyclone  [rule build-by-budget]'
+    assert '  budget medium (a few divine orbs)  [your answer]' in lines
+    assert '  build duelist slayer Cyclone medium (a few divine orbs)  [fact]' in lines
+
+
+RULES = [
+    {'name': 'base', 'if': [('parent', '?x', '?y')], 'then': [('ancestor', '?x', '?y')]},
+    {'name': 'step', 'if': [('ancestor', '?x', '?y'), ('parent', '?y', '?z')], 'then': [('ancestor', '?x', '?z')]},
+]
+
+
+def test_left_recursion_reaches_fixpoint_on_cycles():
+    facts = [('parent', 'а', 'б'), ('parent', 'б', 'в'), ('parent', 'в', 'а'), ('parent', 'в', 'г')]
+    prover = BackwardChainer(RULES, facts)
+    found = {answer.fact for answer in prover.prove(('ancestor', '?x', '?y'))}
+    nodes = 'абв'
+    assert found == {('ancestor', x, y) for x in nodes for y in 'абвг'}
+    assert {a.fact[2] for a in prover.prove(('ancestor', 'г', '?y'))} == set()
+
+    evaluations = prover.stats['evaluations']
+    prover.prove(('ancestor', '?x', '?y'))
+    assert prover.stats['evaluations'] == evaluations and prover.stats['table_hits'] > 0
+
+
+def test_conflicting_assumptions_are_rejected():
+    rules = [{'name': 'both', 'if': [('budget', 'low'), ('budget', 'high')], 'then': [('impossible',)]},
+             {'name': 'one', 'if': [('budget', '?b')], 'then': [('spend', '?b')]}]
+    prover = BackwardChainer(rules, [], askable={'budget': ['low', 'high']})
+    assert prover.prove(('impossible',)) == []
+    assert {a.fact for a in prover.prove(('spend', '?b'))} == {('spend', None)}
+    assert prover.prove(('spend', 'other')) == []
+
+
+def test_backward_chain_prints_class_playstyle(kb, monkeypatch, capsys):
+    answers = iter(['boneshatter', 'quit'])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+    POEExpertSystem(knowledge=kb).backward_chain()
+    out = capsys.readouterr().out
+    assert f"Playstyle: {kb.classes['duelist']['playstyle']}" in out
+    assert 'Playstyle: any' not in out
@@ -0,0 +1,54 @@
+import json
+
+import networkx as nx
+import pytest
+
+import benchmark
+
+
+def test_generated_network_is_an_isa_tree_with_properties():
+    G = benchmark.generate_network(500, seed=3)
+    assert G.number_of_nodes() == 500
+    isa = nx.DiGraph((u, v) for u, v, r in G.edges(data='relation') if r == 'является')
+    # У каждого понятия, кроме корня, ровно один предок, циклов нет
+    assert all(isa.out_degree(n) == 1 for n in isa if n != 'понятие_0')
+    assert nx.is_directed_acyclic_graph(isa)
+    relations = {r for _, _, r in G.edges(data='relation')} - {'является'}
+    assert relations <= set(benchmark.PROPERTY_RELATIONS) and relations
+    assert nx.utils.graphs_equal(G, benchmark.generate_network(500, seed=3))
+
+
+def test_report_file(tmp_path):
+    output = tmp_path / 'bench.json'
+    stages = ['save', 'load', 'layout', 'layout_nx', 'labels']
+    assert benchmark.main(['--sizes', '50', '--repeat', '1', '--stages', ','.join(stages),
+                           '--output', str(output)]) == 0
+    report = json.loads(output.read_text(encoding='utf-8'))
+    assert {'python', 'numpy', 'networkx'} <= report['environment'].keys()
+    assert [r['stage'] for r in report['results']] == stages
+    for result in report['results']:
+        assert result['nodes'] == 50 and result['runs'] == 1
+        assert 0 <= result['best_s'] <= result['mean_s'] and result['peak_mb'] >= 0
+
+
+@pytest.mark.parametrize('stage', ['hit_test', 'redraw'])
+def test_app_stages_run_once(tmp_path, monkeypatch, stage):
+    # Этапы с окном приложения долгие - проверяем один прогон без замеров
+    monkeypatch.chdir(tmp_path)
+    run = benchmark.STAGE_FUNCTIONS[stage](benchmark.generate_network(30), str(tmp_path))
+    try:
+        run()
+    finally:
+        run.cleanup()
+
+
+def test_stage_limits_skip_expensive_stages():
+    sizes = [benchmark.STAGE_LIMITS['layout_nx'] + 1]
+    results = benchmark.run_benchmarks(sizes, stages=('layout_nx', 'labels'), repeat=1, log=lambda line: None)
+    assert [r['stage'] for r in results] == ['labels']
+
+
+def test_unknown_stage_is_rejected(capsys):
+    with pytest.raises(SystemExit):
+        benchmark.main(['--stages', 'save,нет'])
+    assert 'нет' in capsys.readouterr().err
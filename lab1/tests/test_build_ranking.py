@@ -0,0 +1,87 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from build_ranking import BuildRanker
+from knowledge_base import DEFAULT_KNOWLEDGE_FILE, KnowledgeBase, compile_knowledge
+
+
+@pytest.fixture(scope='module')
+def kb():
+    return KnowledgeBase.from_file(use_snapshot=False)
+
+
+def reference_top(kb, profile, k, exclude=()):
+    """Полная сортировка каталога по тем же правилам, что обещает BuildRanker"""
+    ranker = kb.ranker
+    scores = ranker.matrix @ ranker.profile_vector(profile)
+    playstyle = profile.get('playstyle')
+    ranked = []
+    for i, (class_key, subclass, build, level) in enumerate(ranker.rows):
+        if build in exclude:
+            continue
+        data = kb.classes[class_key]
+        primary = playstyle in [data['playstyle']] + data.get('also_playstyles', [])
+        ranked.append((-scores[i], not primary, i))
+    return [ranker.rows[i][:3] + (float(-score),) for score, _, i in sorted(ranked)[:k]]
+
+
+def random_profiles(kb, count, seed=0):
+    rng = random.Random(seed)
+    profiles = []
+    for _ in range(count):
+        profile = {}
+        if rng.random() < 0.8:
+            profile['playstyle'] = rng.choice(kb.playstyles)
+        if rng.random() < 0.8:
+            profile['budget'] = rng.choice(kb.budget_levels)
+        profiles.append(profile)
+    return profiles
+
+
+def test_ties_prefer_primary_playstyle_then_catalogue_order(kb):
+    top = kb.ranker.top({'playstyle': 'melee combat', 'budget': 'medium (a few divine orbs)'}, 8)
+    assert [build for _, _, build, _ in top[:3]] == ['Cyclone', 'Lightning Strike', 'Blade Flurry']
+    # Гибкий Scion с той же оценкой идёт после всех основных классов ближнего боя
+    classes = [class_key for class_key, _, _, _ in top]
+    assert classes[:6] == ['duelist'] * 3 + ['marauder'] * 3
+    assert set(classes[6:]) == {'scion'}
+
+
+def test_batch_matches_full_sort(kb):
+    profiles = random_profiles(kb, 300)
+    exclude = ('Cyclone', 'Winter Orb')
+    # Маленький блок - несколько проходов по пакету
+    batch = kb.ranker.top_many(profiles, 7, exclude=exclude, block=64)
+    for profile, result in zip(profiles, batch):
+        assert result == reference_top(kb, profile, 7, exclude)
+        assert result == kb.ranker.top(profile, 7, exclude=exclude)
+
+
+def test_k_is_guarded(kb):
+    rows = len(kb.ranker.rows)
+    with pytest.raises(ValueError):
+        kb.ranker.top({'playstyle': 'spellcasting'}, 0)
+    everything = kb.ranker.top({'playstyle': 'spellcasting'}, rows + 10, exclude=('Cyclone',))
+    assert len(everything) == rows - sum(row[2] == 'Cyclone' for row in kb.ranker.rows)
+    assert kb.ranker.top_many([], 3) == []
+
+
+def test_rating_columns_only_when_rated():
+    with open(DEFAULT_KNOWLEDGE_FILE, encoding='utf-8') as f:
+        data = json.load(f)
+    plain = BuildRanker(compile_knowledge(data)['features'])
+    assert not any(name in ('defense', 'clear_speed', 'bossing') for name, _ in plain.columns)
+
+    data['build_ratings'] = {'Armour Stacker': {'defense': 1.0}}
+    rated = BuildRanker(compile_knowledge(data)['features'])
+    assert ('defense', None) in rated.columns
+    assert ('bossing', None) not in rated.columns
+    profile = {'playstyle': 'melee combat', 'budget': 'expensive (min-max build)', 'defense': 1.0}
+    assert rated.top(profile, 1)[0][2] == 'Armour Stacker'
+    assert plain.top(profile, 1)[0][2] != 'Armour Stacker'
+    # Неоценённые билды получают середину шкалы
+    column = rated._column['defense', None]
+    assert np.count_nonzero(rated.matrix[:, column] == 0.5) == len(rated.rows) - 1
@@ -0,0 +1,99 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backward import BackwardChainer
+from knowledge_base import KnowledgeBase
+from lab2 import ExpertSession
+from recommendation_cache import RecommendationCache
+
+
+@pytest.fixture(scope='module')
+def kb():
+    return KnowledgeBase.from_file(use_snapshot=False)
+
+
+def goals_of(kb):
+    return [('recommended_build', build) for build in sorted({i['full_build_name'] for i in kb.build_info.values()})] + \
+        [('class_option', '?c'), ('advice', '?a')]
+
+
+def answers(result):
+    return sorted((answer.fact, answer.assumptions) for answer in result)
+
+
+def test_threads_share_one_prover(kb):
+    expected = {goal: answers(BackwardChainer(kb.rules, kb.facts, kb.askable()).prove(goal)) for goal in goals_of(kb)}
+    for _ in range(3):
+        prover = BackwardChainer(kb.rules, kb.facts, kb.askable())
+        goals = goals_of(kb) * 8
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(prover.prove, goals))
+        for goal, result in zip(goals, results):
+            assert answers(result) == expected[goal]
+
+
+def test_failed_proof_does_not_poison_the_table(kb, monkeypatch):
+    prover = BackwardChainer(kb.rules, kb.facts, kb.askable())
+    expected = answers(BackwardChainer(kb.rules, kb.facts, kb.askable()).prove(('class_option', '?c')))
+    evaluate = prover._evaluate
+    calls = []
+
+    def failing(goal, entry):
+        calls.append(goal)
+        if len(calls) == 2:
+            raise RuntimeError('сбой посреди вывода')
+        evaluate(goal, entry)
+    monkeypatch.setattr(prover, '_evaluate', failing)
+    with pytest.raises(RuntimeError):
+        prover.prove(('class_option', '?c'))
+    assert prover._stack == {} and all(entry.complete for entry in prover.table.values())
+    assert answers(prover.prove(('class_option', '?c'))) == expected
+
+
+def test_sessions_in_threads_match_sequential(kb):
+    cases = [(playstyle, budget, class_key, subclass)
+             for playstyle, classes in kb.playstyle_classes.items()
+             for budget in kb.budget_levels
+             for class_key in classes
+             for subclass in kb.classes[class_key]['subclasses']]
+
+    def run(case, cache=None):
+        playstyle, budget, class_key, subclass = case
+        session = ExpertSession(kb, cache)
+        session.answer('playstyle', playstyle)
+        session.answer('budget', budget)
+        options = session.class_options()
+        session.choose_class(class_key)
+        session.choose_subclass(subclass)
+        session.selected_build = session.recommended_build()
+        return options, session.selected_build, session.advice(), session.why()
+
+    expected = [run(case) for case in cases]
+    cache = RecommendationCache(maxsize=64)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda case: run(case, cache), cases * 3))
+    assert results == expected * 3
+    stats = cache.stats()
+    assert stats['size'] <= 64 and stats['hits'] + stats['misses'] == len(cases) * 3 * 3
+
+
+def test_cache_counters_stay_consistent_under_threads():
+    cache = RecommendationCache(maxsize=50)
+    barrier = threading.Barrier(8)
+
+    def worker(n):
+        barrier.wait()
+        for i in range(2000):
+            key = (n * 7 + i) % 120
+            assert cache.lookup(key, lambda: key * 2) == key * 2
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert stats['hits'] + stats['misses'] == 8 * 2000
+    assert len(cache) == stats['size'] == 50
@@ -0,0 +1,71 @@
+import os
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from csr_snapshot import GraphSnapshot
+from network_io import save_network_file
+
+
+@pytest.fixture
+def graph():
+    rng = random.Random(11)
+    G = nx.DiGraph()
+    nodes = [f'узел {i}' for i in range(60)] + ['птица', 'ёж']
+    G.add_nodes_from(nodes)
+    for _ in range(200):
+        u, v = rng.sample(nodes, 2)
+        G.add_edge(u, v, relation=rng.choice(['является', 'умеет', 'имеет цвет']))
+    return G
+
+
+def check_against_networkx(snapshot, G):
+    assert snapshot.number_of_nodes() == G.number_of_nodes()
+    assert snapshot.number_of_edges() == G.number_of_edges()
+    for node in G:
+        assert sorted(snapshot.successors(node)) == sorted(G.successors(node))
+        assert sorted(snapshot.predecessors(node)) == sorted(G.predecessors(node))
+        assert sorted(snapshot.successors(node, 'является')) == sorted(
+            v for v in G.successors(node) if G.edges[node, v]['relation'] == 'является')
+        assert snapshot.out_degree(node) == G.out_degree(node)
+        assert snapshot.in_degree(node) == G.in_degree(node)
+
+
+def test_matches_networkx(graph):
+    check_against_networkx(GraphSnapshot.from_graph(graph), graph)
+
+
+def test_bfs_matches_networkx(graph):
+    snapshot = GraphSnapshot.from_graph(graph)
+    for source in ['птица', 'узел 0', 'ёж']:
+        assert snapshot.bfs(source) == nx.single_source_shortest_path_length(graph, source)
+        assert snapshot.bfs(source, max_depth=2) == nx.single_source_shortest_path_length(graph, source, cutoff=2)
+        assert snapshot.bfs(source, reverse=True) == nx.single_source_shortest_path_length(graph.reverse(), source)
+
+
+@pytest.mark.parametrize('name', ['net.json', 'net.snb'])
+def test_from_file_and_mmap_load(tmp_path, graph, name):
+    filename = str(tmp_path / name)
+    save_network_file(graph, filename)
+    directory = str(tmp_path / 'snapshot')
+    GraphSnapshot.from_file(filename).save(directory)
+    loaded = GraphSnapshot.load(directory)
+    assert isinstance(loaded.fwd_indices, np.memmap)
+    check_against_networkx(loaded, graph)
+
+
+def test_unknown_node(graph):
+    snapshot = GraphSnapshot.from_graph(graph)
+    assert 'нет такого' not in snapshot
+    with pytest.raises(KeyError):
+        snapshot.successors('нет такого')
+
+
+def test_cli_snapshot(tmp_path, graph, capsys):
+    import network_cli
+    filename = str(tmp_path / 'net.json')
+    save_network_file(graph, filename)
+    assert network_cli.main(['snapshot', filename, '-o', str(tmp_path / 'snap')]) == 0
+    assert os.path.exists(tmp_path / 'snap' / 'fwd_indptr.npy')
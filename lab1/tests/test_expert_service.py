@@ -0,0 +1,123 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from expert_service import ExpertService, main, run_batch, serve
+from knowledge_base import KnowledgeBase
+from tracing import Tracer
+
+
+@pytest.fixture(scope='module')
+def service():
+    return ExpertService(KnowledgeBase.from_file(use_snapshot=False))
+
+
+@pytest.mark.parametrize('request_, field', [
+    ({'op': 'search', 'query': 123}, 'query'),
+    ({'op': 'search'}, 'query'),
+    ({'op': 'search', 'query': 'cyclone', 'top': 0}, 'top'),
+    ({'op': 'search', 'query': 'cyclone', 'top': '3'}, 'top'),
+    ({'op': 'filter', 'exclude': ['class']}, 'exclude'),
+    ({'op': 'filter', 'exclude': {'class': 5}}, 'exclude.class'),
+    ({'op': 'filter', 'class': {'x': 1}}, 'class'),
+    ({'op': 'filter', 'limit': -1}, 'limit'),
+    ({'op': 'filter', 'counts': ['colour']}, 'counts'),
+    ({'op': 'filter', 'budget_max': 'free'}, 'budget_max'),
+    ({'op': 'explain', 'build': ['Cyclone']}, 'build'),
+    ({'playstyle': 'melee combat', 'top': True}, 'top'),
+    ({'playstyle': ['melee combat']}, 'playstyle'),
+    ({'playstyle': 'melee combat', 'class': 'witch'}, 'class'),
+    ({'op': []}, 'op'),
+    ({'op': {'name': 'search'}}, 'op'),
+])
+def test_bad_fields_are_reported_by_name(service, request_, field):
+    response = service.handle(dict(request_, id=7))
+    assert response['id'] == 7
+    assert response['error'].startswith(field + ':')
+
+
+def test_unexpected_failure_becomes_an_error_response(service, monkeypatch):
+    def broken(request):
+        raise AttributeError('сломалось')
+    monkeypatch.setitem(service.operations, 'search', broken)
+    assert service.handle({'op': 'search', 'query': 'x'})['error'] == 'внутренняя ошибка: AttributeError: сломалось'
+    assert service.handle({'op': 'nope'}) == {'error': 'неизвестная операция: nope'}
+    assert service.handle([1]) == {'error': 'запрос должен быть объектом JSON'}
+
+
+def test_recommend_from_budget_alone(service):
+    response = service.handle({'budget': 'free/cheap (self-found)', 'class': 'duelist', 'subclass': 'slayer'})
+    assert response['build'] == 'Boneshatter'
+    assert len(response['alternatives']) == 3
+    assert 'Boneshatter' not in [item['build'] for item in response['alternatives']]
+
+
+def test_search_explain_and_filter(service):
+    assert service.handle({'op': 'search', 'query': 'cylcone', 'top': 1})['matches'][0]['build'] == 'Cyclone'
+    explained = service.handle({'op': 'explain', 'build': 'cyclone'})
+    assert explained['found'] and explained['answers'][0]['assumptions']['subclass'] == 'slayer'
+    assert service.handle({'op': 'explain', 'build': 'cylcone'})['similar'][0] == 'Cyclone'
+
+    response = service.handle({'op': 'filter', 'playstyle': 'melee combat', 'exclude': {'class': 'scion'},
+                               'budget_max': 'free/cheap (self-found)', 'counts': ['class'], 'limit': 2})
+    assert response['count'] == 6 and len(response['builds']) == 2
+    assert response['facet_counts'] == {'class': {'duelist': 3, 'marauder': 3}}
+
+
+def test_batch_keeps_order_and_survives_bad_lines(service):
+    lines = ['{"op": "search", "query": "cyclone", "id": 1}\n', 'не json\n', '\n',
+             '{"op": "filter", "exclude": ["class"], "id": 3}\n', '{"op": [], "id": 4}\n',
+             '{"op": "search", "query": "arc", "id": 5}\n']
+    out = io.StringIO()
+    run_batch(service, lines, out)
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r.get('id') for r in responses] == [1, None, 3, 4, 5]
+    assert responses[1]['error'].startswith('не JSON') and 'error' in responses[2]
+    assert responses[3]['error'].startswith('op:') and 'matches' in responses[4]
+
+
+def test_server_answers_pipelined_requests(service):
+    async def scenario():
+        started = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(serve(service, port=0, ready=started.set_result))
+        server = await started
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'{"op": "search", "query": 123, "id": 1}\n{"op": "stats", "id": 2}\n')
+        await writer.drain()
+        first, second = json.loads(await reader.readline()), json.loads(await reader.readline())
+        writer.close()
+        task.cancel()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == {'error': 'query: ожидается строка', 'id': 1}
+    assert second['id'] == 2 and second['latency']['count'] >= 1
+
+
+def test_traced_service_records_spans_and_why():
+    service = ExpertService(KnowledgeBase.from_file(use_snapshot=False), Tracer(enabled=True))
+    service.handle({'playstyle': 'melee combat', 'budget': 'medium (a few divine orbs)',
+                    'class': 'duelist', 'subclass': 'slayer'})
+    service.handle({'op': 'explain', 'build': 'cyclone'})
+    service.handle({'op': 'search', 'query': 'cylcone'})
+    service.handle({'op': 'filter', 'class': 'witch'})
+    spans = service.handle({'op': 'stats'})['spans']
+    for name in ('class_filtering', 'rule_evaluation', 'build_selection', 'ranking_lookup',
+                 'why_proof', 'build_lookup', 'backward_proof', 'fuzzy_search', 'facet_filter'):
+        assert spans[name]['calls'] >= 1, name
+    why, = service.tracer.why
+    assert why['subject'] == 'Cyclone' and why['why'][0].startswith('recommended_build Cyclone')
+    assert 'spans' not in ExpertService(service.kb).handle({'op': 'stats'})
+
+
+def test_cli_trace_file(tmp_path, monkeypatch):
+    requests = tmp_path / 'in.jsonl'
+    requests.write_text('{"playstyle": "spellcasting"}\n{"op": "search", "query": "orb"}\n', encoding='utf-8')
+    trace = tmp_path / 'trace.folded'
+    assert main(['--trace', str(trace), 'batch', str(requests), '-o', str(tmp_path / 'out.jsonl')]) == 0
+    lines = trace.read_text(encoding='utf-8').splitlines()
+    assert any(line.startswith('class_filtering;rule_evaluation ') for line in lines)
+    assert any(line.startswith('fuzzy_search ') for line in lines)
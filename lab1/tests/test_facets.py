@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from knowledge_base import KnowledgeBase
+
+
+@pytest.fixture(scope='module')
+def kb():
+    return KnowledgeBase.from_file(use_snapshot=False)
+
+
+def facet_values(kb, row):
+    """Значения фасетов строки каталога по определению"""
+    class_key, subclass, build, level = row
+    return {'class': {class_key}, 'subclass': {subclass}, 'budget': {level},
+            'playstyle': {p for p, classes in kb.playstyle_classes.items() if class_key in classes},
+            'tag': set()}
+
+
+def test_queries_match_brute_force(kb):
+    rng = random.Random(0)
+    index = kb.facets
+    choices = {facet: sorted(values) for facet, values in index.facets.items() if values}
+    for _ in range(300):
+        filters = {facet: rng.sample(choices[facet], rng.randint(1, 2))
+                   for facet in rng.sample(sorted(choices), rng.randint(0, 2))}
+        exclude = {facet: rng.sample(choices[facet], 1) for facet in rng.sample(sorted(choices), rng.randint(0, 1))}
+        budget_max = rng.choice([None] + kb.budget_levels)
+
+        expected = []
+        for i, row in enumerate(index.rows):
+            values = facet_values(kb, row)
+            if (all(values[f] & set(v) for f, v in filters.items())
+                    and not any(values[f] & set(v) for f, v in exclude.items())
+                    and (budget_max is None or kb.budget_levels.index(row[3]) <= kb.budget_levels.index(budget_max))):
+                expected.append(i)
+
+        bits = index.query(budget_max=budget_max, exclude=exclude, **filters)
+        assert index.members(bits) == expected
+        assert index.count(bits) == len(expected)
+        assert index.builds(bits) == [index.rows[i] for i in expected]
+        assert sum(index.facet_counts(bits, 'class').values()) == len(expected)
+
+
+def test_python_keyword_facets(kb):
+    assert kb.facets.query(class_='templar') == kb.facets.query(**{'class': ['templar']})
+
+
+def test_exclude_must_be_an_object(kb):
+    with pytest.raises(ValueError) as error:
+        kb.facets.query(exclude=['class'])
+    assert str(error.value) == 'exclude: ожидается объект {фасет: значения}'
+
+
+@pytest.mark.parametrize('kwargs, message', [
+    ({'colour': 'red'}, 'colour: неизвестный фасет'),
+    ({'exclude': {'klass': 'witch'}}, 'exclude.klass: неизвестный фасет'),
+    ({'budget_max': 'free'}, 'budget_max: допустимо одно из'),
+])
+def test_unknown_names_are_rejected(kb, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        kb.facets.query(**kwargs)
+
+
+def test_unknown_values_match_nothing(kb):
+    assert kb.facets.query(class_='necromancer') == 0
+    assert kb.facets.query(exclude={'class': 'necromancer'}) == kb.facets.all
+    assert kb.facets.members(0) == [] and kb.facets.count(kb.facets.all) == len(kb.facets.rows)
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from fuzzy_search import FuzzyIndex, edit_distance
+from knowledge_base import KnowledgeBase
+
+
+def reference_distance(a, b):
+    """Расстояние с перестановкой соседних символов по полной таблице"""
+    d = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+@pytest.fixture(scope='module')
+def catalogue():
+    kb = KnowledgeBase.from_file(use_snapshot=False)
+    return kb.build_search
+
+
+def test_edit_distance_matches_full_table():
+    rng = random.Random(0)
+    for _ in range(2000):
+        a = ''.join(rng.choice('abc') for _ in range(rng.randrange(7)))
+        b = ''.join(rng.choice('abc') for _ in range(rng.randrange(7)))
+        exact = reference_distance(a, b)
+        assert edit_distance(a, b) == exact
+        for limit in range(3):
+            # За пределом полосы - любое число больше limit
+            assert edit_distance(a, b, limit) == (exact if exact <= limit else limit + 1)
+
+
+def test_close_words_match_brute_force(catalogue):
+    rng = random.Random(1)
+    words = list(catalogue._words)
+    for _ in range(200):
+        word = rng.choice(words)
+        typo = list(word)
+        for _ in range(rng.randrange(3)):
+            i = rng.randrange(len(typo))
+            typo[i] = rng.choice('aeiostrn')
+        typo = ''.join(typo)
+        limit = 1 if len(typo) <= 4 else catalogue.max_distance
+        expected = {w for w in words if reference_distance(typo, w) <= limit}
+        found = {w for w, _ in catalogue._close_words(typo)}
+        # Удаления берутся только из начала слова - правки дальше prefix_length не ищутся
+        assert found <= expected
+        if len(typo) <= catalogue.prefix_length:
+            assert found == expected
+
+
+@pytest.mark.parametrize('query, expected, exact', [
+    ('cyclone', 'cyclone', True),
+    ('  Winter   ORB ', 'winter orb', True),
+    ('cylcone', 'cyclone', False),
+    ('boneshater', 'boneshatter', False),
+])
+def test_typos_find_the_build(catalogue, query, expected, exact):
+    name, score = catalogue.search(query, top=1)[0]
+    assert name == expected
+    assert (score == 1.0) == exact
+
+
+def test_partial_names_and_ranking(catalogue):
+    results = catalogue.search('arrow', top=10)
+    # Названия с запросом внутри идут раньше похожих ("spectral throw")
+    assert [name for name, _ in results[:3]] == ['caustic arrow', 'scourge arrow', 'lightning arrow']
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert catalogue.search('zzzzqqq') == []
+    assert catalogue.search('   ') == []
+
+
+def test_duplicate_names_are_indexed_once():
+    index = FuzzyIndex()
+    for name in ['Ice Shot', 'ice  shot', 'Ice Trap']:
+        index.add(name)
+    assert len(index) == 2
+    assert [name for name, _ in index.search('ice shto', top=2)] == ['ice shot', 'ice trap']
@@ -0,0 +1,64 @@
+import os
+import random
+
+import networkx as nx
+import pytest
+
+from inheritance import InheritanceIndex
+from network_io import load_network_file
+
+BUNDLED = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'semantic_network.json')
+
+
+@pytest.fixture
+def birds():
+    return load_network_file(BUNDLED)
+
+
+def test_classic_taxonomy(birds):
+    index = InheritanceIndex(birds)
+    assert index.is_a('дрозд', 'животное')
+    assert not index.is_a('животное', 'дрозд')
+    assert index.has_property('дрозд', 'умеет', 'летать') is True
+    # Исключение ближе к узлу, чем унаследованное утверждение
+    assert index.has_property('пингив', 'умеет', 'летать') is False
+    assert index.has_property('страус', 'умеет', 'летать') is False
+    assert index.has_property('дрозд', 'умеет', 'плавать') is None
+    assert index.properties('канарейка')[('умеет', 'петь')] is True
+
+
+def test_incremental_updates_match_rebuild():
+    rng = random.Random(3)
+    G = nx.DiGraph()
+    index = InheritanceIndex(G)
+    nodes = [f'у{i}' for i in range(15)]
+    for step in range(300):
+        u, v = rng.sample(nodes, 2)
+        if G.has_edge(u, v) and rng.random() < 0.5:
+            G.remove_edge(u, v)
+            index.apply(('remove_edge', u, v))
+        else:
+            G.add_edge(u, v, relation=rng.choice(['является', 'является', 'умеет', 'не умеет']))
+            index.apply(('add_edge', u, v))
+        if step % 25 == 0:
+            fresh = InheritanceIndex(G.copy())
+            for node in G:
+                # В том числе на циклах "является"
+                assert index.ancestors(node) == fresh.ancestors(node)
+                assert index.descendants(node) == fresh.descendants(node)
+                assert index.properties(node) == fresh.properties(node)
+
+
+def test_removed_node_leaves_no_trace(birds):
+    index = InheritanceIndex(birds)
+    index.ancestors('дрозд')
+    birds.remove_node('птица')
+    index.apply(('remove_node', 'птица'))
+    assert index.ancestors('дрозд') == set()
+    assert index.has_property('дрозд', 'умеет', 'летать') is None
+
+
+def test_cli_ask(capsys):
+    import network_cli
+    assert network_cli.main(['ask', BUNDLED, 'пингив', 'умеет', 'летать']) == 0
+    assert capsys.readouterr().out.strip() == 'нет'
@@ -0,0 +1,129 @@
+import os
+
+import networkx as nx
+import pytest
+
+import journal
+from journal import COMPACTING_SUFFIX, JOURNAL_SUFFIX, ChangeJournal
+from network_io import load_network_file, save_network_file
+
+
+@pytest.fixture
+def base_file(tmp_path):
+    G = nx.DiGraph()
+    G.add_edge('дрозд', 'птица', relation='является')
+    filename = str(tmp_path / 'net.json')
+    save_network_file(G, filename, meta={'journal_seq': 0})
+    return filename
+
+
+def open_network(filename):
+    G, meta = nx.DiGraph(), {}
+    load_network_file(filename, G, meta=meta)
+    log = ChangeJournal(G)
+    log.attach(filename, base_seq=meta.get('journal_seq', 0))
+    return G, log
+
+
+def graph_state(G):
+    return sorted(G.nodes(data=False)), sorted((u, v, d.get('relation')) for u, v, d in G.edges(data=True))
+
+
+def test_plain_load_creates_no_journal(base_file):
+    G, log = open_network(base_file)
+    log.detach()
+    assert not os.path.exists(base_file + JOURNAL_SUFFIX)
+
+
+def test_replay_restores_unsaved_edits(base_file):
+    G, log = open_network(base_file)
+    log.execute({'op': 'add_node', 'node': 'пингвин'})
+    log.execute({'op': 'add_edge', 'u': 'пингвин', 'v': 'птица', 'attrs': {'relation': 'является'}})
+    log.execute({'op': 'remove_node', 'node': 'дрозд'})
+    expected = graph_state(G)
+    # Сбой: журнал не сжат, файл остался старым
+    log._file.close()
+
+    replayed, log = open_network(base_file)
+    assert graph_state(replayed) == expected
+    assert log.pending() == 3
+
+
+def test_undo_redo_replay(base_file):
+    G, log = open_network(base_file)
+    log.execute({'op': 'add_node', 'node': 'страус'})
+    log.execute({'op': 'remove_edge', 'u': 'дрозд', 'v': 'птица'})
+    log.undo()
+    assert G.has_edge('дрозд', 'птица')
+    log.redo()
+    log.undo()
+    expected = graph_state(G)
+    log.detach()
+
+    replayed, log = open_network(base_file)
+    assert graph_state(replayed) == expected
+    assert log.redo() is not None
+    assert not replayed.has_edge('дрозд', 'птица')
+
+
+def test_compaction_is_visible_to_plain_loaders(base_file):
+    G, log = open_network(base_file)
+    log.execute({'op': 'add_node', 'node': 'канарейка'})
+    log.compact()
+    log.wait()
+    assert log.pending() == 0
+    assert 'канарейка' in load_network_file(base_file)
+    assert not os.path.exists(base_file + COMPACTING_SUFFIX)
+
+
+def test_undo_clear_survives_failed_compaction(base_file, monkeypatch):
+    G, log = open_network(base_file)
+    log.execute({'op': 'add_node', 'node': 'воробей'})
+    expected = graph_state(G)
+    log.execute({'op': 'clear'})
+
+    def crash(*args, **kwargs):
+        raise OSError('диск отключён')
+    monkeypatch.setattr(journal, 'save_network_file', crash)
+    # Отмена очистки запускает сжатие, и оно падает
+    log.undo()
+    log.wait()
+    assert isinstance(log.take_error(), OSError)
+    log.detach()
+    monkeypatch.undo()
+
+    replayed, _ = open_network(base_file)
+    assert graph_state(replayed) == expected
+
+
+def test_undo_clear_after_reload(base_file):
+    G, log = open_network(base_file)
+    log.execute({'op': 'add_node', 'node': 'воробей'})
+    expected = graph_state(G)
+    log.execute({'op': 'clear'})
+    log.detach()
+
+    replayed, log = open_network(base_file)
+    assert replayed.number_of_nodes() == 0
+    # Очистка отменяется, а за ней и более ранние правки
+    assert log.undo() is not None
+    assert graph_state(replayed) == expected
+    assert log.undo() is not None
+    assert 'воробей' not in replayed
+    log.detach()
+
+
+def test_redo_clear_from_journal_can_be_undone(base_file):
+    G, log = open_network(base_file)
+    before = graph_state(G)
+    log.execute({'op': 'clear'})
+    log.undo()
+    log.wait()
+    log.redo()
+    log.detach()
+
+    replayed, log = open_network(base_file)
+    assert replayed.number_of_nodes() == 0
+    assert log.undo() is not None
+    assert graph_state(replayed) == before
+    log.detach()
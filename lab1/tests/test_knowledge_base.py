@@ -0,0 +1,89 @@
+import os
+import shutil
+
+import pytest
+
+import knowledge_base
+from knowledge_base import DEFAULT_KNOWLEDGE_FILE, SNAPSHOT_SUFFIX, KnowledgeBase, load_knowledge
+
+
+@pytest.fixture
+def source(tmp_path):
+    filename = str(tmp_path / 'kb.json')
+    shutil.copy(DEFAULT_KNOWLEDGE_FILE, filename)
+    return filename
+
+
+@pytest.fixture
+def compiles(monkeypatch):
+    """Счётчик сборок базы из JSON"""
+    calls = []
+    compile_knowledge = knowledge_base.compile_knowledge
+
+    def counted(data):
+        calls.append(1)
+        return compile_knowledge(data)
+    monkeypatch.setattr(knowledge_base, 'compile_knowledge', counted)
+    return calls
+
+
+def test_snapshot_is_reused(source, compiles):
+    first = load_knowledge(source)
+    assert os.path.exists(source + SNAPSHOT_SUFFIX)
+    second = load_knowledge(source)
+    assert len(compiles) == 1
+    assert second['source_hash'] == first['source_hash']
+    assert second['build_info'] == first['build_info']
+
+
+def test_source_change_rebuilds(source, compiles):
+    load_knowledge(source)
+    with open(source, 'a', encoding='utf-8') as f:
+        f.write('\n')
+    load_knowledge(source)
+    assert len(compiles) == 2
+
+
+def test_code_change_rebuilds(source, compiles, monkeypatch):
+    load_knowledge(source)
+    # Правка модуля сборки меняет отпечаток кода в заголовке
+    monkeypatch.setattr(knowledge_base, 'code_fingerprint', lambda: b'\0' * 32)
+    load_knowledge(source)
+    load_knowledge(source)
+    assert len(compiles) == 2
+
+
+@pytest.mark.parametrize('damage', ['truncate', 'garbage'])
+def test_damaged_snapshot_is_a_miss(source, compiles, damage):
+    load_knowledge(source)
+    snapshot = source + SNAPSHOT_SUFFIX
+    size = os.path.getsize(snapshot)
+    with open(snapshot, 'r+b') as f:
+        if damage == 'truncate':
+            f.truncate(size // 2)
+        else:
+            f.seek(knowledge_base._HEADER.size)
+            f.write(b'\x80\x05not a pickle' * 8)
+    kb = load_knowledge(source)
+    assert len(compiles) == 2 and kb['build_info']
+    # Битый снимок перезаписан исправным
+    load_knowledge(source)
+    assert len(compiles) == 2
+
+
+def test_unwritable_directory_still_loads(source, compiles, monkeypatch):
+    def refuse(*args):
+        raise OSError('только чтение')
+    monkeypatch.setattr(knowledge_base, 'write_snapshot', refuse)
+    assert load_knowledge(source)['rules']
+    assert not os.path.exists(source + SNAPSHOT_SUFFIX)
+
+
+def test_knowledge_base_from_snapshot_matches_fresh(source):
+    fresh = KnowledgeBase.from_file(source, use_snapshot=False)
+    load_knowledge(source)
+    cached = KnowledgeBase.from_file(source)
+    assert cached.version == fresh.version
+    assert cached.playstyle_classes == fresh.playstyle_classes
+    assert cached.engine.facts == fresh.engine.facts
+    assert cached.build_search.search('cylcone') == fresh.build_search.search('cylcone')
@@ -0,0 +1,70 @@
+import os
+
+import networkx as nx
+import numpy as np
+
+from label_placement import ALONG, place_edge_labels
+from network_io import load_network_file
+
+BUNDLED = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'semantic_network.json')
+CHAR_SIZE = (0.03, 0.08)
+
+
+def overlaps(placed, labels, char_size):
+    """Пары пересекающихся прямоугольников подписей - полным перебором"""
+    char_width, height = char_size
+    keys = list(placed)
+    result = []
+    for a in range(len(keys)):
+        for b in range(a + 1, len(keys)):
+            (xa, ya), (xb, yb) = placed[keys[a]], placed[keys[b]]
+            wa = (char_width * len(labels[keys[a]]) + height) / 2
+            wb = (char_width * len(labels[keys[b]]) + height) / 2
+            if abs(xa - xb) < wa + wb and abs(ya - yb) < height:
+                result.append((keys[a], keys[b]))
+    return result
+
+
+def default_spots(pos, keys, offset):
+    spots = {}
+    for u, v in keys:
+        start, end = np.asarray(pos[u], float), np.asarray(pos[v], float)
+        delta = end - start
+        normal = np.array([-delta[1], delta[0]]) / np.hypot(*delta)
+        spots[u, v] = tuple(start + delta * ALONG[0] + normal * offset)
+    return spots
+
+
+def test_midpoints_with_normal_offset():
+    pos = {'а': (0.0, 0.0), 'б': (2.0, 0.0), 'в': (2.0, 2.0)}
+    labels = {('а', 'б'): 'x', ('б', 'в'): 'y', ('в', 'в'): 'петля'}
+    placed = place_edge_labels(pos, labels, offset=0.1)
+    assert np.allclose(placed['а', 'б'], (1.0, 0.1))
+    assert np.allclose(placed['б', 'в'], (1.9, 1.0))
+    assert np.allclose(placed['в', 'в'], (2.0, 2.0))
+
+
+def test_bundled_network_labels_do_not_overlap():
+    G = load_network_file(BUNDLED)
+    pos = nx.spring_layout(G, k=3, iterations=100, seed=0)
+    labels = {(u, v): d['relation'] for u, v, d in G.edges(data=True)}
+    assert overlaps(default_spots(pos, labels, 0.1), labels, CHAR_SIZE)
+    assert overlaps(place_edge_labels(pos, labels, offset=0.1, char_size=CHAR_SIZE), labels, CHAR_SIZE) == []
+
+
+def test_bounds_limit_resolution_to_visible_labels():
+    rng = np.random.default_rng(4)
+    # Пары близких узлов, связанных короткими связями
+    pos = {}
+    for i in range(0, 800, 2):
+        pos[i] = rng.uniform(0, 10, 2)
+        pos[i + 1] = pos[i] + rng.uniform(0.2, 0.4, 2)
+    labels = {(i, i + 1): 'является' for i in range(0, 800, 2)}
+    bounds = (0, 4, 0, 4)
+    placed = place_edge_labels(pos, labels, offset=0.05, char_size=CHAR_SIZE, bounds=bounds)
+    plain = place_edge_labels(pos, labels, offset=0.05)
+
+    inside = {e: xy for e, xy in placed.items() if 0 <= xy[0] <= 4 and 0 <= xy[1] <= 4}
+    assert overlaps(inside, labels, CHAR_SIZE) == []
+    far = [e for e, (x, y) in plain.items() if x > 8 and y > 8]
+    assert far and all(placed[e] == plain[e] for e in far)
@@ -0,0 +1,75 @@
+import networkx as nx
+import numpy as np
+
+from layout_cache import LayoutCache
+
+
+def star_graph():
+    G = nx.DiGraph()
+    for leaf in range(12):
+        G.add_edge('центр', f'лист{leaf}')
+    G.add_edge('а', 'б')
+    return G
+
+
+def test_positions_are_computed_once():
+    G = star_graph()
+    cache = LayoutCache(seed=1)
+    pos = cache.positions(G)
+    version = cache.version
+    assert cache.positions(G) is pos
+    assert cache.version == version
+    assert set(pos) == set(G)
+
+
+def test_add_node_moves_only_its_region():
+    G = star_graph()
+    cache = LayoutCache(seed=1)
+    before = {n: p.copy() for n, p in cache.positions(G).items()}
+    cache.take_changes()
+
+    G.add_edge('а', 'в')
+    cache.add_node(G, 'в')
+    changed = cache.take_changes()
+    assert 'в' in changed
+    assert 'центр' not in changed
+    for node in G:
+        if node not in changed and node != 'в':
+            assert np.allclose(cache.pos[node], before[node])
+    # Новый узел ставится рядом с соседом, а не в случайное место рисунка
+    distances = [np.linalg.norm(cache.pos[n] - cache.pos['в']) for n in G if n != 'в']
+    assert np.linalg.norm(cache.pos['а'] - cache.pos['в']) <= np.median(distances)
+
+
+def test_remove_node_and_outside_edits():
+    G = star_graph()
+    cache = LayoutCache(seed=1)
+    cache.positions(G)
+    G.remove_node('лист0')
+    cache.remove_node(G, 'лист0')
+    assert 'лист0' not in cache.pos
+
+    # Граф поменяли в обход кэша - недостающие узлы досчитываются
+    G.add_edge('центр', 'новый')
+    assert 'новый' in cache.positions(G)
+    assert cache.take_changes() is None
+
+
+def test_graph_is_checked_once_per_version():
+    G = star_graph()
+    version = [0]
+    cache = LayoutCache(seed=1, version=lambda: version[0])
+    cache.positions(G)
+
+    # Правка в обход хуков без новой версии не замечается - граф не обходится заново
+    G.add_node('тайный')
+    assert 'тайный' not in cache.positions(G)
+
+    version[0] += 1
+    assert 'тайный' in cache.positions(G)
+
+    # Правка через хук: новый узел размещён сразу, версия лишь разрешает одну сверку
+    version[0] += 1
+    G.add_edge('центр', 'новый')
+    cache.add_node(G, 'новый')
+    assert set(cache.positions(G)) == set(G)
@@ -0,0 +1,54 @@
+import time
+
+import networkx as nx
+import numpy as np
+
+from layout_worker import LayoutWorker
+
+
+def wait_for_result(worker, timeout=10):
+    latest = None
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = worker.poll()
+        if result is not None:
+            latest = result
+            if result[1]:
+                return latest
+        time.sleep(0.01)
+    return latest
+
+
+def test_background_layout_finishes():
+    G = nx.path_graph(40, create_using=nx.DiGraph)
+    worker = LayoutWorker(k=0.2, iterations=60, chunk=5, seed=1)
+    worker.start(G)
+    assert worker.busy()
+    pos, done = wait_for_result(worker)
+    assert done and not worker.busy()
+    assert set(pos) == set(G)
+    coords = np.array(list(pos.values()))
+    assert np.isfinite(coords).all()
+    # Позиции нормированы так же, как у nx.spring_layout
+    assert np.abs(coords).max() <= 1 + 1e-9
+
+
+def test_restart_drops_stale_generation():
+    G = nx.path_graph(300, create_using=nx.DiGraph)
+    worker = LayoutWorker(iterations=200, chunk=1, seed=2)
+    worker.start(G)
+    small = nx.DiGraph([('а', 'б')])
+    worker.start(small, pos={'а': (0.0, 0.0)})
+    pos, done = wait_for_result(worker)
+    assert done and set(pos) == {'а', 'б'}
+
+
+def test_cancel_and_empty_graph():
+    worker = LayoutWorker(seed=3)
+    worker.start(nx.DiGraph())
+    assert not worker.busy()
+    worker.start(nx.path_graph(50, create_using=nx.DiGraph))
+    worker.cancel()
+    assert not worker.busy()
+    time.sleep(0.05)
+    assert worker.poll() is None
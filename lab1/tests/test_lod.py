@@ -0,0 +1,64 @@
+import matplotlib
+
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import networkx as nx
+import pytest
+
+from lod import LevelOfDetail
+from renderer import NetworkRenderer
+from spatial_index import GridIndex
+
+
+@pytest.fixture
+def view():
+    fig, ax = plt.subplots()
+    G = nx.grid_2d_graph(30, 30).to_directed()
+    G = nx.relabel_nodes(G, {n: f'{n[0]}:{n[1]}' for n in G})
+    nx.set_edge_attributes(G, 'рядом', 'relation')
+    pos = {n: tuple(float(c) for c in n.split(':')) for n in G}
+    state = {'graph_version': 1}
+    renderer = NetworkRenderer(ax)
+    lod = LevelOfDetail(ax, renderer, GridIndex(), lambda: (G, pos, 1, state['graph_version']),
+                        detail_limit=50)
+    lod.activate()
+    yield G, ax, renderer, lod, state
+    plt.close(fig)
+
+
+def test_zoomed_in_draws_only_visible_nodes(view):
+    G, ax, renderer, lod, _ = view
+    ax.set_xlim(-0.5, 4.5)
+    ax.set_ylim(-0.5, 4.5)
+    lod.update_view()
+    assert lod.mode == 'detail'
+    assert set(renderer.node_artists) == {f'{x}:{y}' for x in range(5) for y in range(5)}
+
+
+def test_zoomed_out_switches_to_clusters(view):
+    G, ax, renderer, lod, state = view
+    ax.set_xlim(-1, 30)
+    ax.set_ylim(-1, 30)
+    lod.update_view()
+    assert lod.mode == 'clusters'
+    assert not renderer.node_artists
+    assert sum(len(c) for c in lod.members) == G.number_of_nodes()
+
+    # Кластеры считаются один раз на версию графа
+    members = lod.members
+    lod.update_view()
+    assert lod.members is members
+    state['graph_version'] += 1
+    lod.update_view()
+    assert lod.members is not members
+
+
+def test_deactivate_removes_cluster_artists(view):
+    _, ax, _, lod, _ = view
+    ax.set_xlim(-1, 30)
+    ax.set_ylim(-1, 30)
+    lod.update_view()
+    assert ax.collections
+    lod.deactivate()
+    assert not ax.collections and not ax.texts
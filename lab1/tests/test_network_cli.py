@@ -0,0 +1,88 @@
+import json
+
+import networkx as nx
+import pytest
+
+from network_cli import build_network, filter_network, iter_edge_table, main
+from network_io import DEFAULT_RELATION, load_network_file
+
+
+def write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def edges(G):
+    return {(u, v, d.get('relation')) for u, v, d in G.edges(data=True)}
+
+
+def test_tables_with_and_without_header(tmp_path):
+    csv_name = write(tmp_path / 'a.csv', 'от,к,связь,вес\nдрозд,птица,является,1\nптица,летать,,\n')
+    tsv_name = write(tmp_path / 'b.tsv', 'страус\tптица\tявляется\nстраус\tлетать\n')
+    jsonl_name = write(tmp_path / 'c.jsonl', '["пингвин", "птица"]\n\n{"subject": "пингвин", "object": "плавать", "predicate": "умеет"}\n')
+
+    rows = list(iter_edge_table(csv_name))
+    assert rows[0] == ('дрозд', 'птица', {'relation': 'является', 'вес': '1'})
+    assert rows[1] == ('птица', 'летать', {'relation': DEFAULT_RELATION})
+    assert list(iter_edge_table(tsv_name))[1] == ('страус', 'летать', {'relation': DEFAULT_RELATION})
+    assert list(iter_edge_table(jsonl_name)) == [('пингвин', 'птица', {'relation': DEFAULT_RELATION}),
+                                                 ('пингвин', 'плавать', {'relation': 'умеет'})]
+
+
+def test_bad_jsonl_line_names_file_and_line(tmp_path):
+    name = write(tmp_path / 'bad.jsonl', '["а", "б"]\n{"source": "а"}\n')
+    with pytest.raises(ValueError, match=r'bad\.jsonl:2'):
+        list(iter_edge_table(name))
+
+
+@pytest.mark.parametrize('prefer, relation', [('first', 'является'), ('last', 'похож на')])
+def test_merge_deduplicates_by_preference(tmp_path, prefer, relation):
+    first = write(tmp_path / 'first.csv', 'source,target,relation\nа,б,является\nб,в,умеет\n')
+    second = write(tmp_path / 'second.csv', 'source,target,relation\nа,б,похож на\n')
+    # Мелкие пачки: дубли должны отсекаться и внутри пачки, и между ними
+    G = build_network([first, second], prefer=prefer, batch_size=1)
+    assert G.number_of_edges() == 2
+    assert G.edges['а', 'б']['relation'] == relation
+
+
+def test_filter_keeps_and_drops_relations():
+    G = nx.DiGraph()
+    G.add_edge('а', 'б', relation='является')
+    G.add_edge('б', 'в', relation='умеет')
+    G.add_edge('г', 'д', relation='не умеет')
+    filter_network(G, relations=['является', 'умеет'], exclude=['умеет'], drop_isolated=True)
+    assert edges(G) == {('а', 'б', 'является')}
+    assert set(G) == {'а', 'б'}
+
+
+@pytest.mark.parametrize('ext', ['.json', '.snb', '.csv', '.tsv', '.jsonl'])
+def test_cli_import_export_round_trip(tmp_path, ext, capsys):
+    table = write(tmp_path / 'in.csv', 'source,target,relation\nдрозд,птица,является\nптица,летать,умеет\nптица,животное,является\n')
+    net = str(tmp_path / 'net.json')
+    assert main(['import', '-o', net, table]) == 0
+    out = str(tmp_path / ('out' + ext))
+    assert main(['export', '-o', out, net]) == 0
+    assert 'узлов 4, связей 3' in capsys.readouterr().out
+
+    G = build_network([out]) if ext in ('.csv', '.tsv', '.jsonl') else load_network_file(out)
+    assert edges(G) == edges(load_network_file(net))
+
+
+def test_cli_filter_and_merge(tmp_path):
+    a = write(tmp_path / 'a.jsonl', json.dumps(['а', 'б', 'является']) + '\n' + json.dumps(['в', 'г', 'умеет']) + '\n')
+    b = write(tmp_path / 'b.csv', 'source,target,relation\nа,б,умеет\n')
+    merged = str(tmp_path / 'merged.json')
+    assert main(['merge', '-o', merged, a, b, '--prefer', 'first']) == 0
+    assert edges(load_network_file(merged)) == {('а', 'б', 'является'), ('в', 'г', 'умеет')}
+
+    filtered = str(tmp_path / 'filtered.snb')
+    assert main(['filter', '-o', filtered, merged, '--relation', 'является', '--drop-isolated']) == 0
+    G = load_network_file(filtered)
+    assert edges(G) == {('а', 'б', 'является')} and set(G) == {'а', 'б'}
+
+
+def test_cli_import_rejects_networks(tmp_path):
+    net = str(tmp_path / 'net.json')
+    main(['import', '-o', net, write(tmp_path / 'x.csv', 'а,б\n')])
+    with pytest.raises(SystemExit):
+        main(['import', '-o', str(tmp_path / 'y.json'), net])
@@ -0,0 +1,50 @@
+import json
+
+import networkx as nx
+import pytest
+
+from network_io import (DEFAULT_RELATION, is_binary_network, iter_json_network, iter_network,
+                        load_network_file, save_network_file)
+
+
+@pytest.fixture
+def graph():
+    G = nx.DiGraph()
+    G.add_node('птица', color='blue')
+    G.add_edge('дрозд', 'птица', relation='является')
+    G.add_edge('птица', 'летать', relation='умеет', weight=2)
+    G.add_edge('число', 'строка "в кавычках"', relation='связь, с запятой')
+    return G
+
+
+def snapshot(G):
+    return (sorted(G.nodes(data=True), key=lambda item: item[0]),
+            sorted(G.edges(data=True), key=lambda item: item[:2]))
+
+
+@pytest.mark.parametrize('name', ['net.json', 'net.snb'])
+def test_round_trip_with_meta(tmp_path, graph, name):
+    filename = str(tmp_path / name)
+    save_network_file(graph, filename, meta={'journal_seq': 42})
+    assert is_binary_network(filename) == name.endswith('.snb')
+    meta = {}
+    assert snapshot(load_network_file(filename, meta=meta)) == snapshot(graph)
+    assert meta == {'journal_seq': 42}
+
+
+def test_streaming_reader_handles_small_chunks(tmp_path, graph):
+    filename = str(tmp_path / 'net.json')
+    save_network_file(graph, filename)
+    # Буфер меньше одного элемента: значения разрезаются на границе чтения
+    items = list(iter_json_network(filename, chunk_size=7))
+    assert items == list(iter_json_network(filename))
+    assert sum(kind == 'edges' for kind, _ in items) == graph.number_of_edges()
+    assert sum(kind == 'edges' for kind, _ in iter_network(filename)) == graph.number_of_edges()
+
+
+def test_legacy_json_layout(tmp_path):
+    filename = tmp_path / 'old.json'
+    filename.write_text(json.dumps({'nodes': ['а', 'б'], 'edges': [['а', 'б']]}, ensure_ascii=False),
+                        encoding='utf-8')
+    G = load_network_file(str(filename))
+    assert G.edges['а', 'б'] == {'relation': DEFAULT_RELATION}
@@ -0,0 +1,98 @@
+import pytest
+
+from knowledge_base import KnowledgeBase
+from lab2 import ExpertSession
+from recommendation_cache import RecommendationCache, preferences_key
+from tracing import Tracer
+
+
+@pytest.fixture(scope='module')
+def kb():
+    return KnowledgeBase.from_file(use_snapshot=False)
+
+
+def test_lru_eviction_and_stats():
+    cache = RecommendationCache(maxsize=2)
+    calls = []
+
+    def compute(value):
+        return lambda: calls.append(value) or value
+    assert cache.lookup('a', compute(1)) == 1
+    assert cache.lookup('b', compute(2)) == 2
+    assert cache.lookup('a', compute(10)) == 1
+    cache.lookup('c', compute(3))
+    # 'b' использовался давнее всех и вытеснен
+    assert cache.lookup('b', compute(20)) == 20
+    assert calls == [1, 2, 3, 20]
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 1, 'misses': 4, 'hit_rate': 0.2,
+                             'evictions': 2, 'expirations': 0}
+
+
+def test_entries_expire_after_ttl():
+    now = [0.0]
+    cache = RecommendationCache(ttl=10, clock=lambda: now[0])
+    cache.lookup('a', lambda: 1)
+    now[0] = 9.9
+    assert cache.lookup('a', lambda: 2) == 1
+    now[0] = 10.0
+    assert cache.lookup('a', lambda: 3) == 3
+    assert cache.stats()['expirations'] == 1
+
+
+def test_preferences_key_is_canonical():
+    assert preferences_key({'budget': 'b', 'playstyle': 'p', 'class': None}) == \
+        preferences_key({'playstyle': 'p', 'budget': 'b'})
+    assert preferences_key({'weights': {'budget': 1.0, 'playstyle': 2.0}}) == \
+        preferences_key({'weights': {'playstyle': 2.0, 'budget': 1.0}})
+
+
+def test_top_builds_with_weights(kb):
+    session = ExpertSession(kb, RecommendationCache(), Tracer())
+    session.answer('playstyle', 'melee combat')
+    session.answer('budget', 'medium (a few divine orbs)')
+    by_playstyle = session.top_builds(k=5, weights={'playstyle': 5.0, 'budget': 0.0})
+    assert by_playstyle == kb.ranker.top(dict(session.user_preferences, weights={'playstyle': 5.0, 'budget': 0.0}), 5)
+    # Другие веса - другой ключ, тот же набор - попадание в кэш
+    by_budget = session.top_builds(k=5, weights={'playstyle': 0.0, 'budget': 5.0})
+    assert by_budget != by_playstyle
+    assert session.top_builds(k=5, weights={'budget': 0.0, 'playstyle': 5.0}) == by_playstyle
+    assert session.cache.hits == 1
+
+
+def run(kb, cache, tracer):
+    session = ExpertSession(kb, cache, tracer)
+    session.answer('playstyle', 'melee combat')
+    session.answer('budget', 'medium (a few divine orbs)')
+    session.class_options()
+    session.choose_class('duelist')
+    session.choose_subclass('slayer')
+    return session.recommended_build()
+
+
+def test_hits_are_traced_and_skip_rules(kb):
+    cache = RecommendationCache()
+    tracer = Tracer(enabled=True)
+    assert run(kb, cache, tracer) == 'Cyclone'
+    first = tracer.summary()
+    assert 'cache_hit' not in first and first['rule_evaluation']['calls'] == 2
+
+    tracer.reset()
+    assert run(kb, cache, tracer) == 'Cyclone'
+    second = tracer.summary()
+    assert second['cache_hit']['calls'] == 2
+    assert 'rule_evaluation' not in second
+    # Попадание вложено в участок стадии, как и вывод при промахе
+    paths = {tuple(item['path']) for item in tracer.to_json()['stacks']}
+    assert ('class_filtering', 'cache_hit') in paths and ('build_selection', 'cache_hit') in paths
+
+
+def test_knowledge_base_versions_do_not_share_entries(kb):
+    cache = RecommendationCache()
+    # Перезагруженная база с другим хешем файла: записи старой версии ей не подходят
+    other = KnowledgeBase.from_file(use_snapshot=False)
+    other.version = 'другая версия'
+    run(kb, cache, None)
+    tracer = Tracer(enabled=True)
+    run(other, cache, tracer)
+    assert 'cache_hit' not in tracer.summary()
+    assert len(cache) == 4
@@ -0,0 +1,80 @@
+import itertools
+import os
+import random
+
+import networkx as nx
+import pytest
+
+from network_io import load_network_file
+from relation_index import RelationIndex, parse_pattern
+
+BUNDLED = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'semantic_network.json')
+
+
+def brute_query(G, patterns):
+    """Перебор всех сочетаний связей - эталон для соединения шаблонов"""
+    patterns = [parse_pattern(p) for p in patterns]
+    triples = [(u, d.get('relation', ''), v) for u, v, d in G.edges(data=True)]
+    rows = set()
+    for combo in itertools.product(triples, repeat=len(patterns)):
+        bindings = {}
+        ok = True
+        for pattern, triple in zip(patterns, combo):
+            for term, value in zip(pattern, triple):
+                if term.startswith('?'):
+                    if bindings.setdefault(term, value) != value:
+                        ok = False
+                elif term != value:
+                    ok = False
+        if ok:
+            rows.add(tuple(sorted(bindings.items())))
+    return rows
+
+
+def rows(result):
+    return {tuple(sorted(row.items())) for row in result}
+
+
+@pytest.mark.parametrize('patterns', [
+    ['?x является птица'],
+    ['?x является птица', '?x умеет ?y'],
+    ['?x ?r летать'],
+    ['?x "не умеет" ?y', '?x является ?z'],
+])
+def test_query_matches_brute_force(patterns):
+    G = load_network_file(BUNDLED)
+    assert rows(RelationIndex(G).query(patterns)) == brute_query(G, patterns)
+
+
+def test_incremental_updates_match_rebuild():
+    rng = random.Random(5)
+    G = nx.DiGraph()
+    index = RelationIndex(G)
+    index.relations()
+    nodes = [f'у{i}' for i in range(10)]
+    for _ in range(200):
+        u, v = rng.sample(nodes, 2)
+        if G.has_edge(u, v) and rng.random() < 0.4:
+            G.remove_edge(u, v)
+            index.apply(('remove_edge', u, v))
+        else:
+            G.add_edge(u, v, relation=rng.choice(['является', 'умеет']))
+            index.apply(('add_edge', u, v))
+    victim = nodes[0]
+    if victim in G:
+        G.remove_node(victim)
+        index.apply(('remove_node', victim))
+    fresh = RelationIndex(G)
+    assert index.relations() == fresh.relations()
+    assert rows(index.query(['?x является ?y', '?y умеет ?z'])) == rows(fresh.query(['?x является ?y', '?y умеет ?z']))
+
+
+def test_bad_pattern():
+    with pytest.raises(ValueError):
+        parse_pattern('?x является')
+
+
+def test_cli_query(capsys):
+    import network_cli
+    assert network_cli.main(['query', BUNDLED, '?x "не умеет" летать']) == 0
+    assert sorted(capsys.readouterr().out.split('\n')[:-1]) == ['?x = пингив', '?x = страус']
@@ -0,0 +1,51 @@
+import matplotlib
+
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import networkx as nx
+import pytest
+
+from renderer import NetworkRenderer
+
+
+@pytest.fixture
+def scene():
+    fig, ax = plt.subplots()
+    G = nx.DiGraph()
+    G.add_edge('дрозд', 'птица', relation='является')
+    G.add_edge('птица', 'животное', relation='является')
+    pos = {'дрозд': (0.0, 0.0), 'птица': (1.0, 0.0), 'животное': (2.0, 1.0)}
+    renderer = NetworkRenderer(ax)
+    renderer.sync(G, pos)
+    yield G, pos, renderer
+    plt.close(fig)
+
+
+def test_artists_survive_redraw(scene):
+    G, pos, renderer = scene
+    nodes = dict(renderer.node_artists)
+    edges = dict(renderer.edge_artists)
+    renderer.sync(G, pos)
+    assert renderer.node_artists == nodes
+    assert renderer.edge_artists == edges
+
+
+def test_update_touches_only_edited_part(scene):
+    G, pos, renderer = scene
+    untouched = renderer.edge_artists['птица', 'животное']
+    G.add_edge('дрозд', 'крылья', relation='имеет')
+    pos['крылья'] = (0.0, 1.0)
+    renderer.update(G, pos, ['крылья'])
+    assert ('дрозд', 'крылья') in renderer.edge_artists
+    assert renderer.edge_artists['птица', 'животное'] is untouched
+    assert renderer.edge_artists['дрозд', 'крылья'][1].get_text() == 'имеет'
+
+
+def test_removed_node_takes_its_edges(scene):
+    G, pos, renderer = scene
+    G.remove_node('птица')
+    renderer.update(G, pos, ['птица'])
+    assert 'птица' not in renderer.node_artists
+    assert not renderer.edge_artists
+    assert len(renderer.ax.patches) == 0
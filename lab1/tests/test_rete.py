@@ -0,0 +1,135 @@
+import itertools
+import random
+
+import pytest
+
+from knowledge_base import KnowledgeBase
+from rete import ReteEngine, is_var, substitute
+
+# Выбор класса и билда в lab2.py до перехода на правила-данные - эталон для сети Rete
+LEGACY_CLASSES = {
+    'melee combat': {'duelist', 'marauder', 'scion'},
+    'ranged combat': {'ranger', 'scion'},
+    'spellcasting': {'shadow', 'templar', 'witch', 'scion'},
+    'minions/summons': {'witch', 'scion'},
+}
+
+
+def naive_closure(rules, facts):
+    """Прямой вывод перебором всех сочетаний фактов до неподвижной точки"""
+    facts = set(facts)
+    while True:
+        new = set()
+        for rule in rules:
+            for combo in itertools.product(facts, repeat=len(rule['if'])):
+                bindings = {}
+                if all(unify(condition, fact, bindings) for condition, fact in zip(rule['if'], combo)):
+                    new.update(substitute(action, bindings) for action in rule['then'])
+        if new <= facts:
+            return facts
+        facts |= new
+
+
+def unify(pattern, fact, bindings):
+    if len(pattern) != len(fact):
+        return False
+    for term, value in zip(pattern, fact):
+        if is_var(term):
+            if bindings.setdefault(term, value) != value:
+                return False
+        elif term != value:
+            return False
+    return True
+
+
+RULES = [
+    {'name': 'parent', 'if': [('parent', '?x', '?y')], 'then': [('ancestor', '?x', '?y')]},
+    {'name': 'chain', 'if': [('parent', '?x', '?y'), ('ancestor', '?y', '?z')], 'then': [('ancestor', '?x', '?z')]},
+    {'name': 'self', 'if': [('ancestor', '?x', '?x')], 'then': [('cycle', '?x')]},
+    {'name': 'sibling', 'if': [('parent', '?x', '?p'), ('parent', '?y', '?p')], 'then': [('related', '?x', '?y')]},
+]
+
+
+@pytest.fixture
+def kb():
+    return KnowledgeBase.from_file(use_snapshot=False)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_closure_matches_naive_and_fires_once(seed):
+    rng = random.Random(seed)
+    facts = {('parent', f'у{rng.randrange(6)}', f'у{rng.randrange(6)}') for _ in range(8)}
+    engine = ReteEngine()
+    # Правила и факты в случайном порядке, часть фактов - до правил
+    items = [('rule', rule) for rule in RULES] + [('fact', fact) for fact in facts]
+    rng.shuffle(items)
+    for kind, item in items:
+        if kind == 'rule':
+            engine.add_rule(item['name'], item['if'], item['then'])
+        else:
+            engine.assert_fact(item)
+    engine.run()
+    assert engine.facts == naive_closure(RULES, facts)
+    fired = [(name, tuple(sorted(bindings.items()))) for name, bindings in engine.fired]
+    assert len(fired) == len(set(fired))
+
+
+def test_retract_cancels_pending_activations():
+    engine = ReteEngine()
+    engine.add_rule('chain', RULES[1]['if'], RULES[1]['then'])
+    engine.assert_fact(('parent', 'а', 'б'))
+    engine.assert_fact(('ancestor', 'б', 'в'))
+    assert engine.retract_fact(('ancestor', 'б', 'в'))
+    assert engine.run() == 0
+    assert engine.matches(('ancestor', '?x', '?y')) == []
+
+
+def test_salience_then_declaration_order():
+    engine = ReteEngine()
+    order = []
+    engine.add_rule('first', [('go',)], [lambda bindings, e: order.append('first')])
+    engine.add_rule('urgent', [('go',)], [lambda bindings, e: order.append('urgent')], salience=10)
+    engine.add_rule('second', [('go',)], [lambda bindings, e: order.append('second')])
+    engine.assert_fact(('go',))
+    engine.run()
+    assert order == ['urgent', 'first', 'second']
+
+
+def test_sessions_are_isolated_from_base_and_each_other():
+    base = ReteEngine()
+    for rule in RULES[:2]:
+        base.add_rule(rule['name'], rule['if'], rule['then'])
+    base.assert_fact(('parent', 'а', 'б'))
+    first, second = base.session(), base.session()
+    first.assert_fact(('parent', 'б', 'в'))
+    first.run()
+    second.run()
+
+    assert ('ancestor', 'а', 'в') in first
+    assert ('ancestor', 'а', 'в') not in second and ('ancestor', 'а', 'б') in second
+    assert base.facts == {('parent', 'а', 'б'), ('ancestor', 'а', 'б')}
+    # Факт базы сеанс убрать не может, а сама база после сеансов заморожена
+    assert not first.retract_fact(('parent', 'а', 'б'))
+    with pytest.raises(RuntimeError):
+        base.assert_fact(('parent', 'в', 'г'))
+
+
+def test_class_options_match_legacy_table(kb):
+    for playstyle, expected in LEGACY_CLASSES.items():
+        session = kb.new_session_engine()
+        session.assert_fact(('playstyle', playstyle))
+        session.run()
+        assert {b['?c'] for b in session.matches(('class_option', '?c'))} == expected
+
+
+def test_recommended_build_matches_legacy_budget_choice(kb):
+    for playstyle, classes in LEGACY_CLASSES.items():
+        for class_key in classes:
+            for subclass, builds in kb.classes[class_key]['builds'].items():
+                for level, budget in enumerate(kb.budget_levels):
+                    session = kb.new_session_engine()
+                    for fact in [('playstyle', playstyle), ('budget', budget),
+                                 ('class', class_key), ('subclass', subclass)]:
+                        session.assert_fact(fact)
+                    session.run()
+                    assert session.matches(('recommended_build', '?b')) == [{'?b': builds[level]}]
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from spatial_index import GridIndex
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(7)
+    return {f'n{i}': xy for i, xy in enumerate(rng.uniform(-1, 1, size=(500, 2)))}
+
+
+def brute_nearest(points, x, y):
+    return min(points, key=lambda n: (points[n][0] - x) ** 2 + (points[n][1] - y) ** 2)
+
+
+def test_nearest_matches_brute_force(points):
+    index = GridIndex()
+    index.build(points)
+    rng = np.random.default_rng(8)
+    for x, y in rng.uniform(-1.5, 1.5, size=(200, 2)):
+        assert index.nearest(x, y) == brute_nearest(points, x, y)
+
+
+def test_nearest_respects_radius(points):
+    index = GridIndex()
+    index.build(points)
+    assert index.nearest(10, 10, max_dist=0.5) is None
+    node = index.nearest(0, 0, max_dist=5)
+    assert node == brute_nearest(points, 0, 0)
+
+
+def test_rect_and_polygon_queries(points):
+    index = GridIndex()
+    index.build(points)
+    inside = {n for n, (x, y) in points.items() if -0.2 <= x <= 0.5 and -0.3 <= y <= 0.1}
+    assert set(index.query_rect(0.5, 0.1, -0.2, -0.3)) == inside
+    # Прямоугольник, заданный как многоугольник, даёт тот же ответ
+    square = [(-0.2, -0.3), (0.5, -0.3), (0.5, 0.1), (-0.2, 0.1)]
+    assert set(index.query_polygon(square)) == inside
+
+
+def test_sync_rebuilds_only_on_new_version(points):
+    index = GridIndex()
+    index.sync(points, 1)
+    index.sync({'один': (0.0, 0.0)}, 1)
+    assert len(index.nodes) == len(points)
+    index.sync({'один': (0.0, 0.0)}, 2)
+    assert index.nodes == ['один']
+    assert GridIndex().nearest(0, 0) is None
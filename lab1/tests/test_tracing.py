@@ -0,0 +1,77 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from knowledge_base import KnowledgeBase
+from lab2 import ExpertSession
+from tracing import Tracer
+
+
+@pytest.fixture(scope='module')
+def kb():
+    return KnowledgeBase.from_file(use_snapshot=False)
+
+
+def test_nested_spans_and_folded_output():
+    ticks = iter(range(100))
+    tracer = Tracer(enabled=True, clock=lambda: next(ticks))
+    with tracer.span('outer'):
+        with tracer.span('inner'):
+            pass
+        tracer.add('cache_hit', 2)
+    assert tracer.summary() == {'outer': {'calls': 1, 'total_ms': 3000.0},
+                                'inner': {'calls': 1, 'total_ms': 1000.0},
+                                'cache_hit': {'calls': 1, 'total_ms': 2000.0}}
+    # Собственное время внешнего участка - без вложенных
+    assert sorted(tracer.folded()) == ['outer 0', 'outer;cache_hit 2000000', 'outer;inner 1000000']
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span('outer'):
+        tracer.add('cache_hit', 1.0)
+        tracer.explain('build', ['why'])
+    assert tracer.summary() == {} and tracer.why == []
+
+
+def test_concurrent_threads_keep_their_own_paths():
+    tracer = Tracer(enabled=True)
+    barrier = threading.Barrier(2)
+
+    def work(name):
+        with tracer.span(name):
+            # Оба потока держат открытый участок одновременно
+            barrier.wait()
+            with tracer.span('inner'):
+                barrier.wait()
+
+    threads = [threading.Thread(target=work, args=(name,)) for name in ('a', 'b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert {tuple(item['path']) for item in tracer.to_json()['stacks']} == \
+        {('a',), ('a', 'inner'), ('b',), ('b', 'inner')}
+
+
+def test_concurrent_sessions_share_one_tracer(kb):
+    def run(tracer):
+        session = ExpertSession(kb, tracer=tracer)
+        session.answer('playstyle', 'melee combat')
+        session.answer('budget', 'medium (a few divine orbs)')
+        session.choose_class('duelist')
+        session.choose_subclass('slayer')
+        return session.recommended_build()
+
+    def paths(tracer):
+        return {tuple(item['path']) for item in tracer.to_json()['stacks']}
+
+    single = Tracer(enabled=True)
+    run(single)
+    shared = Tracer(enabled=True)
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(run, [shared] * 64))
+    # Участки сеанса не вкладываются в участки чужих потоков
+    assert paths(shared) <= paths(single) | {('cache_hit',), ('build_selection', 'cache_hit')}
+    assert shared.summary()['build_selection']['calls'] == 64
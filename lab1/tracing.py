@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+
+
+class Tracer:
+    """Трассировка экспертной системы: время и число вызовов по участкам, объяснения рекомендаций
+
+    Участок - with tracer.span('имя'). Выключенный трассировщик отдаёт один и
+    тот же пустой участок, так что в рабочем режиме остаётся лишь вызов метода
+    и проверка флага. Включается и выключается на ходу (enabled), собранное
+    выгружается в JSON (to_json) или в формат «свёрнутых стеков» для
+    flamegraph.pl и speedscope (folded).
+
+    Один трассировщик можно делить между сеансами из разных потоков: путь
+    открытых участков у каждого потока свой, а итоги пишутся под блокировкой.
+    """
+
+    def __init__(self, enabled=False, clock=time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        # Путь участка (кортеж имён от корня) -> [вызовы, общее время, собственное время]
+        self._stacks = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.why = []
+
+    @property
+    def _path(self):
+        # Путь открытых участков текущего потока
+        return getattr(self._local, 'path', ())
+
+    @_path.setter
+    def _path(self, path):
+        self._local.path = path
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def add(self, name, elapsed):
+        """Участок, время которого измерено снаружи: итог известен только после замера"""
+        if self.enabled:
+            self._record(self._path + (name,), elapsed)
+
+    def explain(self, subject, lines, **details):
+        """Запоминает объяснение рекомендации (строки вывода, как у backward.explain)"""
+        if self.enabled:
+            self.why.append(dict(details, subject=subject, why=list(lines)))
+
+    def _record(self, path, elapsed):
+        with self._lock:
+            stats = self._stacks.get(path)
+            if stats is None:
+                stats = self._stacks[path] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += elapsed
+            if len(path) > 1:
+                # Время вложенного участка не входит в собственное время внешнего
+                parent = self._stacks.setdefault(path[:-1], [0, 0.0, 0.0])
+                parent[2] -= elapsed
+
+    def _stacks_copy(self):
+        # Выгрузка не должна ловить словарь посреди записи из другого потока
+        with self._lock:
+            return {path: list(stats) for path, stats in self._stacks.items()}
+
+    def summary(self):
+        """Вызовы и общее время по именам участков, где бы они ни вызывались"""
+        result = {}
+        for path, (calls, total, _) in self._stacks_copy().items():
+            item = result.setdefault(path[-1], {'calls': 0, 'total_ms': 0.0})
+            item['calls'] += calls
+            item['total_ms'] += total * 1e3
+        return result
+
+    def rules(self):
+        """Срабатывания правил: имя правила -> вызовы и общее время"""
+        return {name[len(RULE_PREFIX):]: item for name, item in self.summary().items()
+                if name.startswith(RULE_PREFIX)}
+
+    def to_json(self):
+        return {'spans': self.summary(), 'rules': self.rules(),
+                'stacks': [{'path': list(path), 'calls': calls, 'total_ms': total * 1e3, 'self_ms': own * 1e3}
+                           for path, (calls, total, own) in self._stacks_copy().items()],
+                'why': self.why}
+
+    def folded(self):
+        """Строки «a;b;c мкс» по собственному времени участков - вход flamegraph.pl"""
+        return [f'{";".join(path)} {max(0, round(own * 1e6))}'
+                for path, (_, _, own) in self._stacks_copy().items()]
+
+    def save(self, filename):
+        """Выгрузка по расширению: .folded / .txt - свёрнутые стеки, иначе JSON"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            if filename.endswith(('.folded', '.txt')):
+                f.write('\n'.join(self.folded()) + '\n')
+            else:
+                json.dump(self.to_json(), f, ensure_ascii=False, indent=2)
+
+
+# Имена участков срабатывания правил в сети Rete
+RULE_PREFIX = 'rule:'
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'path', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        tracer = self.tracer
+        self.path = tracer._path + (self.name,)
+        tracer._path = self.path
+        self.start = tracer.clock()
+        return self
+
+    def __exit__(self, *exc):
+        tracer = self.tracer
+        elapsed = tracer.clock() - self.start
+        tracer._path = self.path[:-1]
+        tracer._record(self.path, elapsed)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+# Трассировщик по умолчанию для сеансов без своего: всегда выключен
+DISABLED = Tracer()